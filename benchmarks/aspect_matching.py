@@ -0,0 +1,55 @@
+""" Compares Aspect matching against the set-based check it replaced.
+
+    Run with `python -m benchmarks.aspect_matching`.
+"""
+import random
+import timeit
+
+from braga import Aspect, Assemblage
+from tests.fixtures import Alive, Portable, Container, Moveable, Location
+
+
+COMPONENT_TYPES = [Alive, Portable, Container, Moveable, Location]
+
+
+def set_based_is_interested_in(aspect, entity):
+    """The pre-bitmask implementation of `Aspect.is_interested_in`."""
+    components = set([type(component) for component in entity.components])
+    if not components.issuperset(aspect.all_of):
+        return False
+    components = set([type(component) for component in entity.components])
+    if components & aspect.exclude:
+        return False
+    components = set([type(component) for component in entity.components])
+    return bool(components & aspect.some_of or not aspect.some_of)
+
+
+def make_entities(count, seed=0):
+    rng = random.Random(seed)
+    entities = []
+    for _ in range(count):
+        component_types = [t for t in COMPONENT_TYPES if rng.random() < 0.5]
+        entities.append(Assemblage(component_types).make())
+    return entities
+
+
+def main(count=10000, repeat=5):
+    entities = make_entities(count)
+    aspect = Aspect(all_of=set([Container]), exclude=set([Moveable]), some_of=set([Location, Portable, Alive]))
+
+    assert (set(e for e in entities if set_based_is_interested_in(aspect, e)) ==
+            aspect.select_entities(entities))
+
+    set_based = min(timeit.repeat(
+        lambda: [e for e in entities if set_based_is_interested_in(aspect, e)], number=1, repeat=repeat))
+    bitmask = min(timeit.repeat(
+        lambda: aspect.select_entities(entities), number=1, repeat=repeat))
+
+    print("{} entities".format(count))
+    print("  set-based: {:8.2f} ms".format(set_based * 1000))
+    print("  bitmask:   {:8.2f} ms".format(bitmask * 1000))
+    print("  speedup:   {:8.1f}x".format(set_based / bitmask))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+""" Compares spawning Entities in one batch against making them one at a time.
+
+    Run with `python -m benchmarks.bulk_spawning [count]`.
+"""
+import sys
+import timeit
+
+from braga import Assemblage, Entity, World
+from tests.fixtures import Alive, Location, Moveable
+
+
+def previous_make_many(assemblage, count, columns=None, **kwargs):
+    """`Assemblage.make_many` as it was when every Entity went through `Entity()`."""
+    composition = assemblage.composition
+    entities = []
+    for component_kwargs in assemblage.component_kwargs_for_many(count, columns, **kwargs):
+        entity = Entity()
+        entity.components._by_type = dict((component_type, component_type(**instance_kwargs))
+                                          for component_type, instance_kwargs in component_kwargs)
+        entity.components.composition = composition
+        entities.append(entity)
+    return entities
+
+
+def one_at_a_time(storage, assemblage, count, columns, **kwargs):
+    world = World(storage=storage)
+    for i in range(count):
+        world.make_entity(assemblage, x=columns['x'][i], **kwargs)
+
+
+def in_one_batch(storage, assemblage, count, columns, **kwargs):
+    World(storage=storage).make_entities(assemblage, count, columns=columns, **kwargs)
+
+
+def main(count=20000, repeat=5):
+    assemblage = Assemblage([Location, Moveable, Alive])
+    columns = {'x': list(range(count))}
+
+    def best(function):
+        return min(timeit.repeat(function, number=1, repeat=repeat))
+
+    print("{} entities".format(count))
+    previous = best(lambda: previous_make_many(assemblage, count, columns=columns, v_y=1))
+    batch = best(lambda: assemblage.make_many(count, columns=columns, v_y=1))
+    print("  make_many through Entity(): {:8.2f} ms".format(previous * 1000))
+    print("  make_many:                  {:8.2f} ms  ({:.1f}x)".format(batch * 1000, previous / batch))
+    for storage in ('objects', 'archetypes'):
+        single = best(lambda: one_at_a_time(storage, assemblage, count, columns, v_y=1))
+        batch = best(lambda: in_one_batch(storage, assemblage, count, columns, v_y=1))
+        print("  {:<10} make_entity:     {:8.2f} ms".format(storage, single * 1000))
+        print("  {:<10} make_entities:   {:8.2f} ms  ({:.1f}x)".format(storage, batch * 1000, single / batch))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
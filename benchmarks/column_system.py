@@ -0,0 +1,64 @@
+""" Compares a ColumnSystem against the per-entity System path for decaying every skill by 1%.
+
+    Run with `python -m benchmarks.column_system [count ...]`.
+"""
+import sys
+import time
+
+from braga import World, Assemblage, Aspect, System
+from braga.column_system import ColumnSystem
+from braga.examples.duel.duel import ExpelliarmusSkill, Name
+
+
+def make_world(count, storage):
+    world = World(storage=storage)
+    player_factory = Assemblage([Name, ExpelliarmusSkill])
+    for _ in range(count):
+        world.make_entity(player_factory)
+    return world
+
+
+def time_once(function):
+    start = time.time()
+    function()
+    return time.time() - start
+
+
+def main(counts=(10000, 100000, 1000000)):
+    aspect = Aspect(all_of=set([ExpelliarmusSkill]))
+    print("{:>9} {:>14} {:>14} {:>14}".format('entities', 'per-entity', 'columns (obj)', 'columns (arch)'))
+
+    for count in counts:
+        object_world = make_world(count, 'objects')
+        per_entity = System(object_world)
+
+        @per_entity
+        def decay_skill(entity):
+            entity.skill *= 0.99
+
+        def decay_each():
+            for entity in object_world.entities_with_aspect(aspect):
+                per_entity.decay_skill(entity)
+
+        object_columns = ColumnSystem(object_world, aspect=aspect, columns=[(ExpelliarmusSkill, 'skill')])
+
+        @object_columns
+        def decay(skill):
+            skill *= 0.99
+
+        archetype_world = make_world(count, 'archetypes')
+        archetype_columns = ColumnSystem(archetype_world, aspect=aspect, columns=[(ExpelliarmusSkill, 'skill')])
+
+        @archetype_columns
+        def decay(skill):
+            skill *= 0.99
+
+        print("{:>9} {:>12.1f}ms {:>12.1f}ms {:>12.1f}ms".format(
+            count,
+            time_once(decay_each) * 1000,
+            time_once(object_columns.decay) * 1000,
+            time_once(archetype_columns.decay) * 1000))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or (10000, 100000, 1000000))
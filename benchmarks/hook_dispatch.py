@@ -0,0 +1,64 @@
+""" Measures the per-call cost of System hook dispatch against a bare function call.
+
+    Run with `python -m benchmarks.hook_dispatch`.
+"""
+import timeit
+from collections import defaultdict
+
+from braga import System, World
+
+
+def previous_subscriptions():
+    """The World's subscriptions dictionary as it was before callbacks were compiled into tuples."""
+    return defaultdict(lambda: defaultdict(lambda: {'after': [], 'before': []}))
+
+
+def previous_run_hooks(subscriptions, system, function_name, position, *fn_args, **fn_kwargs):
+    """Hook dispatch as it worked before callbacks were compiled into tuples."""
+    if hasattr(system, 'world'):
+        callbacks = subscriptions[system][function_name][position]
+        for callback in callbacks:
+            callback(*fn_args, **fn_kwargs)
+
+
+def previous_call_hooks(function, system, subscriptions):
+    def wrapper(*args, **kwargs):
+        previous_run_hooks(subscriptions, system, function.__name__, 'before', *args, **kwargs)
+        result = function(*args, **kwargs)
+        previous_run_hooks(subscriptions, system, function.__name__, 'after', *args, **kwargs)
+        return result
+    return wrapper
+
+
+def main(number=200000):
+    world = World()
+    subscriptions = previous_subscriptions()
+    system = System(world)
+
+    def move(thing, destination):
+        return destination
+
+    unsubscribed = system(move)
+    previous = previous_call_hooks(move, system, subscriptions)
+
+    subscribed_system = System(world)
+    subscribed = subscribed_system(move)
+    subscriber = lambda thing, destination: None
+    world.subscribe(subscribed_system, 'move', subscriber, before=True)
+    subscriptions[subscribed_system]['move']['before'].append(subscriber)
+    previous_subscribed = previous_call_hooks(move, subscribed_system, subscriptions)
+
+    timings = [
+        ('bare function', move),
+        ('no subscribers', unsubscribed),
+        ('no subscribers (previous)', previous),
+        ('one subscriber', subscribed),
+        ('one subscriber (previous)', previous_subscribed),
+    ]
+    for label, function in timings:
+        seconds = min(timeit.repeat(lambda: function('thing', 'room'), number=number, repeat=3))
+        print("{:<28} {:7.1f} ns/call".format(label, seconds / number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
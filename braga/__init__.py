@@ -5,5 +5,7 @@ from braga.assemblage import Assemblage
 from braga.aspect import Aspect
 from braga.world import World
 from braga.manager import Manager
+from braga.column_system import ColumnSystem
+from braga.sharding import ShardedSystem
 
 from braga.version import __version__
@@ -0,0 +1,73 @@
+""" asyncio counterparts of the World's event publishing and System hooks.
+
+    Only imported when an async method is used, so the rest of braga does not
+    depend on asyncio.
+"""
+import asyncio
+import inspect
+
+
+async def _call(callback, args, kwargs, timeout=None):
+    result = callback(*args, **kwargs)
+    if inspect.isawaitable(result):
+        if timeout is None:
+            result = await result
+        else:
+            result = await asyncio.wait_for(result, timeout)
+    return result
+
+
+async def _settle(output, timeout):
+    """Awaits a subscriber's output if it is awaitable, returning None if it does not finish within `timeout` seconds."""
+    if not inspect.isawaitable(output):
+        return output
+    try:
+        if timeout is None:
+            return await output
+        return await asyncio.wait_for(output, timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def _settle_all(world, results):
+    """Awaits the outputs of event subscribers, as returned by `World._dispatch`, concurrently."""
+    outputs = await asyncio.gather(*[_settle(output, world.event_timeouts.get(subscription))
+                                     for subscription, output in results])
+    return '\n'.join([output for output in outputs if output is not None])
+
+
+async def publish_async(world, event, *involved_entities):
+    """ Publishes an event to the World, awaiting async subscribers concurrently.
+
+        Subscribers are dispatched as by `World.publish`, batch subscribers included,
+        and a World that queues events only queues it. Each awaitable output is given
+        the timeout its subscriber was subscribed with; a subscriber that runs out of
+        time is cancelled and contributes no output.
+    """
+    if world.event_queue is not None:
+        world.event_queue.setdefault(event, []).append(involved_entities)
+        return None
+    output = await _settle_all(world, world._dispatch(event, [involved_entities]))
+    await step_async(world)
+    return output
+
+
+async def step_async(world):
+    """Steps the World, awaiting the async subscribers of any queued events concurrently."""
+    output = await _settle_all(world, world._start_step())
+    world._finish_step()
+    return output
+
+
+async def call_async(wrapped_func, *args, **kwargs):
+    """ Calls a System function, running all of its hooks, sync and async.
+        Async hooks at the same position run concurrently. The function itself may be a coroutine function.
+    """
+    compiled = wrapped_func.hooks[1]
+    before, after = compiled if compiled is not None else ((), ())
+    if before:
+        await asyncio.gather(*[_call(callback, args, kwargs) for callback in before])
+    result = await _call(wrapped_func.__wrapped__, args, kwargs)
+    if after:
+        await asyncio.gather(*[_call(callback, args, kwargs) for callback in after])
+    return result
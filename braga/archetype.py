@@ -0,0 +1,470 @@
+import weakref
+from array import array
+
+import six
+
+from braga.component import attribute_watchers, component_slots, slot_watchers
+from braga.composition import Composition
+from braga.entity import ComponentSet, Entity
+
+
+class Archetype(object):
+    """ Table of the Entities that share one exact Composition.
+
+        Every slot of every Component type in the Composition is stored as a
+        column, keyed by `(component_type, slot)`, and each Entity owns one row.
+        Columns are lists, or `array`s for slots named in `__column_types__`.
+        Component types with an instance dictionary get a `(component_type, '__dict__')`
+        column too, holding None until the first attribute is stored there.
+    """
+
+    def __init__(self, composition):
+        self.composition = composition
+        self.entities = []
+        self.columns = dict()
+        for component_type in composition.types:
+            for slot in component_slots(component_type):
+                typecode = component_type.__column_types__.get(slot)
+                self.columns[(component_type, slot)] = array(typecode) if typecode else []
+            if component_type.__dictoffset__:
+                self.columns[(component_type, DICT_COLUMN)] = []
+
+    def __len__(self):
+        return len(self.entities)
+
+    def append(self, owner, values=None):
+        """ Adds a row for `owner`, filled from `values` where given.
+            Missing values default to None, or 0 in numeric columns.
+        """
+        row = len(self.entities)
+        self.entities.append(owner)
+        for key, column in six.iteritems(self.columns):
+            if values and key in values:
+                column.append(values[key])
+            else:
+                column.append(None if isinstance(column, list) else 0)
+        object.__setattr__(owner, '_archetype', self)
+        object.__setattr__(owner, '_row', row)
+        self._follow(owner)
+
+    def extend(self, owners):
+        """ Adds a row for each of `owners`, filled with default values.
+            The owners must be new, so that none of them has views yet.
+            Returns the row of the first owner.
+        """
+        first_row = len(self.entities)
+        self.entities.extend(owners)
+        for column in six.itervalues(self.columns):
+            default = None if isinstance(column, list) else 0
+            column.extend([default] * len(owners))
+        for row, owner in enumerate(owners, first_row):
+            object.__setattr__(owner, '_archetype', self)
+            object.__setattr__(owner, '_row', row)
+        return first_row
+
+    def remove(self, row):
+        """Removes a row by moving the last row into its place."""
+        last = len(self.entities) - 1
+        for column in six.itervalues(self.columns):
+            column[row] = column[last]
+            column.pop()
+        moved = self.entities.pop()
+        if row != last:
+            self.entities[row] = moved
+            object.__setattr__(moved, '_row', row)
+            self._follow(moved)
+
+    def _follow(self, owner):
+        """Points the live views of `owner` at its current row."""
+        if _live_views:
+            for component_type in self.composition.types:
+                view = live_view(owner, component_type)
+                if view is not None:
+                    view._block = self
+                    view._row = owner._row
+
+    def row_values(self, row):
+        return dict((key, column[row]) for key, column in six.iteritems(self.columns))
+
+
+DICT_COLUMN = '__dict__'
+
+# Weak references to the views currently in use, by (owner, Component type).
+# Views are made when a Component is asked for and dropped when nothing holds
+# them, so the same view is handed out for as long as anything could compare
+# it by identity.
+_live_views = dict()
+
+
+def _view_collected(reference):
+    if _live_views.get(reference.key) is reference:
+        del _live_views[reference.key]
+
+
+def live_view(owner, component_type):
+    """Returns the view of `owner`'s Component of `component_type` that is in use, or None."""
+    reference = _live_views.get((owner, component_type))
+    return None if reference is None else reference()
+
+
+class ColumnSlot(object):
+    """ Stands in for a Component slot on a column view, reading and writing the view's row.
+        Assignments are checked and reported by the slot's watchers, see `braga.component.watch_slot`.
+    """
+
+    __slots__ = ['key', 'watchers', 'checks']
+
+    def __init__(self, component_type, name):
+        self.key = (component_type, name)
+        self.watchers = slot_watchers(component_type, name)
+        self.checks = slot_watchers(component_type, name, before=True)
+
+    def __get__(self, view, view_type=None):
+        if view is None:
+            return self
+        return view._block.columns[self.key][view._row]
+
+    def __set__(self, view, value):
+        if self.checks:
+            for callback in tuple(self.checks):
+                callback(view, self.key[1], value)
+        view._block.columns[self.key][view._row] = value
+        if self.watchers:
+            for callback in tuple(self.watchers):
+                callback(view, self.key[1], value)
+
+    def __delete__(self, view):
+        raise AttributeError("Column slots cannot be deleted")
+
+
+def _instance_dict(view):
+    """Returns the instance dictionary of a view, kept in its row of the `__dict__` column."""
+    column = view._block.columns[(view._component_type, DICT_COLUMN)]
+    values = column[view._row]
+    if values is None:
+        values = column[view._row] = dict()
+    return values
+
+
+def _get_dict_attribute(view, name):
+    values = view._block.columns[(view._component_type, DICT_COLUMN)][view._row]
+    if values is None or name not in values:
+        raise AttributeError(name)
+    return values[name]
+
+
+def _set_dict_attribute(view, name, value):
+    if name in _VIEW_SLOTS or hasattr(type(view), name):
+        object.__setattr__(view, name, value)
+    else:
+        _instance_dict(view)[name] = value
+        watchers = attribute_watchers(view._component_type)
+        if watchers:
+            for callback in tuple(watchers):
+                callback(view, name, value)
+
+
+def _delete_dict_attribute(view, name):
+    try:
+        del _instance_dict(view)[name]
+    except KeyError:
+        raise AttributeError(name)
+
+
+_VIEW_SLOTS = ('_block', '_row')
+_NOT_COPIED = ('__slots__', '__dict__', '__weakref__', '__qualname__', '__init_subclass__', '__class__')
+_view_classes = dict()
+
+
+def view_class(component_type):
+    """ Returns the view class for a Component type: a proxy that holds only a table and a row,
+        and reads and writes the table's columns.
+
+        The class does not inherit the Component type's slots, so a view costs the
+        same whatever the Component holds; it has the type's methods and properties,
+        and `isinstance` treats its views as instances of the type.
+    """
+    cls = _view_classes.get(component_type)
+    if cls is None:
+        slots = component_slots(component_type)
+        namespace = dict()
+        for klass in reversed(component_type.__mro__[:-1]):
+            for name, value in six.iteritems(klass.__dict__):
+                if name not in _NOT_COPIED and name not in slots and not name.startswith('_abc'):
+                    namespace[name] = value
+        namespace.update({
+            '__slots__': list(_VIEW_SLOTS) + ['__weakref__'],
+            '__module__': component_type.__module__,
+            '__class__': property(lambda view: component_type),
+            '_component_type': component_type,
+        })
+        if component_type.__dictoffset__:
+            namespace.update({
+                '__dict__': property(_instance_dict),
+                '__getattr__': _get_dict_attribute,
+                '__setattr__': _set_dict_attribute,
+                '__delattr__': _delete_dict_attribute,
+            })
+        for slot in slots:
+            namespace[slot] = ColumnSlot(component_type, slot)
+        cls = _view_classes[component_type] = type(component_type.__name__, (object,), namespace)
+    return cls
+
+
+def make_view(component_type, block, row):
+    """Makes a view of a row of a table, without registering it as the live view of the row's owner."""
+    view = object.__new__(view_class(component_type))
+    object.__setattr__(view, '_block', block)
+    object.__setattr__(view, '_row', row)
+    return view
+
+
+def owner_view(owner, component_type):
+    """Returns the view of `owner`'s Component of `component_type`, making it if nothing holds one."""
+    key = (owner, component_type)
+    reference = _live_views.get(key)
+    view = None if reference is None else reference()
+    if view is None:
+        view = make_view(component_type, owner._archetype, owner._row)
+        _live_views[key] = weakref.KeyedRef(view, _view_collected, key)
+    return view
+
+
+class _DetachedRow(object):
+    """Row owner for a view whose Component has been removed from its Entity."""
+
+    __slots__ = ['_archetype', '_row']
+
+
+class _ViewMap(object):
+    """ Maps the Component types of an Entity kept in Archetype tables to their views,
+        making views only as they are asked for.
+    """
+
+    __slots__ = ['_components']
+
+    def __init__(self, components):
+        self._components = components
+
+    def __getitem__(self, component_type):
+        if component_type not in self._components.composition.types:
+            raise KeyError(component_type)
+        return owner_view(self._components._entity, component_type)
+
+    def get(self, component_type, default=None):
+        if component_type not in self._components.composition.types:
+            return default
+        return owner_view(self._components._entity, component_type)
+
+    def __contains__(self, component_type):
+        return component_type in self._components.composition.types
+
+    def __iter__(self):
+        return iter(self._components.composition.types)
+
+    def __len__(self):
+        return len(self._components.composition.types)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[component_type] for component_type in self]
+
+    def items(self):
+        return [(component_type, self[component_type]) for component_type in self]
+
+    iterkeys = __iter__
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+
+class ArchetypeComponentSet(ComponentSet):
+    """ The Components of an Entity kept in Archetype tables.
+
+        Holds no Components: views of the Entity's row are made when they are asked
+        for, and reused while anything holds them. Adding a Component copies its
+        values into the Entity's new row; the set then contains a view of that
+        Component rather than the instance that was added.
+    """
+
+    __slots__ = ['_storage']
+
+    def __init__(self, entity, storage, composition=None):
+        self._entity = entity
+        self._storage = storage
+        self.composition = Composition.of(()) if composition is None else composition
+
+    @property
+    def _by_type(self):
+        return _ViewMap(self)
+
+    def __contains__(self, component):
+        component_type = getattr(type(component), '_component_type', None)
+        return component_type is not None and live_view(self._entity, component_type) is component
+
+    def __iter__(self):
+        entity = self._entity
+        return iter([owner_view(entity, component_type) for component_type in self.composition.types])
+
+    def __len__(self):
+        return len(self.composition.types)
+
+    def get(self, component_type):
+        resolved_type = self.composition.resolve(component_type)
+        if resolved_type is None:
+            return None
+        return owner_view(self._entity, resolved_type)
+
+    def _read(self, component_type, name):
+        owner = self._entity
+        column = owner._archetype.columns.get((component_type, name))
+        if column is not None:
+            return column[owner._row]
+        return getattr(owner_view(owner, component_type), name)
+
+    def _assign(self, name, value):
+        component_type = self.composition.write_route(name)
+        if component_type is not None:
+            slot = view_class(component_type).__dict__.get(name)
+            if type(slot) is ColumnSlot and not slot.checks and not slot.watchers:
+                owner = self._entity
+                owner._archetype.columns[slot.key][owner._row] = value
+                return True
+        return ComponentSet._assign(self, name, value)
+
+    def add(self, component):
+        if component in self:
+            return
+        self._check_change()
+        component_type = getattr(type(component), '_component_type', type(component))
+        if component_type in self.composition.types:
+            raise ValueError("Entity already has a component of type {}".format(component_type.__name__))
+
+        values = dict()
+        for slot in component_slots(component_type):
+            if hasattr(component, slot):
+                values[(component_type, slot)] = getattr(component, slot)
+        if component_type.__dictoffset__:
+            values[(component_type, DICT_COLUMN)] = dict(component.__dict__)
+
+        composition = self.composition.with_type(component_type)
+        self._storage.move(self._entity, composition, values)
+        self.composition = composition
+        self._notify(component_type, owner_view(self._entity, component_type), True)
+
+    def discard(self, component):
+        if component not in self:
+            return
+        self._check_change()
+        component_type = component._component_type
+        owner = self._entity
+
+        values = owner._archetype.row_values(owner._row)
+        del _live_views[(owner, component_type)]
+        detached = _DetachedRow()
+        Archetype(Composition.of([component_type])).append(detached, values)
+        component._block, component._row = detached._archetype, detached._row
+
+        self.composition = self.composition.without_type(component_type)
+        self._storage.move(owner, self.composition)
+        self._notify(component_type, component, False)
+
+
+class ArchetypeStorage(object):
+    """Keeps the Entities of a World in one Archetype table per Composition."""
+
+    def __init__(self):
+        self.archetypes = dict()
+
+    def archetype(self, composition):
+        """Returns the table for a Composition, creating it if needed."""
+        archetype = self.archetypes.get(composition)
+        if archetype is None:
+            archetype = self.archetypes[composition] = Archetype(composition)
+        return archetype
+
+    def archetypes_with_aspect(self, aspect):
+        """Returns the non-empty tables whose Composition matches an Aspect."""
+        return [archetype for composition, archetype in six.iteritems(self.archetypes)
+                if archetype.entities and aspect.matches(composition.signature)]
+
+    def make_entity(self, component_kwargs=(), composition=None):
+        """ Makes an Entity whose Components are initialised directly in their table.
+            :param component_kwargs: pairs of Component type and kwargs for its `__init__`
+            :type component_kwargs: list.
+            :param composition: the Composition of those Component types, if already known
+            :type composition: Composition.
+        """
+        if composition is None:
+            composition = Composition.of([component_type for component_type, _ in component_kwargs])
+        entity = Entity.blank()
+        entity.__dict__['components'] = ArchetypeComponentSet(entity, self, composition)
+        archetype = self.archetype(composition)
+        archetype.append(entity)
+
+        for component_type, kwargs in component_kwargs:
+            make_view(component_type, archetype, entity._row).__init__(**kwargs)
+        return entity
+
+    def make_entities(self, component_kwargs_per_entity, composition):
+        """Makes one Entity per entry of `component_kwargs_per_entity`, all with the same Composition."""
+        archetype = self.archetype(composition)
+        component_kwargs_per_entity = list(component_kwargs_per_entity)
+        new = object.__new__
+        fields = {'_uuid': None, '_id': None, '_world': None}
+        entities = []
+        for _ in component_kwargs_per_entity:
+            entity = new(Entity)
+            fields['components'] = ArchetypeComponentSet(entity, self, composition)
+            entity.__dict__.update(fields)
+            entities.append(entity)
+
+        row = archetype.extend(entities)
+        classes = dict((component_type, view_class(component_type)) for component_type in composition.types)
+        set_slot = object.__setattr__
+        for component_kwargs in component_kwargs_per_entity:
+            for component_type, kwargs in component_kwargs:
+                view = new(classes[component_type])
+                set_slot(view, '_block', archetype)
+                set_slot(view, '_row', row)
+                view.__init__(**kwargs)
+            row += 1
+        return entities
+
+    def move(self, owner, composition, values=None):
+        """Moves `owner`'s row to the table for `composition`, carrying over shared columns."""
+        archetype = owner._archetype
+        row_values = archetype.row_values(owner._row)
+        if values:
+            row_values.update(values)
+        archetype.remove(owner._row)
+        self.archetype(composition).append(owner, row_values)
+
+    def make_pending_entity(self, component_kwargs=()):
+        """Makes an Entity in a table of its own, to be moved into these tables with `adopt`."""
+        return _detached.make_entity(component_kwargs)
+
+    def adopt(self, entity):
+        """Moves an Entity made by another ArchetypeStorage into these tables."""
+        self.move(entity, entity.components.composition)
+        entity.components._storage = self
+
+    def remove(self, entity):
+        """Takes an Entity out of the tables. Its values stay readable through its views."""
+        _detached.move(entity, entity.components.composition)
+        entity.components._storage = _detached
+
+
+class _DetachedStorage(ArchetypeStorage):
+    """Gives every row its own table, for Entities that have left their World."""
+
+    def archetype(self, composition):
+        return Archetype(composition)
+
+
+_detached = _DetachedStorage()
@@ -1,8 +1,16 @@
 import six
 
+from braga.composition import signature_of
+
+
 class Aspect(object):
     """ Defines a pattern of Component types. Can be used to check if the set of components
         belonging to an Entity is consistent with the pattern.
+
+        The pattern is compiled into bitmasks over Component types, so matching an
+        Entity only compares the masks against the Entity's signature. The sets of
+        Component types are kept as frozensets, so that the masks cannot go stale;
+        assign a new set to change the pattern.
     """
 
     def __init__(self, all_of=None, exclude=None, some_of=None):
@@ -18,34 +26,58 @@ class Aspect(object):
         self.exclude = exclude if exclude else set()
         self.some_of = some_of if some_of else set()
 
+    @property
+    def all_of(self):
+        return self._all_of
+
+    @all_of.setter
+    def all_of(self, component_types):
+        self._all_of = frozenset(component_types)
+        self.all_of_mask = signature_of(component_types)
+
+    @property
+    def exclude(self):
+        return self._exclude
+
+    @exclude.setter
+    def exclude(self, component_types):
+        self._exclude = frozenset(component_types)
+        self.exclude_mask = signature_of(component_types)
+
+    @property
+    def some_of(self):
+        return self._some_of
+
+    @some_of.setter
+    def some_of(self, component_types):
+        self._some_of = frozenset(component_types)
+        self.some_of_mask = signature_of(component_types)
+
+    def matches(self, signature):
+        """ Determines if a Component signature is consistent with the Aspect's pattern.
+        :param signature: bitmask of Component types, as found on `Entity.signature`
+        :type signature: int.
+        :returns: bool -- whether the signature matches the Aspect
+        """
+        return (signature & self.all_of_mask == self.all_of_mask and
+                not signature & self.exclude_mask and
+                (not self.some_of_mask or bool(signature & self.some_of_mask)))
+
     def is_interested_in(self, entity):
         """ Determines if an Entity has Components consistent with the Aspect's pattern.
         :param entity: the Entity to evaluate
         :type entity: Entity.
         :returns: bool -- whether the Entity matches the Aspect
         """
-        return (self._is_interested_in_all_of(entity) and
-                self._is_interested_in_exclude(entity) and
-                self._is_interested_in_some_of(entity))
+        return self.matches(entity.signature)
 
     def __contains__(self, entity):
         """Syntactic sugar for `is_interested_in`."""
         return self.is_interested_in(entity)
 
-    def _is_interested_in_all_of(self, entity):
-        components = set([type(component) for component in entity.components])
-        return components.issuperset(self.all_of)
-
-    def _is_interested_in_exclude(self, entity):
-        components = set([type(component) for component in entity.components])
-        return not components & self.exclude
-
-    def _is_interested_in_some_of(self, entity):
-        components = set([type(component) for component in entity.components])
-        return components & self.some_of or not self.some_of
-
     def select_entities(self, entities):
-        return set([entity for entity in entities if self.is_interested_in(entity)])
+        matches = self.matches
+        return set([entity for entity in entities if matches(entity.signature)])
 
     @classmethod
     def make_from(cls, assemblage):
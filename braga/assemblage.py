@@ -3,6 +3,9 @@ from collections import defaultdict
 import six
 
 from braga import Entity
+from braga.entity import ComponentSet
+from braga.composition import Composition
+from braga.readonly import ReadOnlyMapping
 
 
 class Assemblage(object):
@@ -14,16 +17,116 @@ class Assemblage(object):
             Component classes and the values are dictionaries, where
             the key-value pairs are kwargs for the __init__ methods of the Component class
         """
-        self.component_types = defaultdict(dict)
+        self._component_types = defaultdict(dict)
         for component in components:
-            self.component_types[component].update(
+            self._component_types[component].update(
                 {k:v for k,v in six.iteritems(kwargs) if k in component.__slots__}
             )
             kwargs = {k:v for k,v in six.iteritems(kwargs) if k not in component.__slots__}
+        self._constructor = None
 
     def add_component(self, component_type, **kwargs):
         """Adds a component type to the factory."""
-        self.component_types[component_type].update(**kwargs)
+        self._component_types[component_type].update(**kwargs)
+        self._constructor = None
+
+    @property
+    def component_types(self):
+        """ The Assemblage's Component types, mapped to the kwargs each is initialized with.
+            Read-only, since `make` runs a constructor compiled from them; use `add_component`.
+        """
+        return ReadOnlyMapping(self._component_types, ReadOnlyMapping)
+
+    @property
+    def composition(self):
+        """The Composition of the Entities the Assemblage makes."""
+        if self._constructor is None:
+            self._compile()
+        return self._composition
+
+    @property
+    def routes(self):
+        """ Maps each property the Assemblage accepts to the Component type it initializes.
+            A property belongs to the first Component type that has a slot with its name.
+        """
+        if self._constructor is None:
+            self._compile()
+        return self._routes
+
+    def _compile(self):
+        """ Generates a constructor specialised to the Assemblage's Component types and initial values.
+
+            The constructor copies the initial values for each Component type, applies any overrides
+            it was called with, and calls each Component type's `__init__` without looping over the
+            Assemblage or filtering kwargs. The Entity is allocated without running `Entity.__init__`.
+        """
+
+        routes = dict()
+        for component_type in self._component_types:
+            for name in component_type.__slots__:
+                routes.setdefault(name, component_type)
+
+        composition = Composition.of(self._component_types)
+        namespace = {
+            'Entity': Entity,
+            'ComponentSet': ComponentSet,
+            'new': object.__new__,
+            'composition': composition,
+            'known': frozenset(routes),
+            'unknown_properties': _unknown_properties,
+        }
+        lines = [
+            'def construct(kwargs):',
+            '    if kwargs and not known.issuperset(kwargs):',
+            '        raise unknown_properties(kwargs, known)',
+            '    entity = new(Entity)',
+            '    components = new(ComponentSet)',
+            '    components._entity = entity',
+            '    components.composition = composition',
+        ]
+        for i, (component_type, init_kwargs) in enumerate(six.iteritems(self._component_types)):
+            namespace['T{}'.format(i)] = component_type
+            defaults = []
+            for j, (name, value) in enumerate(six.iteritems(init_kwargs)):
+                namespace['d{}_{}'.format(i, j)] = value
+                defaults.append('{!r}: d{}_{}'.format(name, i, j))
+            lines.append('    kw{} = {{{}}}'.format(i, ', '.join(defaults)))
+
+            overrides = [name for name in component_type.__slots__ if routes[name] is component_type]
+            if overrides:
+                lines.append('    if kwargs:')
+                for name in overrides:
+                    lines.append('        if {0!r} in kwargs: kw{1}[{0!r}] = kwargs[{0!r}]'.format(name, i))
+            lines.append('    c{0} = T{0}(**kw{0})'.format(i))
+
+        lines.append('    components._by_type = {{{}}}'.format(
+            ', '.join('T{0}: c{0}'.format(i) for i in range(len(self._component_types)))))
+        lines.append("    entity.__dict__.update({'_uuid': None, '_id': None, '_world': None, 'components': components})")
+        lines.append('    return entity')
+
+        six.exec_(compile('\n'.join(lines), '<assemblage constructor>', 'exec'), namespace)
+        self._routes = routes
+        self._composition = composition
+        self._constructor = namespace['construct']
+
+    def component_kwargs(self, **kwargs):
+        """ Works out which kwargs each of the Assemblage's Component types should be initialized with.
+
+            Raises a ValueError if any kwargs do not belong to one of the Component types.
+
+            Returns a list of (Component type, kwargs) pairs.
+        """
+
+        routes = self.routes
+        if kwargs and not six.viewkeys(routes) >= six.viewkeys(kwargs):
+            raise _unknown_properties(kwargs, routes)
+
+        component_kwargs = []
+        for component_type, init_kwargs in six.iteritems(self._component_types):
+            instance_kwargs = dict(init_kwargs)
+            instance_kwargs.update({k:v for k,v in six.iteritems(kwargs) if routes[k] is component_type})
+            component_kwargs.append((component_type, instance_kwargs))
+        return component_kwargs
 
     def make(self, **kwargs):
         """ Makes an Entity with the Assemblage's combination of Components.
@@ -37,17 +140,76 @@ class Assemblage(object):
             Returns an Entity.
         """
 
-        entity = Entity()
+        if self._constructor is None:
+            self._compile()
+        return self._constructor(kwargs)
+
+    def component_kwargs_for_many(self, count, columns=None, **kwargs):
+        """ Works out the kwargs for each Component type of `count` Entities at once.
+
+            `kwargs` are shared by every Entity; `columns` maps property names to
+            sequences holding one value per Entity.
+
+            Raises a ValueError if any property does not belong to one of the Component types,
+            or if a column does not hold `count` values.
+
+            Returns an iterator over one list of (Component type, kwargs) pairs per Entity.
+        """
+
+        columns = dict(columns) if columns else dict()
+        for name, values in six.iteritems(columns):
+            if len(values) != count:
+                raise ValueError("Expected {0} values for {1}, got {2}".format(count, name, len(values)))
+
+        routes = self.routes
+        properties = dict(kwargs)
+        properties.update(columns)
+        if not six.viewkeys(routes) >= six.viewkeys(properties):
+            raise _unknown_properties(properties, routes)
+
+        plan = []
+        for component_type, shared_kwargs in self.component_kwargs(**kwargs):
+            column_kwargs = [(k, v) for k,v in six.iteritems(columns) if routes[k] is component_type]
+            plan.append((component_type, shared_kwargs, column_kwargs))
+
+        def each_entity():
+            for i in six.moves.range(count):
+                component_kwargs = []
+                for component_type, shared_kwargs, column_kwargs in plan:
+                    instance_kwargs = dict(shared_kwargs)
+                    for name, values in column_kwargs:
+                        instance_kwargs[name] = values[i]
+                    component_kwargs.append((component_type, instance_kwargs))
+                yield component_kwargs
 
-        for component_type, init_kwargs in six.iteritems(self.component_types):
-            instance_kwargs = init_kwargs
-            instance_kwargs.update({k:v for k,v in six.iteritems(kwargs) if k in component_type.__slots__})
-            kwargs = {k:v for k,v in six.iteritems(kwargs) if k not in component_type.__slots__}
+        return each_entity()
+
+    def make_many(self, count, columns=None, **kwargs):
+        """ Makes `count` Entities with the Assemblage's combination of Components.
+
+            Takes shared initial values as kwargs, and per-Entity initial values as
+            `columns`, a dictionary of property names to sequences of `count` values.
+            See `component_kwargs_for_many`.
+
+            Returns a list of Entities.
+        """
 
-            component = component_type(**instance_kwargs)
-            entity.components.add(component)
+        composition = self.composition
+        new = object.__new__
+        fields = {'_uuid': None, '_id': None, '_world': None}
+        entities = []
+        for component_kwargs in self.component_kwargs_for_many(count, columns, **kwargs):
+            entity = new(Entity)
+            components = new(ComponentSet)
+            components._entity = entity
+            components._by_type = dict((component_type, component_type(**instance_kwargs))
+                                       for component_type, instance_kwargs in component_kwargs)
+            components.composition = composition
+            fields['components'] = components
+            entity.__dict__.update(fields)
+            entities.append(entity)
+        return entities
 
-        if kwargs:
-            raise ValueError("Unknown initial properties: {}".format(', '.join(six.iterkeys(kwargs))))
 
-        return entity
+def _unknown_properties(kwargs, known):
+    return ValueError("Unknown initial properties: {}".format(', '.join(k for k in kwargs if k not in known)))
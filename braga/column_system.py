@@ -0,0 +1,137 @@
+from array import array
+
+import six
+
+from braga.system import System, call_hooks
+
+try:
+    import numpy
+except ImportError:  # numpy is an optional dependency
+    numpy = None
+
+
+class ColumnSystem(System):
+    """ System whose methods work on whole columns of Component slots as NumPy arrays.
+
+        Decorated functions are called with one array per entry in `columns`,
+        holding that slot's value for every Entity in the World that matches the
+        System's Aspect. Changes made to the arrays in place, or arrays returned
+        by the function (one, or a tuple in `columns` order), are written back.
+
+        In a World with `storage='archetypes'` the function is called once per
+        matching table, and slots listed in `__column_types__` are handed over
+        without copying. In a World with `storage='mmap'` the values of the
+        matching Entities are gathered straight from the mapped columns.
+
+        Unless declared otherwise, a ColumnSystem writes the Component types of its
+        columns and reads those named by its Aspect.
+    """
+
+    def __init__(self, world=None, aspect=None, columns=()):
+        if numpy is None:
+            raise ImportError("ColumnSystem requires numpy")
+        super(ColumnSystem, self).__init__(world=world)
+        self.aspect = aspect
+        self.columns = list(columns)
+        if self.writes is None:
+            self.writes = frozenset(component_type for component_type, _ in self.columns)
+        if self.reads is None and aspect is not None:
+            self.reads = frozenset(aspect.all_of | aspect.some_of | aspect.exclude)
+
+    def __call__(self, func):
+        system = self
+
+        def run_on_columns():
+            for batch in system._batches():
+                arrays = batch.gather()
+                result = func(*arrays)
+                if result is not None:
+                    if len(system.columns) == 1:
+                        result = (result,)
+                    arrays = result
+                batch.scatter(arrays)
+
+        run_on_columns.__name__ = func.__name__
+        run_on_columns.__doc__ = func.__doc__
+        setattr(run_on_columns, 'system', self)
+        wrapped_func = call_hooks(run_on_columns)
+        setattr(self, func.__name__, wrapped_func)
+        if hasattr(self, 'world'):
+            self.world._compile_hooks(self, func.__name__)
+        return wrapped_func
+
+    def _batches(self):
+        storage = self.world.storage
+        if self.world.mapped:
+            ids = numpy.fromiter(storage.ids_with_aspect(self.aspect), dtype='q')
+            if len(ids):
+                yield _MappedBatch(storage, ids, self.columns)
+        elif storage is not None:
+            for archetype in storage.archetypes_with_aspect(self.aspect):
+                yield _ArchetypeBatch(archetype, self.columns)
+        else:
+            entities = list(self.world.entities_with_aspect(self.aspect))
+            if entities:
+                yield _EntityBatch(entities, self.columns)
+
+
+class _ArchetypeBatch(object):
+    """The columns of one Archetype table."""
+
+    def __init__(self, archetype, columns):
+        self.columns = [archetype.columns[key] for key in columns]
+
+    def gather(self):
+        arrays = []
+        for column in self.columns:
+            if isinstance(column, array):
+                arrays.append(numpy.frombuffer(column, dtype=column.typecode))
+            else:
+                arrays.append(numpy.array(column))
+        return arrays
+
+    def scatter(self, arrays):
+        for column, values in six.moves.zip(self.columns, arrays):
+            if isinstance(column, array):
+                target = numpy.frombuffer(column, dtype=column.typecode)
+                if values is not target:
+                    target[...] = values
+            else:
+                column[:] = numpy.asarray(values).tolist()
+
+
+class _MappedBatch(object):
+    """The rows of the matching Entities in memory-mapped columns."""
+
+    def __init__(self, storage, ids, columns):
+        self.targets = [numpy.frombuffer(storage.columns[key], dtype=storage.columns[key].format)
+                        for key in columns]
+        self.ids = ids
+
+    def gather(self):
+        return [target[self.ids] for target in self.targets]
+
+    def scatter(self, arrays):
+        for target, values in six.moves.zip(self.targets, arrays):
+            target[self.ids] = values
+
+
+class _EntityBatch(object):
+    """Slot values collected from individually stored Components."""
+
+    def __init__(self, entities, columns):
+        self.components = [[entity.get_component(component_type) for entity in entities]
+                           for component_type, _ in columns]
+        self.columns = columns
+
+    def gather(self):
+        arrays = []
+        for components, (component_type, slot) in six.moves.zip(self.components, self.columns):
+            dtype = component_type.__column_types__.get(slot)
+            arrays.append(numpy.array([getattr(component, slot) for component in components], dtype=dtype))
+        return arrays
+
+    def scatter(self, arrays):
+        for components, (_, slot), values in six.moves.zip(self.components, self.columns, arrays):
+            for component, value in six.moves.zip(components, numpy.asarray(values).tolist()):
+                setattr(component, slot, value)
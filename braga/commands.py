@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from itertools import groupby
+
+
+class CommandBuffer(object):
+    """ Records structural changes to a World so they can be applied together later.
+
+        Systems that loop over a World's Entities can make and destroy Entities,
+        and add and remove Components, through the World's `commands` instead of
+        the World itself. Nothing the World indexes changes until `apply`, which
+        the World calls at the start of every `step` and at the end of every
+        `refresh`.
+
+        Entities made through the buffer are returned straight away, so that
+        later commands can refer to them, but only join the World when the
+        buffer is applied. Until then, changes to their Components take effect
+        immediately.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.created = []
+        self.changes = []
+        self.destroyed = OrderedDict()
+
+    def __len__(self):
+        return len(self.created) + len(self.changes) + len(self.destroyed)
+
+    def make_entity(self, assemblage=None, **kwargs):
+        """ Makes an Entity that joins the World when the buffer is applied.
+            Takes the same arguments as `World.make_entity`.
+
+            Returns an Entity.
+        """
+        new_entity = self.world._create_entity(assemblage, kwargs, pending=True)
+        self.created.append(new_entity)
+        return new_entity
+
+    def destroy_entity(self, entity):
+        """Destroys an Entity when the buffer is applied, after any other commands for it."""
+        self.destroyed[entity] = None
+
+    def add_component(self, entity, component):
+        """Adds a Component to an Entity when the buffer is applied."""
+        if entity._world is None:
+            entity.components.add(component)
+        else:
+            self.changes.append((entity, component, True))
+
+    def remove_component(self, entity, component):
+        """Removes a Component from an Entity when the buffer is applied."""
+        if entity._world is None:
+            entity.components.discard(component)
+        else:
+            self.changes.append((entity, component, False))
+
+    def apply(self):
+        """ Applies every recorded command to the World, then empties the buffer.
+
+            New Entities are added in the order they were made, in one batch per run
+            of consecutive Entities with the same Composition, then Component
+            changes are made in the order they were recorded, then Entities are
+            destroyed. Destroying an Entity that is no longer in the World does
+            nothing.
+        """
+        created, changes, destroyed = self.created, self.changes, self.destroyed
+        self.created, self.changes, self.destroyed = [], [], OrderedDict()
+        world = self.world
+
+        for composition, entities in groupby(created, lambda entity: entity.components.composition):
+            entities = list(entities)
+            if world.storage is not None:
+                for entity in entities:
+                    world.storage.adopt(entity)
+            world._add_entities(entities, composition)
+
+        for entity, component, added in changes:
+            if added:
+                entity.components.add(component)
+            else:
+                entity.components.discard(component)
+
+        for entity in destroyed:
+            if entity._world is world:
+                world.destroy_entity(entity)
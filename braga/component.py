@@ -1,7 +1,249 @@
+import weakref
+
+import six
+
+
 class Component(object):
     """Base class to be inherited by user-defined Component types."""
 
     __slots__ = []
 
+    # Maps slot names to `array` typecodes for slots that hold numbers, so that
+    # columnar storage can keep them unboxed. Slots not listed are stored as objects.
+    __column_types__ = {}
+
     def __repr__(self):
         return type(self).__name__
+
+
+_slots_by_type = dict()
+
+
+def component_slots(component_type):
+    """ Returns the names of the slots declared by a Component type and its bases,
+        in declaration order, base classes first.
+    """
+    slots = _slots_by_type.get(component_type)
+    if slots is None:
+        slots = []
+        for klass in reversed(component_type.__mro__):
+            declared = klass.__dict__.get('__slots__', ())
+            if isinstance(declared, six.string_types):
+                declared = (declared,)
+            for slot in declared:
+                if slot not in ('__dict__', '__weakref__') and slot not in slots:
+                    slots.append(slot)
+        slots = _slots_by_type[component_type] = tuple(slots)
+    return slots
+
+
+class WeakMethod(object):
+    """ Calls a bound method without keeping the object it is bound to alive.
+        Once the object is collected, calls do nothing and `on_dead` is called with the WeakMethod.
+        Compares equal to the bound method it was made from.
+    """
+
+    def __init__(self, method, on_dead=None):
+        callback = None if on_dead is None else (lambda ref: on_dead(self))
+        self.target = weakref.ref(method.__self__, callback)
+        self.function = method.__func__
+
+    def __call__(self, *args, **kwargs):
+        target = self.target()
+        if target is not None:
+            return self.function(target, *args, **kwargs)
+
+    def __eq__(self, other):
+        if isinstance(other, WeakMethod):
+            return self.target() is other.target() and self.function is other.function
+        return getattr(other, '__self__', None) is self.target() and getattr(other, '__func__', None) is self.function
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = object.__hash__
+
+
+def is_bound_method(callback):
+    return getattr(callback, '__self__', None) is not None and getattr(callback, '__func__', None) is not None
+
+
+_slot_watchers = dict()
+_slot_checks = dict()
+
+
+def _declaring_class(component_type, slot):
+    for klass in component_type.__mro__:
+        if slot in klass.__dict__:
+            return klass
+    raise ValueError("{0} has no slot {1}".format(component_type.__name__, slot))
+
+
+def slot_watchers(component_type, slot, before=False):
+    """ Returns the list of callbacks watching assignments to a slot, or with `before`,
+        the callbacks checking assignments before they are made.
+        The list belongs to the class that declares the slot, so it is shared by every subclass.
+    """
+    registry = _slot_checks if before else _slot_watchers
+    key = (_declaring_class(component_type, slot), slot)
+    watchers = registry.get(key)
+    if watchers is None:
+        watchers = registry[key] = []
+    return watchers
+
+
+class TrackedSlot(object):
+    """ Stands in for a slot's member descriptor so that assignments to it can be watched.
+        Checks are called with the Component, the slot name and the new value before each
+        assignment, and can refuse it by raising; watchers are called the same way after it.
+    """
+
+    __slots__ = ['name', 'member', 'watchers', 'checks']
+
+    def __init__(self, name, member, watchers, checks):
+        self.name = name
+        self.member = member
+        self.watchers = watchers
+        self.checks = checks
+
+    def __get__(self, component, component_type=None):
+        if component is None:
+            return self
+        return self.member.__get__(component, component_type)
+
+    def __set__(self, component, value):
+        if self.checks:
+            for callback in tuple(self.checks):
+                callback(component, self.name, value)
+        self.member.__set__(component, value)
+        if self.watchers:
+            for callback in tuple(self.watchers):
+                callback(component, self.name, value)
+
+    def __delete__(self, component):
+        self.member.__delete__(component)
+
+
+def watch_slot(component_type, slot, callback, before=False):
+    """ Calls `callback(component, slot, value)` whenever `slot` is assigned on an instance of `component_type`.
+        With `before`, the callback is called before the assignment is made, and can refuse it by raising.
+
+        The first watcher of a slot replaces its descriptor on the declaring class with a TrackedSlot,
+        which is taken away again when the last watcher goes. Bound methods are held weakly, and
+        stop watching once the object they are bound to is collected.
+    """
+    if slot not in component_slots(component_type):
+        raise ValueError("{0} has no slot {1}".format(component_type.__name__, slot))
+    watchers = slot_watchers(component_type, slot, before)
+    klass = _declaring_class(component_type, slot)
+    descriptor = klass.__dict__[slot]
+    if not isinstance(descriptor, TrackedSlot):
+        setattr(klass, slot, TrackedSlot(slot, descriptor, slot_watchers(component_type, slot),
+                                         slot_watchers(component_type, slot, before=True)))
+    if is_bound_method(callback):
+        callback = WeakMethod(callback, lambda dead: _drop_watcher(klass, slot, watchers, dead))
+    watchers.append(callback)
+
+
+def unwatch_slot(component_type, slot, callback, before=False):
+    """Stops calling a callback added with `watch_slot`."""
+    watchers = slot_watchers(component_type, slot, before)
+    try:
+        watchers.remove(callback)
+    except ValueError:
+        raise ValueError("{0} is not watching {1}.{2}".format(repr(callback), component_type.__name__, slot))
+    _release_slot(_declaring_class(component_type, slot), slot)
+
+
+def _drop_watcher(klass, slot, watchers, dead):
+    for position, callback in enumerate(watchers):
+        if callback is dead:
+            del watchers[position]
+            break
+    _release_slot(klass, slot)
+
+
+def _release_slot(klass, slot):
+    """Puts back a slot's own descriptor once nothing watches or checks it."""
+    if _slot_watchers.get((klass, slot)) or _slot_checks.get((klass, slot)):
+        return
+    descriptor = klass.__dict__.get(slot)
+    if isinstance(descriptor, TrackedSlot):
+        setattr(klass, slot, descriptor.member)
+
+
+_attribute_watchers = dict()
+_own_setattrs = dict()
+
+
+def attribute_watchers(component_type):
+    """ Returns the list of callbacks watching assignments to the attributes that instances
+        of exactly `component_type` keep in their instance dictionary.
+    """
+    watchers = _attribute_watchers.get(component_type)
+    if watchers is None:
+        watchers = _attribute_watchers[component_type] = []
+    return watchers
+
+
+def _tracked_setattr(component_type, watchers, own_setattr):
+    """Makes a `__setattr__` for `component_type` that reports assignments to attributes other than its slots."""
+    slots = frozenset(component_slots(component_type))
+
+    def __setattr__(component, name, value):
+        if own_setattr is None:
+            super(component_type, component).__setattr__(name, value)
+        else:
+            own_setattr(component, name, value)
+        if watchers and name not in slots and type(component) is component_type:
+            for callback in tuple(watchers):
+                callback(component, name, value)
+    return __setattr__
+
+
+def watch_attributes(component_type, callback):
+    """ Calls `callback(component, name, value)` whenever an attribute kept in the instance
+        dictionary of an instance of exactly `component_type` is assigned.
+        Raises a ValueError if the type's instances have no instance dictionary.
+
+        The first watcher gives the type a `__setattr__` that reports such assignments, which is
+        taken away again when the last watcher goes. Bound methods are held weakly, as by `watch_slot`.
+    """
+    if not component_type.__dictoffset__:
+        raise ValueError("{} keeps no attributes in an instance dictionary".format(component_type.__name__))
+    watchers = attribute_watchers(component_type)
+    if component_type not in _own_setattrs:
+        own_setattr = _own_setattrs[component_type] = component_type.__dict__.get('__setattr__')
+        component_type.__setattr__ = _tracked_setattr(component_type, watchers, own_setattr)
+    if is_bound_method(callback):
+        callback = WeakMethod(callback, lambda dead: _drop_attribute_watcher(component_type, watchers, dead))
+    watchers.append(callback)
+
+
+def unwatch_attributes(component_type, callback):
+    """Stops calling a callback added with `watch_attributes`."""
+    watchers = attribute_watchers(component_type)
+    try:
+        watchers.remove(callback)
+    except ValueError:
+        raise ValueError("{0} is not watching the attributes of {1}".format(repr(callback), component_type.__name__))
+    _release_setattr(component_type)
+
+
+def _drop_attribute_watcher(component_type, watchers, dead):
+    for position, callback in enumerate(watchers):
+        if callback is dead:
+            del watchers[position]
+            break
+    _release_setattr(component_type)
+
+
+def _release_setattr(component_type):
+    """Puts back a type's own `__setattr__`, if it had one, once nothing watches its attributes."""
+    if _attribute_watchers.get(component_type) or component_type not in _own_setattrs:
+        return
+    own_setattr = _own_setattrs.pop(component_type)
+    if own_setattr is None:
+        del component_type.__setattr__
+    else:
+        component_type.__setattr__ = own_setattr
@@ -0,0 +1,115 @@
+_UNRESOLVED = object()
+
+_component_bits = dict()
+
+
+def component_bit(component_type):
+    """ Returns the bit assigned to a Component type for signature masks.
+        Bits are handed out the first time a type is seen.
+    """
+    bit = _component_bits.get(component_type)
+    if bit is None:
+        bit = _component_bits[component_type] = 1 << len(_component_bits)
+    return bit
+
+
+def signature_of(component_types):
+    """Returns the bitmask with the bit of every type in `component_types` set."""
+    signature = 0
+    for component_type in component_types:
+        signature |= component_bit(component_type)
+    return signature
+
+
+class Composition(object):
+    """ A particular combination of Component types.
+
+        Compositions are shared by every Entity with the same exact set of
+        Component types, so anything that depends only on those types (which
+        Component answers a given attribute name, which Component satisfies a
+        subclass lookup) is worked out once and reused by all of them.
+    """
+
+    _interned = dict()
+
+    def __init__(self, types):
+        self.types = types
+        self.signature = signature_of(types)
+        self.routes = dict()
+        self.write_routes = dict()
+        self.resolved = dict()
+        self.dict_types = tuple(t for t in types if t.__dictoffset__)
+        self._with = dict()
+        self._without = dict()
+
+    @classmethod
+    def of(cls, types):
+        """Returns the shared Composition for a collection of Component types."""
+        types = frozenset(types)
+        composition = cls._interned.get(types)
+        if composition is None:
+            composition = cls._interned[types] = cls(types)
+        return composition
+
+    def with_type(self, component_type):
+        """Returns the Composition that results from adding `component_type`."""
+        composition = self._with.get(component_type)
+        if composition is None:
+            composition = self._with[component_type] = Composition.of(self.types | set([component_type]))
+        return composition
+
+    def without_type(self, component_type):
+        """Returns the Composition that results from removing `component_type`."""
+        composition = self._without.get(component_type)
+        if composition is None:
+            composition = self._without[component_type] = Composition.of(self.types - set([component_type]))
+        return composition
+
+    def resolve(self, component_type):
+        """ Returns the type in this Composition that is `component_type` or a subclass of it,
+            or None if there is no such type.
+        """
+        resolved_type = self.resolved.get(component_type, _UNRESOLVED)
+        if resolved_type is _UNRESOLVED:
+            resolved_type = None
+            if component_type in self.types:
+                resolved_type = component_type
+            else:
+                for candidate in self.types:
+                    if issubclass(candidate, component_type):
+                        resolved_type = candidate
+                        break
+            self.resolved[component_type] = resolved_type
+        return resolved_type
+
+    def route(self, name):
+        """ Returns the Component type whose class defines the attribute `name`, or None.
+            Attributes that only live in instance dictionaries are not routed.
+        """
+        component_type = self.routes.get(name, _UNRESOLVED)
+        if component_type is _UNRESOLVED:
+            component_type = None
+            for candidate in self.types:
+                if hasattr(candidate, name):
+                    component_type = candidate
+                    break
+            self.routes[name] = component_type
+        return component_type
+
+    def write_route(self, name):
+        """ Returns the Component type that should receive assignments to `name`, or None.
+            Only names backed by a settable descriptor (a slot or a property with a setter) are routed.
+        """
+        component_type = self.write_routes.get(name, _UNRESOLVED)
+        if component_type is _UNRESOLVED:
+            component_type = self.route(name)
+            if component_type is not None and not _is_settable(getattr(component_type, name)):
+                component_type = None
+            self.write_routes[name] = component_type
+        return component_type
+
+
+def _is_settable(attribute):
+    if isinstance(attribute, property):
+        return attribute.fset is not None
+    return hasattr(type(attribute), '__set__')
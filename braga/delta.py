@@ -0,0 +1,256 @@
+""" Incremental checkpoints: a base snapshot plus an append-only log of deltas.
+
+    While a World is tracked, every Entity has a stable id: its index in the base
+    snapshot, or the next free number for Entities made since. Each delta record in
+    the log holds, for the Entities that changed since the previous record, the ids
+    of new Entities, the Component types that were removed, the full values of every
+    Component that was added or had a slot assigned, and the ids of destroyed
+    Entities. Records are written with the same tables as `braga.snapshot`, so the
+    cost of a checkpoint follows the number of changed Components, not the size of
+    the World.
+
+    Assignments are seen through `braga.component.watch_slot`, and for attributes
+    kept in a Component's instance dictionary, `braga.component.watch_attributes`.
+    Bulk column writes, such as those made by a ColumnSystem, are not seen, and
+    neither are values changed in place, such as a set held in a slot that has
+    something added to it. Tell the World about those with `World.mark_changed`,
+    or their Components are left out of the next checkpoint.
+
+    A Component that still refers to an Entity destroyed since tracking began is
+    written with None in place of the reference.
+"""
+import struct
+import weakref
+from array import array
+from collections import OrderedDict
+
+import six
+
+from braga import snapshot
+from braga.component import component_slots, unwatch_attributes, unwatch_slot, watch_attributes, watch_slot
+
+MAGIC = b'BRGD'
+FORMAT_VERSION = 1
+RECORD = struct.Struct('<4sIQI')  # magic, format version, timer, table count
+ID = struct.Struct('<q')
+
+
+class ChangeTracker(object):
+    """ Follows the changes made to a World since its last checkpoint.
+        Made by `World.track_changes`, which also writes the base snapshot.
+    """
+
+    def __init__(self, world, ids, log_path):
+        self.world = world
+        self.ids = dict(ids)
+        self.next_id = len(self.ids)
+        self.log_path = log_path
+        self.created = OrderedDict()
+        self.destroyed = []
+        self.dirty = dict()
+        self.removed = dict()
+        self.added = dict()
+        self.owners = dict()
+        self.gone = weakref.WeakKeyDictionary()
+        self.watched = []
+        for component_type, entities in six.iteritems(world.entities_by_component_type):
+            for entity in entities:
+                self.owners[entity.components._by_type[component_type]] = entity
+            self._watch(component_type)
+        open(log_path, 'wb').close()
+
+    def _watch(self, component_type):
+        if component_type in self.watched:
+            return
+        for slot in component_slots(component_type):
+            watch_slot(component_type, slot, self._slot_written)
+        if component_type.__dictoffset__:
+            watch_attributes(component_type, self._slot_written)
+        self.watched.append(component_type)
+
+    def close(self):
+        """Stops following changes."""
+        for component_type in self.watched:
+            for slot in component_slots(component_type):
+                unwatch_slot(component_type, slot, self._slot_written)
+            if component_type.__dictoffset__:
+                unwatch_attributes(component_type, self._slot_written)
+        self.watched = []
+        if self.world.change_tracker is self:
+            self.world.change_tracker = None
+        if self in self.world.trackers:
+            self.world.trackers.remove(self)
+
+    def _mark(self, entity, component_type):
+        types = self.dirty.get(entity)
+        if types is None:
+            types = self.dirty[entity] = set()
+        types.add(component_type)
+
+    def _slot_written(self, component, slot, value):
+        entity = self.owners.get(component)
+        if entity is not None:
+            self._mark(entity, getattr(type(component), '_component_type', type(component)))
+
+    def mark_changed(self, entity, component_type):
+        """ Includes an Entity's Component of `component_type` in the next checkpoint.
+            Raises a ValueError if the Entity has no such Component.
+        """
+        resolved_type = entity.components.composition.resolve(component_type)
+        if resolved_type is None:
+            raise ValueError("{0} has no component of type {1}".format(repr(entity), component_type.__name__))
+        if entity in self.ids:
+            self._mark(entity, resolved_type)
+
+    def entities_added(self, entities):
+        for entity in entities:
+            self.ids[entity] = self.next_id
+            self.next_id += 1
+            self.created[entity] = None
+            for component_type, component in six.iteritems(entity.components._by_type):
+                self.component_added(entity, component_type, component)
+
+    def entity_destroyed(self, entity):
+        for component in entity.components:
+            self.owners.pop(component, None)
+        self.gone[entity] = None
+        self.dirty.pop(entity, None)
+        self.removed.pop(entity, None)
+        self.added.pop(entity, None)
+        if entity in self.created:
+            del self.created[entity]
+        else:
+            self.destroyed.append(self.ids[entity])
+        del self.ids[entity]
+
+    def component_added(self, entity, component_type, component):
+        self.owners[component] = entity
+        self._mark(entity, component_type)
+        self._watch(component_type)
+        if entity not in self.created:
+            self.added.setdefault(entity, set()).add(component_type)
+
+    def component_removed(self, entity, component_type, component):
+        self.owners.pop(component, None)
+        if entity in self.dirty:
+            self.dirty[entity].discard(component_type)
+        added = self.added.get(entity)
+        if added is not None and component_type in added:
+            # Added since the last checkpoint, so the log has never seen it: nothing to remove.
+            added.discard(component_type)
+        elif entity not in self.created:
+            self.removed.setdefault(entity, set()).add(component_type)
+
+    def __len__(self):
+        """The number of changes waiting for the next checkpoint."""
+        return (len(self.created) + len(self.destroyed) + sum(len(types) for types in six.itervalues(self.dirty))
+                + sum(len(types) for types in six.itervalues(self.removed)))
+
+    def checkpoint(self):
+        """ Appends the changes since the last checkpoint to the log, then forgets them.
+            Returns the number of changes written.
+        """
+        changes = len(self)
+        entities_by_type = dict()
+        for entity, types in six.iteritems(self.dirty):
+            for component_type in types:
+                entities_by_type.setdefault(component_type, []).append(entity)
+        tables = sorted(six.iteritems(entities_by_type), key=lambda table: snapshot.type_name(table[0]))
+        removed = [(self.ids[entity], snapshot.type_name(component_type))
+                   for entity, types in six.iteritems(self.removed) for component_type in types]
+
+        with open(self.log_path, 'ab') as log:
+            log.write(RECORD.pack(MAGIC, FORMAT_VERSION, self.world.timer, len(tables)))
+            snapshot.write_array(log, array(snapshot.INDEX_TYPECODE, [self.ids[entity] for entity in self.created]))
+            log.write(snapshot.LENGTH.pack(len(removed)))
+            for entity_id, name in removed:
+                log.write(ID.pack(entity_id))
+                snapshot.write_string(log, name)
+            for component_type, entities in tables:
+                snapshot.write_table(log, component_type, [snapshot.component_chunk(entities, component_type)],
+                                     _StableIds(self.ids, self.gone))
+            snapshot.write_array(log, array(snapshot.INDEX_TYPECODE, self.destroyed))
+
+        self.created = OrderedDict()
+        self.destroyed = []
+        self.dirty = dict()
+        self.removed = dict()
+        self.added = dict()
+        return changes
+
+
+class _StableIds(object):
+    """The stable ids of a tracked World's Entities, with None for the Entities destroyed since tracking began."""
+
+    def __init__(self, ids, gone):
+        self.ids = ids
+        self.gone = gone
+
+    def __getitem__(self, entity):
+        try:
+            return self.ids[entity]
+        except KeyError:
+            if entity in self.gone:
+                return None
+            raise
+
+
+def replay(world, entities, log_path):
+    """ Applies every delta record in `log_path` to a World loaded from the base snapshot.
+        :param entities: the World's Entities in snapshot index order
+
+        Returns a dictionary of stable ids to the World's Entities.
+    """
+    by_id = dict(enumerate(entities))
+    with open(log_path, 'rb') as log:
+        while True:
+            header = log.read(RECORD.size)
+            if not header:
+                break
+            if len(header) != RECORD.size:
+                raise ValueError("Delta log ends unexpectedly")
+            magic, format_version, timer, table_count = RECORD.unpack(header)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                raise ValueError("{} is not a delta log".format(log_path))
+            _replay_record(world, by_id, log, table_count)
+            world.timer = timer
+    return by_id
+
+
+def _replay_record(world, by_id, log, table_count):
+    for entity_id in snapshot.read_array(log, snapshot.INDEX_TYPECODE):
+        by_id[entity_id] = world.make_entity()
+
+    for _ in six.moves.range(snapshot.read_length(log)):
+        entity_id, = ID.unpack(snapshot.read_exactly(log, ID.size))
+        component_type = snapshot.resolve_type(snapshot.read_string(log))
+        component = by_id[entity_id].components._by_type.get(component_type)
+        if component is not None:
+            by_id[entity_id].remove_component(component)
+
+    for _ in six.moves.range(table_count):
+        component_type, slots, chunks = snapshot.read_table(log, by_id)
+        for rows, columns in chunks:
+            for position, entity_id in enumerate(rows):
+                _apply_values(by_id[entity_id], component_type, slots, [column[position] for column in columns])
+
+    for entity_id in snapshot.read_array(log, snapshot.INDEX_TYPECODE):
+        world.destroy_entity(by_id.pop(entity_id))
+
+
+def _apply_values(entity, component_type, slots, values):
+    component = entity.components._by_type.get(component_type)
+    if component is None:
+        component = object.__new__(component_type)
+        _set_values(component, slots, values)
+        entity.add_component(component)
+    else:
+        _set_values(component, slots, values)
+
+
+def _set_values(component, slots, values):
+    for slot, value in zip(slots, values):
+        if slot == snapshot.DICT_SLOT:
+            component.__dict__.update(value)
+        elif value is not snapshot.UNSET:
+            setattr(component, slot, value)
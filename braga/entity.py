@@ -1,51 +1,248 @@
 import six
 import uuid
 
+from braga.composition import Composition
+
+try:
+    from collections.abc import MutableSet
+except ImportError:  # Python 2
+    from collections import MutableSet
+
+
+class ComponentSet(MutableSet):
+    """ The Components belonging to an Entity, stored by Component type.
+
+        Behaves like a set of Components, but an Entity may only hold one
+        Component of any given type. Lookups that only depend on which types
+        are present are answered by the shared Composition for those types.
+    """
+
+    __slots__ = ['_by_type', '_entity', 'composition']
+
+    def __init__(self, components=None, entity=None):
+        self._by_type = dict()
+        self._entity = entity
+        self.composition = Composition.of(())
+        if components:
+            for component in components:
+                self.add(component)
+
+    def __contains__(self, component):
+        return self._by_type.get(type(component)) is component
+
+    def __iter__(self):
+        return six.itervalues(self._by_type)
+
+    def __len__(self):
+        return len(self._by_type)
+
+    def __repr__(self):
+        return repr(set(six.itervalues(self._by_type)))
+
+    def add(self, component):
+        component_type = type(component)
+        existing = self._by_type.get(component_type)
+        if existing is component:
+            return
+        self._check_change()
+        if existing is not None:
+            raise ValueError("Entity already has a component of type {}".format(component_type.__name__))
+        self._by_type[component_type] = component
+        self.composition = self.composition.with_type(component_type)
+        self._notify(component_type, component, True)
+
+    def discard(self, component):
+        if component in self:
+            self._check_change()
+            component_type = type(component)
+            del self._by_type[component_type]
+            self.composition = self.composition.without_type(component_type)
+            self._notify(component_type, component, False)
+
+    def _check_change(self):
+        """Raises a ValueError if the World the Entity belongs to cannot change its indexes right now."""
+        entity = self._entity
+        if entity is not None and entity._world is not None:
+            entity._world._check_structure()
+
+    def _notify(self, component_type, component, added):
+        """Tells the World the Entity belongs to, if any, that its Components changed."""
+        entity = self._entity
+        if entity is not None and entity._world is not None:
+            if added:
+                entity._world._component_added(entity, component_type, component)
+            else:
+                entity._world._component_removed(entity, component_type, component)
+
+    def types(self):
+        """Returns the exact types of the Components in the set."""
+        return self.composition.types
+
+    def get(self, component_type):
+        """Returns the Component that is an instance of `component_type`, or None."""
+        component = self._by_type.get(component_type)
+        if component is not None:
+            return component
+        resolved_type = self.composition.resolve(component_type)
+        if resolved_type is None:
+            return None
+        return self._by_type[resolved_type]
+
+    def _read(self, component_type, name):
+        """Reads attribute `name` of the Component of exactly `component_type`."""
+        return getattr(self._by_type[component_type], name)
+
+    def _assign(self, name, value):
+        """ Assigns `value` to the Component that owns `name`.
+            Returns False, assigning nothing, if no Component owns it.
+        """
+        component = self._owner_of(name)
+        if component is None:
+            return False
+        setattr(component, name, value)
+        return True
+
+    def _owner_of(self, name):
+        """Returns the Component that assignments to `name` should go to, or None."""
+        component_type = self.composition.write_route(name)
+        if component_type is not None:
+            return self._by_type[component_type]
+        for component_type in self.composition.dict_types:
+            component = self._by_type[component_type]
+            if name in component.__dict__:
+                return component
+        return None
+
+
+# Attributes the Entity keeps for itself, rather than reading or writing its Components.
+_ENTITY_FIELDS = frozenset(['_uuid', '_id', '_world', '_archetype', '_row', 'components'])
+
 
 class Entity(object):
     """Represents a unique object."""
 
     def __init__(self):
-        self._uuid = uuid.uuid4()
-        self.components = set()
+        self.__dict__.update({'_uuid': None, '_id': None, '_world': None, 'components': ComponentSet(entity=self)})
+
+    @classmethod
+    def blank(cls):
+        """ Makes an Entity without running `__init__` or the attribute routing.
+            It has no ComponentSet until one is put in its `__dict__` as `components`.
+        """
+        entity = object.__new__(cls)
+        entity.__dict__.update({'_uuid': None, '_id': None, '_world': None})
+        return entity
 
     @property
     def uuid(self):
-        """Property to access the Entity's uuid, exists to prevent uuid modification."""
+        """ Property to access the Entity's uuid, exists to prevent uuid modification.
+            The uuid is only generated the first time it is asked for.
+        """
+        if self._uuid is None:
+            self.__dict__['_uuid'] = uuid.uuid4()
         return self._uuid
 
+    @property
+    def eid(self):
+        """ The Entity's integer id, if it belongs to a World that hands them out. Otherwise None.
+            Named so that it does not hide a Component attribute called `id`.
+        """
+        return self._id
+
+    @property
+    def signature(self):
+        """Bitmask of the Entity's Component types, see `braga.composition.component_bit`."""
+        return self.components.composition.signature
+
     def get_component(self, component_type):
         """ Retrives the component of a particular type belonging to this Entity.
             Raises an AttributeError if the Entity does not have a component of that class.
         """
 
-        components = [comp for comp in self.components if isinstance(comp, component_type)]
-        if not components:
+        component = self.components.get(component_type)
+        if component is None:
             raise AttributeError
-        else:
-            return components[0]
+        return component
 
     def has_component(self, component_type):
         """Determines if the Entity has a component of the given type."""
-        return any(isinstance(comp, component_type) for comp in self.components)
+        return self.components.get(component_type) is not None
+
+    def add_component(self, component):
+        """ Gives the Entity a Component, telling its World if it has one.
+            Raises a ValueError if the Entity already has a component of that class.
+
+            Returns the Component as the Entity holds it, which for Entities kept in
+            columns is a view of the Component rather than the instance passed in.
+        """
+        self.components.add(component)
+        return self.components.get(component.__class__)
+
+    def remove_component(self, component):
+        """ Takes a Component, or the component of a given class, away from the Entity, telling its World if it has one.
+            Raises a ValueError if the Entity does not have it.
+
+            Returns the removed Component.
+        """
+        if isinstance(component, type):
+            component_type, component = component, self.components.get(component)
+            if component is None:
+                raise ValueError("Entity has no component of type {}".format(component_type.__name__))
+        elif component not in self.components:
+            raise ValueError("{0} does not belong to {1}".format(repr(component), repr(self)))
+        self.components.discard(component)
+        return component
 
     def __repr__(self):
-        return "{0}({1}) - {2}".format(type(self).__name__, self._uuid, self.components)
+        return "{0}({1}) - {2}".format(type(self).__name__, self.uuid, self.components)
 
     def __getattr__(self, name):
         """ Checks components for an attribute with a given name.
             Only raise an AttributeError if none of the Entity's components
             have an attribute with that name.
+
+            The Component to ask is looked up in the routing table shared by
+            every Entity with the same Composition; only Components that keep
+            attributes in an instance dictionary need to be checked individually.
         """
 
-        for component in self.components:
-            try:
-                attr = getattr(component, name)
-            except AttributeError:
-                pass
-            else:
-                return attr
-        raise AttributeError
+        if name.startswith('__') or name == 'components':
+            raise AttributeError(name)
+
+        components = self.components
+        composition = components.composition
+        component_type = composition.routes.get(name)
+        if component_type is None and name not in composition.routes:
+            component_type = composition.route(name)
+        if component_type is not None:
+            return components._read(component_type, name)
+
+        for component_type in composition.dict_types:
+            instance_dict = components._by_type[component_type].__dict__
+            if name in instance_dict:
+                return instance_dict[name]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        """ Assigns to the Component that owns `name`, if there is one.
+            Otherwise the attribute is set on the Entity itself.
+            The Entity's own fields are never routed to its Components.
+        """
+
+        components = self.__dict__.get('components')
+        if (components is not None and name not in self.__dict__ and name not in _ENTITY_FIELDS
+                and components._assign(name, value)):
+            return
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        components = self.__dict__.get('components')
+        if components is not None and name not in self.__dict__ and name not in _ENTITY_FIELDS:
+            component = components._owner_of(name)
+            if component is not None:
+                delattr(component, name)
+                return
+        object.__delattr__(self, name)
 
     @property
     def component_values(self):
@@ -89,6 +89,7 @@ class ExpelliarmusSkill(Component):
     """Ability to cast expelliarmus, stores skill at casting expelliarmus. For players."""
 
     __slots__ = ['skill']
+    __column_types__ = {'skill': 'd'}
 
     def __init__(self):
         self.skill = 0
@@ -0,0 +1,75 @@
+import six
+
+INDEX_BITS = 32
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+
+class EntityHandles(object):
+    """ Hands out dense integer ids for Entities and maps ids back to Entities.
+
+        An id packs a slot index into its low `INDEX_BITS` bits and the slot's
+        generation above them. Slots are recycled once their Entity is released,
+        and their generation is bumped, so ids held for a released Entity are
+        recognisably stale rather than silently pointing at its replacement.
+    """
+
+    def __init__(self):
+        self.entities = []
+        self.generations = []
+        self.free = []
+
+    def __len__(self):
+        return len(self.entities) - len(self.free)
+
+    def allocate(self, entity):
+        """Gives `entity` an id, reusing a released slot if there is one."""
+        if self.free:
+            index = self.free.pop()
+        else:
+            index = len(self.entities)
+            self.entities.append(None)
+            self.generations.append(0)
+        self.entities[index] = entity
+        entity_id = entity.__dict__['_id'] = (self.generations[index] << INDEX_BITS) | index
+        return entity_id
+
+    def restore(self, entities, entity_ids):
+        """ Gives `entities` the ids they were saved with, replacing the ids they were allocated.
+            Entities saved with an id of -1 get new ids. Every slot without an Entity is free.
+        """
+        size = max([entity_id & INDEX_MASK for entity_id in entity_ids if entity_id >= 0] or [-1]) + 1
+        self.entities = [None] * size
+        self.generations = [0] * size
+        unsaved = []
+        for entity, entity_id in zip(entities, entity_ids):
+            if entity_id < 0:
+                unsaved.append(entity)
+                continue
+            index = entity_id & INDEX_MASK
+            if self.entities[index] is not None:
+                raise ValueError("Two Entities were saved with the id {}".format(entity_id))
+            self.entities[index] = entity
+            self.generations[index] = entity_id >> INDEX_BITS
+            entity.__dict__['_id'] = entity_id
+        self.free = [index for index in six.moves.range(size - 1, -1, -1) if self.entities[index] is None]
+        for entity in unsaved:
+            self.allocate(entity)
+
+    def release(self, entity):
+        """Frees the slot of `entity`, making its id stale."""
+        index = entity._id & INDEX_MASK
+        self.entities[index] = None
+        self.generations[index] += 1
+        self.free.append(index)
+
+    def get(self, entity_id):
+        """Returns the Entity with `entity_id`, or None if there is none."""
+        index = entity_id & INDEX_MASK
+        if index < len(self.entities) and self.generations[index] == entity_id >> INDEX_BITS:
+            return self.entities[index]
+        return None
+
+    def is_stale(self, entity_id):
+        """Determines if `entity_id` belonged to an Entity whose slot has since been released."""
+        index = entity_id & INDEX_MASK
+        return index < len(self.entities) and self.generations[index] > entity_id >> INDEX_BITS
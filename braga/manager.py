@@ -1,26 +1,392 @@
+import weakref
+from bisect import bisect_left
 from collections import defaultdict
 
+import six
+
+from braga.component import WeakMethod, component_slots, unwatch_slot, watch_slot
+
 
 class Manager(object):
-    """Collates state for all instances of a given Component."""
+    """ Collates state for all instances of a given Component.
+
+        Registered Entities are indexed by the value of each registered property
+        in `entities_by_<property>`, a dictionary of values to sets of Entities.
+        Properties that are slots of the Component type are watched, so the
+        indexes follow assignments to them; bulk column writes, such as those
+        made by a ColumnSystem, are not seen. Given a World, the Manager also
+        unregisters Entities that lose the Component or are destroyed. Neither
+        the watchers nor the World keep the Manager alive; `close` stops both
+        straight away.
 
-    def __init__(self, component_type, properties_to_register=None):
+        Registered properties named in `sorted_properties` are also kept in a
+        SortedIndex, for range queries, top-k and ordered iteration.
+
+        `composite_keys` and `unique_keys` map key names to the parts of each key:
+        a property name of the Component type, a (Component type, slot) pair for
+        another Component of the Entity, or a sequence of those. Composite keys are
+        kept in `entities_by_<key>`, a dictionary of values to sets of Entities;
+        unique keys in `entity_by_<key>`, a dictionary of values to one Entity.
+        Keys with one part are looked up by that part's value, others by a tuple.
+        Registering an Entity whose unique key is taken raises a ValueError, as does
+        assigning a slot so that a registered Entity would take another's unique key;
+        the assignment is then refused, leaving the Component and indexes unchanged.
+    """
+
+    def __init__(self, component_type, properties_to_register=None, world=None, sorted_properties=(),
+                 composite_keys=None, unique_keys=None):
         self.component_type = component_type
         self.entities_by_component = dict()
+        self.components_by_entity = dict()
+        self.registered_values = dict()
 
         if not properties_to_register:
             properties_to_register = self.component_type.__slots__
         self.properties_to_register = properties_to_register
 
+        self.registries = dict()
         for prop in self.properties_to_register:
             dict_name = "entities_by_{}".format(prop)
-            setattr(self, dict_name, defaultdict(list))
+            registry = self.registries[prop] = defaultdict(set)
+            setattr(self, dict_name, registry)
+
+        self.sorted_indexes = dict()
+        self.sequence_numbers = dict()
+        self.next_sequence_number = 0
+        for prop in sorted_properties:
+            if prop not in self.registries:
+                raise ValueError("Cannot sort by {}, it is not registered".format(prop))
+            self.sorted_indexes[prop] = SortedIndex()
+
+        self.key_parts = dict()
+        self.key_indexes = dict()
+        self.unique_keys = set()
+        self.keys_by_slot = defaultdict(list)
+        self.key_values = dict()
+        self.entities_by_part = dict()
+        self.parts_by_entity = dict()
+        for keys, unique in ((composite_keys, False), (unique_keys, True)):
+            for name, parts in six.iteritems(keys or {}):
+                if name in self.key_parts:
+                    raise ValueError("Key {} is declared twice".format(name))
+                parts = self.key_parts[name] = self._parse_key(parts)
+                if unique:
+                    self.unique_keys.add(name)
+                    index = self.key_indexes[name] = dict()
+                    setattr(self, "entity_by_{}".format(name), index)
+                else:
+                    index = self.key_indexes[name] = defaultdict(set)
+                    setattr(self, "entities_by_{}".format(name), index)
+                for _, slot in parts:
+                    self.keys_by_slot[slot].append(name)
+
+        self.watched = []
+        own_properties = set(self.properties_to_register)
+        part_types = set()
+        for parts in six.itervalues(self.key_parts):
+            for part_type, slot in parts:
+                if part_type is component_type:
+                    own_properties.add(slot)
+                else:
+                    part_types.add(part_type)
+                    if slot in component_slots(part_type):
+                        self._watch(part_type, slot, self._part_changed)
+                        if self.unique_keys:
+                            self._watch(part_type, slot, self._check_part, before=True)
+        slots = component_slots(component_type)
+        for prop in own_properties:
+            if prop in slots:
+                self._watch(component_type, prop, self._value_changed)
+                if prop in self.keys_by_slot and self.unique_keys:
+                    self._watch(component_type, prop, self._check_value, before=True)
+
+        self.world = world
+        self.observed_types = []
+        if world is not None:
+            for observed_type in [component_type] + list(part_types):
+                observer = WeakMethod(self._component_removed, self._stop_observing(observed_type))
+                world.on_removed(observed_type, observer)
+                self.observed_types.append(observed_type)
+
+    def _stop_observing(self, observed_type):
+        """Returns a callback that takes a collected Manager's observer out of the World."""
+        world = weakref.ref(self.world)
+
+        def stop(dead):
+            callbacks = world().removed_observers.get(observed_type, []) if world() is not None else []
+            for position, callback in enumerate(callbacks):
+                if callback is dead:
+                    del callbacks[position]
+                    break
+        return stop
+
+    def _parse_key(self, parts):
+        if isinstance(parts, six.string_types) or (isinstance(parts, tuple) and parts and isinstance(parts[0], type)):
+            parts = [parts]
+        parsed = []
+        for part in parts:
+            if isinstance(part, six.string_types):
+                part = (self.component_type, part)
+            parsed.append(tuple(part))
+        return tuple(parsed)
+
+    def _watch(self, component_type, slot, callback, before=False):
+        if (component_type, slot, callback, before) not in self.watched:
+            watch_slot(component_type, slot, callback, before)
+            self.watched.append((component_type, slot, callback, before))
 
     def register(self, entity):
+        """ Indexes an Entity by the registered properties of its Component.
+            Registering an Entity again re-indexes it.
+        """
         component = entity.get_component(self.component_type)
+        keys = dict((name, self._key_value(entity, name)) for name in self.key_parts)
+        for name in self.unique_keys:
+            holder = self.key_indexes[name].get(keys[name])
+            if holder is not None and holder is not entity and holder is not self.entities_by_component.get(component):
+                raise ValueError("{0} {1!r} already belongs to {2}".format(name, keys[name], repr(holder)))
+
+        previous = self.components_by_entity.get(entity)
+        if previous is not None:
+            self._forget(previous)
+        if component in self.entities_by_component:
+            self._forget(component)
         self.entities_by_component[component] = entity
+        self.components_by_entity[entity] = component
 
+        values = self.registered_values[component] = dict()
         for prop in self.properties_to_register:
-            registry_name = "entities_by_{}".format(prop)
-            registry = getattr(self, registry_name)
-            registry[getattr(component, prop)].append(entity)
+            value = values[prop] = getattr(component, prop)
+            self.registries[prop][value].add(entity)
+        if self.sorted_indexes:
+            sequence_number = self.sequence_numbers[entity] = self.next_sequence_number
+            self.next_sequence_number += 1
+            for prop, index in six.iteritems(self.sorted_indexes):
+                index.add(values[prop], entity, sequence_number)
+
+        self.key_values[entity] = keys
+        for name, key in six.iteritems(keys):
+            if name in self.unique_keys:
+                self.key_indexes[name][key] = entity
+            else:
+                self.key_indexes[name][key].add(entity)
+        parts = self.parts_by_entity[entity] = set(
+            entity.get_component(part_type) for parts in six.itervalues(self.key_parts)
+            for part_type, _ in parts if part_type is not self.component_type)
+        for part in parts:
+            self.entities_by_part[part] = entity
+
+    def _key_value(self, entity, name, change=None):
+        """ Returns the value of a key for an Entity.
+            `change` may give a (Component, slot, value) assignment to use in place of the slot's current value.
+        """
+        values = []
+        for part_type, slot in self.key_parts[name]:
+            component = entity.get_component(part_type)
+            if change is not None and change[0] is component and change[1] == slot:
+                values.append(change[2])
+            else:
+                values.append(getattr(component, slot))
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def unregister(self, entity):
+        """ Removes an Entity from the indexes.
+            Raises a ValueError if the Entity is not registered.
+        """
+        component = self.components_by_entity.get(entity)
+        if component is None:
+            raise ValueError("{0} is not registered with {1}".format(repr(entity), repr(self)))
+        self._forget(component)
+
+    def entities_in_range(self, prop, low=None, high=None, include_low=True, include_high=True):
+        """ Returns the registered Entities whose value of a sorted property lies between `low` and `high`,
+            in ascending order. Either bound may be None to leave that end open.
+        """
+        return self._sorted_index(prop).range(low, high, include_low, include_high)
+
+    def top(self, prop, count, largest=True):
+        """Returns up to `count` registered Entities with the largest (or smallest) values of a sorted property."""
+        return self._sorted_index(prop).top(count, largest)
+
+    def ordered(self, prop, reverse=False):
+        """Iterates over the registered Entities in order of a sorted property."""
+        index = self._sorted_index(prop)
+        return reversed(index.entities) if reverse else iter(index.entities)
+
+    def _sorted_index(self, prop):
+        try:
+            return self.sorted_indexes[prop]
+        except KeyError:
+            raise ValueError("{} is not a sorted property".format(prop))
+
+    def close(self):
+        """Stops following changes to Components and to the World."""
+        for component_type, slot, callback, before in self.watched:
+            unwatch_slot(component_type, slot, callback, before)
+        self.watched = []
+        if self.world is not None:
+            for observed_type in self.observed_types:
+                self.world.stop_observing(observed_type, self._component_removed)
+            self.observed_types = []
+            self.world = None
+
+    def _forget(self, component):
+        entity = self.entities_by_component.pop(component)
+        del self.components_by_entity[entity]
+        values = self.registered_values.pop(component)
+        for prop, value in six.iteritems(values):
+            self._discard(self.registries[prop], value, entity)
+        if self.sorted_indexes:
+            sequence_number = self.sequence_numbers.pop(entity)
+            for prop, index in six.iteritems(self.sorted_indexes):
+                index.discard(values[prop], entity, sequence_number)
+        for name, key in six.iteritems(self.key_values.pop(entity)):
+            self._discard_key(name, key, entity)
+        for part in self.parts_by_entity.pop(entity):
+            del self.entities_by_part[part]
+
+    def _discard_key(self, name, key, entity):
+        index = self.key_indexes[name]
+        if name in self.unique_keys:
+            if index.get(key) is entity:
+                del index[key]
+        else:
+            self._discard(index, key, entity)
+
+    def _rekey(self, entity, slot):
+        """ Moves an Entity to new keys after a slot they are built from changes.
+            Raises a ValueError if the change takes a unique key that belongs to another Entity,
+            in which case the Entity is left out of that key's index.
+        """
+        keys = self.key_values[entity]
+        for name in self.keys_by_slot.get(slot, ()):
+            key = self._key_value(entity, name)
+            if name in keys:
+                if keys[name] == key:
+                    continue
+                self._discard_key(name, keys.pop(name), entity)
+            index = self.key_indexes[name]
+            if name in self.unique_keys:
+                holder = index.get(key)
+                if holder is not None:
+                    raise ValueError("{0} {1!r} already belongs to {2}".format(name, key, repr(holder)))
+                index[key] = entity
+            else:
+                index[key].add(entity)
+            keys[name] = key
+
+    @staticmethod
+    def _discard(registry, value, entity):
+        entities = registry.get(value)
+        if entities is not None:
+            entities.discard(entity)
+            if not entities:
+                del registry[value]
+
+    def _value_changed(self, component, prop, value):
+        entity = self.entities_by_component.get(component)
+        if entity is None:
+            return
+        if prop in self.keys_by_slot:
+            self._rekey(entity, prop)
+        if prop not in self.registries:
+            return
+        values = self.registered_values[component]
+        registry = self.registries[prop]
+        self._discard(registry, values[prop], entity)
+        index = self.sorted_indexes.get(prop)
+        if index is not None:
+            sequence_number = self.sequence_numbers[entity]
+            index.discard(values[prop], entity, sequence_number)
+            index.add(value, entity, sequence_number)
+        values[prop] = value
+        registry[value].add(entity)
+
+    def _check_unique(self, entity, component, slot, value):
+        """Raises a ValueError if assigning `value` to a slot would give an Entity another Entity's unique key."""
+        for name in self.keys_by_slot.get(slot, ()):
+            if name in self.unique_keys:
+                key = self._key_value(entity, name, (component, slot, value))
+                holder = self.key_indexes[name].get(key)
+                if holder is not None and holder is not entity:
+                    raise ValueError("{0} {1!r} already belongs to {2}".format(name, key, repr(holder)))
+
+    def _check_value(self, component, slot, value):
+        entity = self.entities_by_component.get(component)
+        if entity is not None:
+            self._check_unique(entity, component, slot, value)
+
+    def _check_part(self, component, slot, value):
+        entity = self.entities_by_part.get(component)
+        if entity is not None:
+            self._check_unique(entity, component, slot, value)
+
+    def _part_changed(self, component, slot, value):
+        entity = self.entities_by_part.get(component)
+        if entity is not None:
+            self._rekey(entity, slot)
+
+    def _component_removed(self, entity, component):
+        if component in self.entities_by_component:
+            self._forget(component)
+        elif component in self.entities_by_part:
+            self._forget(self.components_by_entity[entity])
+
+
+# Sorts after every sequence number, so that (value, _AFTER_ALL) follows every key with that value.
+_AFTER_ALL = float('inf')
+
+
+class SortedIndex(object):
+    """ Entities ordered by the value of one property.
+
+        Keeps (value, sequence number) keys and the Entities in two parallel lists,
+        so that range and top-k lookups bisect the keys and slice the Entities.
+        Each Entity is added with a sequence number unique within the index, which
+        breaks ties between equal values, so an Entity is found by bisecting however
+        many others share its value. Entities whose value is None are left out.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.entities = []
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def add(self, value, entity, sequence_number):
+        if value is None:
+            return
+        key = (value, sequence_number)
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.entities.insert(position, entity)
+
+    def discard(self, value, entity, sequence_number):
+        if value is None:
+            return
+        position = bisect_left(self.keys, (value, sequence_number))
+        if position < len(self.keys) and self.entities[position] is entity:
+            del self.keys[position]
+            del self.entities[position]
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        """Returns the Entities with values between `low` and `high`, in ascending order."""
+        start = 0
+        if low is not None:
+            start = bisect_left(self.keys, (low,) if include_low else (low, _AFTER_ALL))
+        end = len(self.keys)
+        if high is not None:
+            end = bisect_left(self.keys, (high, _AFTER_ALL) if include_high else (high,))
+        return self.entities[start:end]
+
+    def top(self, count, largest=True):
+        """Returns up to `count` Entities with the largest values, largest first, or the smallest, smallest first."""
+        if count <= 0:
+            return []
+        if largest:
+            return self.entities[:-count - 1:-1]
+        return self.entities[:count]
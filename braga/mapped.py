@@ -0,0 +1,487 @@
+""" Component storage in memory-mapped files, for Worlds larger than memory.
+
+    A World made with `storage='mmap'` keeps every Component slot in a file of
+    fixed-width values, one file per (Component type, slot), indexed by Entity id.
+    A further file holds a 64-bit mask per id: one bit per Component type the
+    Entity has, plus a bit marking ids that are in use. The operating system's
+    page cache decides which parts are in memory.
+
+    Entities and their Components only exist as Python objects while something
+    uses them. `entities_with_aspect` and `get_entity` scan the masks, with numpy
+    when it is installed, and materialise the matching Entities, whose Components are views reading and
+    writing the mapped columns. Every slot of a Component type kept this way must
+    be listed in its `__column_types__`, and a store can hold up to 63 types.
+
+    `flush` writes the store's catalog and syncs the files, after which a World
+    made with the same path reopens the store; ids of Entities made by a
+    CommandBuffer but not yet applied are saved as free. `close`, which
+    `World.close` calls, also unmaps the files. Columns are written in the
+    machine's native byte order.
+
+    Materialised Entities are only held weakly by the store, and their
+    Component sets only hold them weakly in turn, so an Entity nothing else
+    uses is freed at once rather than left for the garbage collector.
+"""
+import json
+import mmap
+import os
+import weakref
+from array import array
+
+import six
+
+try:
+    import numpy
+except ImportError:  # numpy is an optional dependency
+    numpy = None
+
+from braga.component import component_slots, slot_watchers
+from braga.composition import Composition
+from braga.entity import ComponentSet, Entity
+from braga.snapshot import resolve_type, type_name
+
+FORMAT_VERSION = 1
+CATALOG = 'catalog.json'
+MASKS = 'entities.mask'
+IN_USE = 1 << 63
+MAX_TYPES = 63
+INITIAL_CAPACITY = 1024
+
+
+class MappedColumn(object):
+    """One file of fixed-width values, mapped into memory and grown on demand."""
+
+    def __init__(self, path, typecode, capacity):
+        self.typecode = typecode
+        self.itemsize = array(typecode).itemsize
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self._map = None
+        self._bytes = None
+        self.values = None
+        self.resize(capacity)
+
+    def resize(self, capacity):
+        """Remaps the file to hold `capacity` values, extending it if needed."""
+        self._unmap()
+        size = capacity * self.itemsize
+        if os.fstat(self._file.fileno()).st_size < size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._bytes = memoryview(self._map)
+        self.values = self._bytes.cast(self.typecode)
+
+    def _unmap(self):
+        if self._map is not None:
+            self.values.release()
+            self._bytes.release()
+            self._map.close()
+            self._map = self._bytes = self.values = None
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._unmap()
+        self._file.close()
+
+
+class MappedSlot(object):
+    """ Stands in for a Component slot on a mapped view, reading and writing the view's row.
+        Assignments are checked and reported by the slot's watchers, see `braga.component.watch_slot`.
+    """
+
+    __slots__ = ['key', 'watchers', 'checks']
+
+    def __init__(self, component_type, name):
+        self.key = (component_type, name)
+        self.watchers = slot_watchers(component_type, name)
+        self.checks = slot_watchers(component_type, name, before=True)
+
+    def __get__(self, view, view_type=None):
+        if view is None:
+            return self
+        return view._store.columns[self.key][view._id]
+
+    def __set__(self, view, value):
+        if self.checks:
+            for callback in tuple(self.checks):
+                callback(view, self.key[1], value)
+        view._store.columns[self.key][view._id] = value
+        if self.watchers:
+            for callback in tuple(self.watchers):
+                callback(view, self.key[1], value)
+
+    def __delete__(self, view):
+        raise AttributeError("Column slots cannot be deleted")
+
+
+_view_classes = dict()
+
+
+def view_class(component_type):
+    """Returns the class of views onto the mapped columns of a Component type."""
+    cls = _view_classes.get(component_type)
+    if cls is None:
+        namespace = {
+            '__slots__': ['_store', '_id'],
+            '__module__': component_type.__module__,
+            '_component_type': component_type,
+        }
+        for slot in component_slots(component_type):
+            namespace[slot] = MappedSlot(component_type, slot)
+        cls = _view_classes[component_type] = type(component_type.__name__, (component_type,), namespace)
+    return cls
+
+
+def make_view(component_type, store, entity_id):
+    view = object.__new__(view_class(component_type))
+    view._store = store
+    view._id = entity_id
+    return view
+
+
+class _DetachedValues(object):
+    """Holds the values of a view whose Component has left the store."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+
+def _detach(view, store):
+    component_type = view._component_type
+    view._store = _DetachedValues(dict(
+        ((component_type, slot), [store.columns[(component_type, slot)][view._id]])
+        for slot in component_slots(component_type)))
+    view._id = 0
+
+
+class MappedComponentSet(ComponentSet):
+    """ The Components of an Entity kept in a MappedStorage.
+
+        Holds views rather than Component instances. Adding a Component copies
+        its values into the mapped columns; the set then contains a view of that
+        Component rather than the instance that was added.
+    """
+
+    __slots__ = ['_store', '_entity_ref']
+
+    def __init__(self, entity, store):
+        super(MappedComponentSet, self).__init__(entity=entity)
+        self._store = store
+
+    @property
+    def _entity(self):
+        return self._entity_ref()
+
+    @_entity.setter
+    def _entity(self, entity):
+        self._entity_ref = weakref.ref(entity)
+
+    def __contains__(self, component):
+        return self._by_type.get(getattr(type(component), '_component_type', None)) is component
+
+    def add(self, component):
+        if component in self:
+            return
+        self._check_change()
+        component_type = getattr(type(component), '_component_type', type(component))
+        if component_type in self._by_type:
+            raise ValueError("Entity already has a component of type {}".format(component_type.__name__))
+
+        store = self._store
+        entity_id = self._entity._id
+        bit = store.bit(component_type)
+        store.clear_row(component_type, entity_id)
+        view = make_view(component_type, store, entity_id)
+        for slot in component_slots(component_type):
+            if hasattr(component, slot):
+                store.columns[(component_type, slot)][entity_id] = getattr(component, slot)
+        store.masks[entity_id] |= 1 << bit
+
+        self._by_type[component_type] = view
+        self.composition = self.composition.with_type(component_type)
+        self._notify(component_type, view, True)
+
+    def discard(self, component):
+        if component not in self:
+            return
+        self._check_change()
+        component_type = component._component_type
+        store = self._store
+        _detach(component, store)
+        store.masks[self._entity._id] &= ~(1 << store.bits[component_type])
+
+        del self._by_type[component_type]
+        self.composition = self.composition.without_type(component_type)
+        self._notify(component_type, component, False)
+
+
+class MappedEntities(object):
+    """The Entities of a MappedStorage, as a read-only set that materialises them on iteration."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.count
+
+    def __iter__(self):
+        store = self.store
+        for entity_id in six.moves.range(store.next_id):
+            if store.masks[entity_id] & IN_USE:
+                yield store.entity(entity_id)
+
+    def __contains__(self, entity):
+        return isinstance(entity, Entity) and self.store.owns(entity)
+
+    def __repr__(self):
+        return "{0}({1} entities)".format(type(self).__name__, len(self))
+
+
+class MappedStorage(object):
+    """Keeps the Entities of a World in memory-mapped column files under `path`."""
+
+    def __init__(self, path, world=None):
+        self.path = path
+        self.world = world
+        self.columns = dict()
+        self.bits = dict()
+        self.types = []
+        self._files = dict()
+        self._compositions = dict()
+        self._cache = weakref.WeakValueDictionary()
+        self.pending = set()
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        catalog_path = os.path.join(path, CATALOG)
+        if os.path.exists(catalog_path):
+            with open(catalog_path) as catalog_file:
+                catalog = json.load(catalog_file)
+            if catalog.get('format') != FORMAT_VERSION:
+                raise ValueError("{} is not a mapped component store".format(path))
+        else:
+            catalog = {'capacity': INITIAL_CAPACITY, 'next_id': 0, 'count': 0, 'free': [], 'types': []}
+
+        self.capacity = catalog['capacity']
+        self.next_id = catalog['next_id']
+        self.count = catalog['count']
+        self.free = catalog['free']
+        self._masks = MappedColumn(os.path.join(path, MASKS), 'Q', self.capacity)
+        self.masks = self._masks.values
+        for entry in catalog['types']:
+            component_type = resolve_type(entry['name'])
+            self._add_type(component_type)
+            if [list(column) for column in self._layout(component_type)] != entry['slots']:
+                raise ValueError("The slots of {} have changed since the store was written".format(entry['name']))
+
+        self.entities = MappedEntities(self)
+
+    @staticmethod
+    def _layout(component_type):
+        return [(slot, component_type.__column_types__.get(slot)) for slot in component_slots(component_type)]
+
+    def _add_type(self, component_type):
+        if len(self.types) >= MAX_TYPES:
+            raise ValueError("A mapped store holds at most {} Component types".format(MAX_TYPES))
+        if component_type.__dictoffset__:
+            raise ValueError("{} keeps attributes in a dictionary, which cannot be mapped".format(
+                component_type.__name__))
+        for slot, typecode in self._layout(component_type):
+            if typecode is None:
+                raise ValueError("{0}.{1} is not listed in __column_types__".format(component_type.__name__, slot))
+            key = (component_type, slot)
+            column = self._files[key] = MappedColumn(
+                os.path.join(self.path, '{0}.{1}.col'.format(type_name(component_type), slot)), typecode, self.capacity)
+            self.columns[key] = column.values
+        self.bits[component_type] = len(self.types)
+        self.types.append(component_type)
+
+    def bit(self, component_type):
+        """Returns the mask bit of a Component type, adding the type to the store if needed."""
+        bit = self.bits.get(component_type)
+        if bit is None:
+            self._add_type(component_type)
+            bit = self.bits[component_type]
+        return bit
+
+    def clear_row(self, component_type, entity_id):
+        for slot in component_slots(component_type):
+            self.columns[(component_type, slot)][entity_id] = 0
+
+    def _allocate(self):
+        if self.free:
+            return self.free.pop()
+        if self.next_id == self.capacity:
+            self._grow(self.capacity * 2)
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _grow(self, capacity):
+        self.capacity = capacity
+        self._masks.resize(capacity)
+        self.masks = self._masks.values
+        for key, column in six.iteritems(self._files):
+            column.resize(capacity)
+            self.columns[key] = column.values
+
+    def composition(self, mask):
+        """Returns the Composition for a mask's Component type bits."""
+        mask &= ~IN_USE
+        composition = self._compositions.get(mask)
+        if composition is None:
+            composition = self._compositions[mask] = Composition.of(
+                [component_type for bit, component_type in enumerate(self.types) if mask & (1 << bit)])
+        return composition
+
+    def make_entity(self, component_kwargs=(), composition=None, pending=False):
+        """ Makes an Entity whose Components are initialised directly in the mapped columns.
+            :param component_kwargs: pairs of Component type and kwargs for its `__init__`
+            :type component_kwargs: list.
+            :param pending: leaves the Entity out of scans until it is adopted
+            :type pending: bool.
+        """
+        entity_id = self._allocate()
+        entity = Entity.blank()
+        entity.__dict__['_id'] = entity_id
+        components = entity.__dict__['components'] = MappedComponentSet(entity, self)
+
+        mask = 0
+        for component_type, kwargs in component_kwargs:
+            mask |= 1 << self.bit(component_type)
+            self.clear_row(component_type, entity_id)
+            view = make_view(component_type, self, entity_id)
+            component_type.__init__(view, **kwargs)
+            components._by_type[component_type] = view
+        components.composition = self.composition(mask)
+
+        if pending:
+            self.pending.add(entity_id)
+        else:
+            mask |= IN_USE
+            self.count += 1
+        self.masks[entity_id] = mask
+        self._cache[entity_id] = entity
+        return entity
+
+    def make_entities(self, component_kwargs_per_entity, composition):
+        """Makes one Entity per entry of `component_kwargs_per_entity`, all with the same Composition."""
+        return [self.make_entity(component_kwargs, composition) for component_kwargs in component_kwargs_per_entity]
+
+    def make_pending_entity(self, component_kwargs=()):
+        """Makes an Entity that is left out of the World until it is adopted."""
+        return self.make_entity(component_kwargs, pending=True)
+
+    def adopt(self, entity):
+        """Makes a pending Entity part of the store."""
+        self.pending.discard(entity._id)
+        self.masks[entity._id] |= IN_USE
+        self.count += 1
+
+    def owns(self, entity):
+        entity_id = entity._id
+        return (entity_id is not None and entity_id < self.next_id and self.masks[entity_id] & IN_USE
+                and self._cache.get(entity_id) is entity)
+
+    def remove(self, entity):
+        """Frees an Entity's id. Its Components keep their values, but no longer read the mapped columns."""
+        entity_id = entity._id
+        for view in entity.components:
+            _detach(view, self)
+        self.masks[entity_id] = 0
+        self.free.append(entity_id)
+        self.count -= 1
+        self._cache.pop(entity_id, None)
+
+    def entity(self, entity_id):
+        """Returns the Entity with an id, materialising it if nothing holds it. Returns None for unused ids."""
+        entity = self._cache.get(entity_id)
+        if entity is not None:
+            return entity
+        if not (0 <= entity_id < self.next_id) or not self.masks[entity_id] & IN_USE:
+            return None
+
+        composition = self.composition(self.masks[entity_id])
+        entity = Entity.blank()
+        entity.__dict__.update({'_id': entity_id, '_world': self.world})
+        components = entity.__dict__['components'] = MappedComponentSet(entity, self)
+        for component_type in composition.types:
+            components._by_type[component_type] = make_view(component_type, self, entity_id)
+        components.composition = composition
+        self._cache[entity_id] = entity
+        return entity
+
+    def ids_with_aspect(self, aspect):
+        """Iterates over the ids of the Entities with a particular Aspect, without materialising them."""
+        if any(component_type not in self.bits for component_type in aspect.all_of):
+            return
+        required = IN_USE
+        for component_type in aspect.all_of:
+            required |= 1 << self.bits[component_type]
+        excluded = 0
+        for component_type in aspect.exclude:
+            if component_type in self.bits:
+                excluded |= 1 << self.bits[component_type]
+        some = 0
+        for component_type in aspect.some_of:
+            if component_type in self.bits:
+                some |= 1 << self.bits[component_type]
+        if aspect.some_of and not some:
+            return
+
+        if numpy is not None:
+            for entity_id in self._matching_ids(required, excluded, some):
+                yield entity_id
+            return
+
+        masks = self.masks
+        for entity_id in six.moves.range(self.next_id):
+            mask = masks[entity_id]
+            if mask & required == required and not mask & excluded and (not some or mask & some):
+                yield entity_id
+
+    def _matching_ids(self, required, excluded, some):
+        """ Tests every mask at once with numpy, returning a list of the ids that match.
+            The masks are only borrowed while testing, so the files can still be remapped while the ids are used.
+        """
+        masks = numpy.frombuffer(self.masks, dtype=numpy.uint64, count=self.next_id)
+        matches = masks & numpy.uint64(required) == numpy.uint64(required)
+        if excluded:
+            matches &= masks & numpy.uint64(excluded) == 0
+        if some:
+            matches &= masks & numpy.uint64(some) != 0
+        del masks
+        return numpy.flatnonzero(matches).tolist()
+
+    def entities_with_aspect(self, aspect):
+        """Returns a set of the Entities with a particular Aspect."""
+        return set(self.entity(entity_id) for entity_id in self.ids_with_aspect(aspect))
+
+    def flush(self):
+        """Writes the catalog and syncs every mapped file, so the store can be reopened."""
+        catalog = {
+            'format': FORMAT_VERSION,
+            'capacity': self.capacity,
+            'next_id': self.next_id,
+            'count': self.count,
+            'free': self.free + sorted(self.pending),
+            'types': [{'name': type_name(component_type), 'slots': [list(column) for column in self._layout(component_type)]}
+                      for component_type in self.types],
+        }
+        self._masks.flush()
+        for column in six.itervalues(self._files):
+            column.flush()
+        with open(os.path.join(self.path, CATALOG), 'w') as catalog_file:
+            json.dump(catalog, catalog_file)
+
+    def close(self):
+        """Flushes the store and unmaps its files. Materialised Entities can no longer be read."""
+        if self.masks is None:
+            return
+        self.flush()
+        self._cache = weakref.WeakValueDictionary()
+        self.masks = None
+        self._masks.close()
+        for column in six.itervalues(self._files):
+            column.close()
+        self.columns = dict()
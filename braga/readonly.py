@@ -0,0 +1,27 @@
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+
+class ReadOnlyMapping(Mapping):
+    """A read-only view of a dictionary, showing each of its values through `view_value`."""
+
+    def __init__(self, mapping, view_value=None):
+        self._mapping = mapping
+        self._view_value = view_value
+
+    def __getitem__(self, key):
+        if key not in self._mapping:
+            raise KeyError(key)
+        value = self._mapping[key]
+        return value if self._view_value is None else self._view_value(value)
+
+    def __iter__(self):
+        return iter(self._mapping)
+
+    def __len__(self):
+        return len(self._mapping)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
@@ -0,0 +1,298 @@
+""" Records the events and System calls that drive a World, and replays them.
+
+    `World.record` saves a snapshot and attaches an EventRecorder, which appends a
+    record to the event log for every event published to the World, every call to
+    its `step` and `refresh`, and every call to a decorated function of a System
+    passed to `EventRecorder.record_system`. Only calls made from outside another
+    recorded call are written: a System function that publishes an event, or a
+    `publish` that steps the World, is replayed by replaying the outer call.
+    A call that raises is followed by a failure record, so that the replay expects
+    it to raise too. Each record is encoded in full before it is written; a call
+    whose arguments cannot be encoded still runs, but is left out of the log with
+    a warning.
+
+    While a World is recorded, every Entity has a stable id: its index in the
+    snapshot, or the next free number for Entities made since. Arguments are
+    written with the tagged encoding of `braga.snapshot`, with Entities replaced by
+    their ids. Event values, System names and function names are written once,
+    then referred to by number.
+
+    An EventReplayer loads the snapshot and runs the log against it as fast as it
+    can be read. Hooks and event subscribers marked with
+    `braga.system.presentation` are skipped while replaying.
+
+    Replays are only faithful if the recorded calls are the only changes made to
+    the World, and they behave the same given the same state; Entities made or
+    changed by other code, or Systems that use unseeded random numbers, make the
+    replay diverge. Events published with `publish_async` cannot be recorded.
+"""
+import io
+import struct
+import warnings
+
+import six
+
+from braga import snapshot
+
+MAGIC = b'BRGL'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sI')  # magic, format version
+
+NAME = b'N'
+EVENT = b'E'
+CALL = b'C'
+STEP = b'S'
+REFRESH = b'R'
+FAILURE = b'X'
+
+
+class EntityIds(object):
+    """ Numbers the Entities of a World: first those of its snapshot by their index,
+        then the Entities made since in the order they were made.
+    """
+
+    def __init__(self, ids):
+        self.ids = dict(ids)
+        self.entities = dict((entity_id, entity) for entity, entity_id in six.iteritems(self.ids))
+        self.next_id = len(self.ids)
+
+    def entities_added(self, entities):
+        for entity in entities:
+            self.ids[entity] = self.next_id
+            self.entities[self.next_id] = entity
+            self.next_id += 1
+
+    def entity_destroyed(self, entity):
+        del self.entities[self.ids.pop(entity)]
+
+    def component_added(self, entity, component_type, component):
+        pass
+
+    def component_removed(self, entity, component_type, component):
+        pass
+
+
+class EventRecorder(object):
+    """ Appends the events and System calls that drive a World to an event log.
+        Made by `World.record`, which also writes the snapshot the log starts from.
+    """
+
+    def __init__(self, world, ids, log_path):
+        self.world = world
+        self.entity_ids = EntityIds(ids)
+        self.names = dict()
+        self.functions = dict()
+        self.systems = dict()
+        self.depth = 0
+        self.log = open(log_path, 'wb')
+        self.log.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        world.trackers.append(self.entity_ids)
+
+    def record_system(self, system, name=None):
+        """ Records the calls to a System's decorated functions under `name`, by default its class name.
+            Functions decorated after this are not recorded.
+        """
+        if name is None:
+            name = type(system).__name__
+        if self.systems.get(name, system) is not system:
+            raise ValueError("Another System is already recorded as {}".format(name))
+        self.systems[name] = system
+        for method, function in list(system.__dict__.items()):
+            hooks = getattr(function, 'hooks', None)
+            if hooks is not None:
+                self.functions[function] = (name, method)
+                hooks[2] = self._call
+                if hooks[0] is None:
+                    hooks[0] = ((), ())
+
+    def _name(self, value, record, names):
+        """Returns the number of a name, adding a name record to `record` if it is new."""
+        number = self.names.get(value, names.get(value))
+        if number is None:
+            encoded = bytearray()
+            snapshot.encode_value(value, encoded, {})
+            number = names[value] = len(self.names) + len(names)
+            record.write(NAME)
+            self._write_bytes(record, encoded)
+        return number
+
+    @staticmethod
+    def _write_bytes(record, data):
+        record.write(snapshot.LENGTH.pack(len(data)))
+        record.write(data)
+
+    def _write_values(self, record, values):
+        encoded = bytearray()
+        snapshot.encode_value(values, encoded, self.entity_ids.ids)
+        self._write_bytes(record, encoded)
+
+    def _record(self, write):
+        """ Builds a record with `write` and appends it to the log.
+            If its values cannot be encoded, nothing is written, a warning is issued, and False is returned.
+        """
+        record = io.BytesIO()
+        names = dict()
+        try:
+            write(record, names)
+        except ValueError as error:
+            warnings.warn("Not recording a call whose arguments cannot be saved: {}".format(error), RuntimeWarning)
+            return False
+        self.names.update(names)
+        self.log.write(record.getvalue())
+        return True
+
+    def _run(self, write, call, args, kwargs):
+        """Records a call if it is not made by another recorded call, then makes the call."""
+        recorded = self.depth == 0 and self._record(write)
+        self.depth += 1
+        try:
+            return call(*args, **kwargs)
+        except Exception:
+            if recorded:
+                self.log.write(FAILURE)
+            raise
+        finally:
+            self.depth -= 1
+
+    def publish(self, call, event, involved_entities):
+        def write(record, names):
+            number = self._name(event, record, names)
+            record.write(EVENT + snapshot.LENGTH.pack(number))
+            self._write_values(record, involved_entities)
+        return self._run(write, call, (event, involved_entities), {})
+
+    def step(self, call):
+        return self._run(lambda record, names: record.write(STEP), call, (), {})
+
+    def refresh(self, call):
+        return self._run(lambda record, names: record.write(REFRESH), call, (), {})
+
+    def _call(self, function, call, args, kwargs):
+        def write(record, names):
+            system, method = self.functions[function]
+            numbers = (self._name(system, record, names), self._name(method, record, names))
+            record.write(CALL + snapshot.LENGTH.pack(numbers[0]) + snapshot.LENGTH.pack(numbers[1]))
+            self._write_values(record, (args, kwargs))
+        return self._run(write, call, args, kwargs)
+
+    def flush(self):
+        """Writes any buffered records to the event log."""
+        self.log.flush()
+
+    def close(self):
+        """Stops recording and closes the event log."""
+        for function in self.functions:
+            function.hooks[2] = None
+            function.hooks[0] = None
+        for system in six.itervalues(self.systems):
+            world = getattr(system, 'world', None)
+            if world is not None:
+                world._compile_system(system)
+        self.functions = dict()
+        self.systems = dict()
+        self.log.close()
+        if self.world.recorder is self:
+            self.world.recorder = None
+        if self.entity_ids in self.world.trackers:
+            self.world.trackers.remove(self.entity_ids)
+
+
+class EventReplayer(object):
+    """ Runs an event log against the snapshot it was recorded from.
+
+        Loads the snapshot into a new World, made with `world_kwargs`. Systems that
+        were recorded must be added with `add_system` under the same names, along
+        with any subscriptions the recording World had, before replaying.
+    """
+
+    def __init__(self, path, log_path, **world_kwargs):
+        from braga.world import World
+        self.world = World(**world_kwargs)
+        entities = snapshot.load_entities(self.world, path)
+        self.entity_ids = EntityIds((entity, index) for index, entity in enumerate(entities))
+        self.world.trackers.append(self.entity_ids)
+        self.systems = dict()
+        self.names = []
+        self.log = open(log_path, 'rb')
+        magic, format_version = HEADER.unpack(snapshot.read_exactly(self.log, HEADER.size))
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("{} is not an event log".format(log_path))
+
+    def add_system(self, system, name=None):
+        """Replays the calls recorded under `name`, by default the System's class name, on `system`."""
+        self.systems[type(system).__name__ if name is None else name] = system
+
+    def run(self, until=None):
+        """ Replays the log, skipping presentation hooks, until it ends or the World's timer reaches `until`.
+            Calling `run` again carries on from where the last run stopped, so a replay can be
+            fast-forwarded to a point of interest and then stepped through.
+
+            Returns the number of events and calls replayed.
+        """
+        self.world.present(False)
+        try:
+            return self._run(until)
+        finally:
+            self.world.present(True)
+
+    def _run(self, until):
+        replayed = 0
+        while until is None or self.world.timer < until:
+            tag = self.log.read(1)
+            if not tag:
+                break
+            if tag == NAME:
+                self.names.append(self._read_values())
+                continue
+            try:
+                self._replay(tag)
+            except Exception:
+                if not self._failed():
+                    raise
+            else:
+                if self._failed():
+                    raise ValueError("A recorded call raised an exception, but its replay did not")
+            replayed += 1
+        return replayed
+
+    def _failed(self):
+        """Reads the failure record after a replayed call, if there is one."""
+        position = self.log.tell()
+        if self.log.read(1) == FAILURE:
+            return True
+        self.log.seek(position)
+        return False
+
+    def _replay(self, tag):
+        world = self.world
+        if tag == EVENT:
+            event = self.names[snapshot.read_length(self.log)]
+            world.publish(event, *self._read_values())
+        elif tag == CALL:
+            system_name = self.names[snapshot.read_length(self.log)]
+            method = self.names[snapshot.read_length(self.log)]
+            args, kwargs = self._read_values()
+            system = self.systems.get(system_name)
+            if system is None:
+                raise ValueError("No System was added to replay calls to {}".format(system_name))
+            getattr(system, method)(*args, **kwargs)
+        elif tag == STEP:
+            world.step()
+        elif tag == REFRESH:
+            world.refresh()
+        else:
+            raise ValueError("Corrupt event log: unknown record {!r}".format(tag))
+
+    def close(self):
+        """Closes the event log."""
+        self.log.close()
+        if self.entity_ids in self.world.trackers:
+            self.world.trackers.remove(self.entity_ids)
+
+    def _read_values(self):
+        data = snapshot.read_exactly(self.log, snapshot.read_length(self.log))
+        try:
+            value, _ = snapshot.decode_value(data, 0, self.entity_ids.entities)
+        except KeyError as error:
+            raise ValueError("The event log refers to Entity {} which is not in the World".format(error.args[0]))
+        return value
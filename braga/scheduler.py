@@ -0,0 +1,118 @@
+from collections import defaultdict
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+except ImportError:  # Python 2 without the futures backport
+    ThreadPoolExecutor = None
+
+
+def conflicts(first, second):
+    """ Determines if two Systems must not run at the same time.
+
+        Systems declare the Component types they use in `reads` and `writes`.
+        Two Systems conflict if either writes a type the other reads or writes.
+        A System that leaves `reads` or `writes` undeclared conflicts with every other System.
+    """
+    if first.reads is None or first.writes is None or second.reads is None or second.writes is None:
+        return True
+    return bool(first.writes & (second.reads | second.writes) or second.writes & first.reads)
+
+
+def dependencies(systems):
+    """ Works out, for each System, the positions of the earlier Systems it must wait for.
+        Conflicting Systems therefore always run in the order they are given in.
+    """
+    return [[j for j in range(i) if conflicts(systems[j], system)] for i, system in enumerate(systems)]
+
+
+class SystemScheduler(object):
+    """ Runs the `update` of a World's Systems, overlapping those that do not conflict.
+
+        With `max_workers` above 1, Systems whose dependencies have finished are
+        handed to a thread pool as soon as they are ready; otherwise they run one
+        after another on the calling thread. A System that conflicts with every other
+        System, such as one that leaves `reads` or `writes` undeclared, can never
+        overlap another, so it runs on the calling thread too.
+
+        `concurrent` is True while Systems are running on the thread pool.
+    """
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self.concurrent = False
+        self._executor = None
+        self._systems = None
+        self._dependencies = None
+        self._exclusive = None
+
+    def plan(self, systems):
+        """Returns the dependencies of `systems`, reusing the last plan if the Systems have not changed."""
+        systems = tuple(systems)
+        if systems != self._systems:
+            self._systems = systems
+            self._dependencies = dependencies(systems)
+            self._exclusive = [all(conflicts(system, other) for other in systems if other is not system)
+                               for system in systems]
+        return self._dependencies
+
+    def run(self, systems):
+        systems = list(systems)
+        if self.max_workers <= 1 or ThreadPoolExecutor is None or len(systems) <= 1:
+            for system in systems:
+                system.update()
+            return
+
+        waiting = [set(depends_on) for depends_on in self.plan(systems)]
+        exclusive = self._exclusive
+        dependents = defaultdict(list)
+        for i, depends_on in enumerate(waiting):
+            for j in depends_on:
+                dependents[j].append(i)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        ready = [i for i, depends_on in enumerate(waiting) if not depends_on]
+        running = dict()
+        error = None
+        try:
+            while ready or running:
+                finished = []
+                for i in ready:
+                    if exclusive[i]:
+                        # Everything it depends on has finished, and everything else waits for it.
+                        systems[i].update()
+                        finished.append(i)
+                    else:
+                        self.concurrent = True
+                        running[self._executor.submit(systems[i].update)] = i
+                ready = []
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        i = running.pop(future)
+                        if future.exception() is not None:
+                            error = error or future.exception()
+                        elif error is None:
+                            finished.append(i)
+                    if not running:
+                        self.concurrent = False
+                for i in finished:
+                    if error is None:
+                        for dependent in dependents[i]:
+                            waiting[dependent].discard(i)
+                            if not waiting[dependent]:
+                                ready.append(dependent)
+                ready.sort()
+        finally:
+            self.concurrent = False
+
+        if error is not None:
+            raise error
+
+    def shutdown(self):
+        """Stops the thread pool, if one has been started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,128 @@
+import multiprocessing
+from collections import defaultdict
+
+import six
+
+from braga.system import System, call_hooks
+
+
+class ShardedSystem(System):
+    """ System whose per-Entity work runs in a pool of worker processes.
+
+        Decorated functions are kernels: module-level functions that take the
+        values of the System's `columns` for one Entity and return the new values
+        (one value, or a tuple in `columns` order), or None to leave the Entity
+        unchanged. The decorator returns the kernel itself, so it stays picklable,
+        and adds a method of the same name to the System that runs the kernel over
+        every Entity matching the System's Aspect.
+
+        Entities are split into shards by `shard_key(entity)`, or evenly if no key
+        is given, and each shard is sent to a worker as a list of value tuples.
+        Workers send back only (row, new values) pairs for the Entities that
+        changed, which are written back to the Components in the parent process.
+
+        `update` runs every kernel in the order they were added, so a ShardedSystem
+        added to a World fans out and merges on each `World.refresh`. The worker
+        processes are started on first use and stopped by `close`, which
+        `World.close` calls; a ShardedSystem can also be used as a context manager.
+    """
+
+    def __init__(self, world=None, aspect=None, columns=(), shard_key=None, processes=None):
+        super(ShardedSystem, self).__init__(world=world)
+        self.aspect = aspect
+        self.columns = list(columns)
+        self.shard_key = shard_key
+        self.processes = processes or multiprocessing.cpu_count()
+        self.kernels = []
+        self._pool = None
+        if self.writes is None:
+            self.writes = frozenset(component_type for component_type, _ in self.columns)
+        if self.reads is None and aspect is not None:
+            self.reads = frozenset(aspect.all_of | aspect.some_of | aspect.exclude)
+
+    def __call__(self, kernel):
+        system = self
+
+        def run_kernel():
+            system.run(kernel)
+
+        run_kernel.__name__ = kernel.__name__
+        run_kernel.__doc__ = kernel.__doc__
+        setattr(run_kernel, 'system', self)
+        wrapped_func = call_hooks(run_kernel)
+        setattr(self, kernel.__name__, wrapped_func)
+        if hasattr(self, 'world'):
+            self.world._compile_hooks(self, kernel.__name__)
+        self.kernels.append(wrapped_func)
+        return kernel
+
+    def update(self):
+        for run_kernel in self.kernels:
+            run_kernel()
+
+    def shards(self):
+        """Splits the Entities matching the System's Aspect into lists, one per worker job."""
+        entities = self.world.entities_with_aspect(self.aspect)
+        if self.shard_key is None:
+            entities = list(entities)
+            if not entities:
+                return []
+            size = -(-len(entities) // self.processes)
+            return [entities[i:i + size] for i in range(0, len(entities), size)]
+
+        shards = defaultdict(list)
+        for entity in entities:
+            shards[self.shard_key(entity)].append(entity)
+        return list(six.itervalues(shards))
+
+    def run(self, kernel):
+        """Runs `kernel` over every matching Entity and writes the changed values back."""
+        shards = [[[entity.get_component(component_type) for component_type, _ in self.columns]
+                   for entity in shard]
+                  for shard in self.shards()]
+        slots = [slot for _, slot in self.columns]
+        jobs = [(kernel, [tuple(getattr(component, slot) for component, slot in zip(components, slots))
+                          for components in shard])
+                for shard in shards]
+
+        if self.processes <= 1 or len(jobs) <= 1:
+            results = [run_shard(job) for job in jobs]
+        else:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.processes)
+            results = self._pool.map(run_shard, jobs)
+
+        for shard, changes in zip(shards, results):
+            for row, values in changes:
+                for component, slot, value in zip(shard[row], slots, values):
+                    setattr(component, slot, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shuts down the worker processes, if they have been started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def run_shard(job):
+    """ Runs a kernel over one shard of value tuples, in a worker process.
+        Returns (row, new values) pairs for the rows the kernel changed.
+    """
+    kernel, rows = job
+    changes = []
+    for row, values in enumerate(rows):
+        result = kernel(*values)
+        if result is None:
+            continue
+        if not isinstance(result, tuple):
+            result = (result,)
+        if result != values:
+            changes.append((row, result))
+    return changes
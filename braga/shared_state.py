@@ -0,0 +1,250 @@
+""" Publishes numeric Component columns into shared memory for other local processes to read.
+
+    A block holds a fixed header, per-table row counts, a JSON directory describing
+    the tables, and two buffers. Each table covers one Component type: a column of
+    Entity ids (-1 for Entities without an integer id) followed by one column per
+    published slot. The publisher always writes the buffer readers are not pointed
+    at, then flips the active buffer and bumps the version in the header, so a reader
+    sees one whole tick as long as it is done before the next two publications.
+"""
+import json
+import struct
+from array import array
+
+import six
+
+from braga.aspect import Aspect
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+MAGIC = b'BRGA'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIQII')  # magic, format version, tick version, active buffer, table count
+COUNT = struct.Struct('<Q')
+ALIGNMENT = 8
+
+
+def type_name(component_type):
+    """Returns the name Component types are published under."""
+    if isinstance(component_type, six.string_types):
+        return component_type
+    return '{0}.{1}'.format(component_type.__module__, component_type.__name__)
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class SharedStatePublisher(object):
+    """ Copies numeric Component columns of a World into a shared memory block.
+        :param columns: (Component type, slot) pairs; each slot must be listed in the
+            type's `__column_types__`
+        :param capacity: the most Entities any one Component type may have
+    """
+
+    def __init__(self, world, name, columns, capacity):
+        if shared_memory is None:
+            raise ImportError("Shared world state requires multiprocessing.shared_memory (Python 3.8+)")
+
+        self.world = world
+        self.capacity = capacity
+        self.tables = []
+        slots_by_type = dict()
+        for component_type, slot in columns:
+            typecode = component_type.__column_types__.get(slot)
+            if typecode is None:
+                raise ValueError("{0}.{1} is not a numeric column".format(component_type.__name__, slot))
+            if component_type not in slots_by_type:
+                slots_by_type[component_type] = []
+                self.tables.append(component_type)
+            slots_by_type[component_type].append((slot, typecode))
+
+        counts_offset = HEADER.size
+        directory_offset = counts_offset + COUNT.size * 2 * len(self.tables)
+        directory = [{'type': type_name(component_type), 'columns': [], 'offsets': [[], []]}
+                     for component_type in self.tables]
+        offset = 0
+        for buffer_index in range(2):
+            for entry, component_type in zip(directory, self.tables):
+                for slot, typecode in [('__id__', 'q')] + slots_by_type[component_type]:
+                    if buffer_index == 0:
+                        entry['columns'].append([slot, typecode])
+                    entry['offsets'][buffer_index].append(offset)
+                    offset = _aligned(offset + capacity * array(typecode).itemsize)
+
+        encoded = json.dumps(directory).encode('utf-8')
+        data_offset = _aligned(directory_offset + COUNT.size + len(encoded))
+
+        self.memory = shared_memory.SharedMemory(name=name, create=True, size=data_offset + offset)
+        self.name = self.memory.name
+        self._layout = _Layout(directory, counts_offset, data_offset)
+        self._slots_by_type = slots_by_type
+        self.version = 0
+        self.active = 0
+        self.closed = False
+
+        buf = self.memory.buf
+        buf[directory_offset:directory_offset + COUNT.size] = COUNT.pack(len(encoded))
+        buf[directory_offset + COUNT.size:directory_offset + COUNT.size + len(encoded)] = encoded
+        self._write_header()
+
+    def _write_header(self):
+        HEADER.pack_into(self.memory.buf, 0, MAGIC, FORMAT_VERSION, self.version, self.active, len(self.tables))
+
+    def publish(self):
+        """Writes the World's current values into the inactive buffer, then makes it the active one."""
+        target = 1 - self.active
+        buf = self.memory.buf
+        for table_index, component_type in enumerate(self.tables):
+            slots = self._slots_by_type[component_type]
+            ids, values = _gather(self.world, component_type, slots)
+            if len(ids) > self.capacity:
+                raise ValueError("{0} has {1} entities with {2}, capacity is {3}".format(
+                    repr(self.world), len(ids), component_type.__name__, self.capacity))
+
+            offsets = self._layout.offsets[table_index][target]
+            for offset, column in zip(offsets, [ids] + values):
+                size = len(column) * column.itemsize
+                buf[offset:offset + size] = column.tobytes()
+            COUNT.pack_into(buf, self._layout.count_offset(table_index, target), len(ids))
+
+        self.active = target
+        self.version += 1
+        self._write_header()
+
+    def close(self):
+        """Stops publishing, and releases and removes the shared memory block."""
+        if self.closed:
+            return
+        self.closed = True
+        if self in self.world.shared_states:
+            self.world.shared_states.remove(self)
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _gather(world, component_type, slots):
+    ids = array('q')
+    values = [array(typecode) for _, typecode in slots]
+    storage = world.storage
+    if world.mapped:
+        if component_type in storage.bits:
+            entity_ids = array('q', storage.ids_with_aspect(Aspect(all_of=set([component_type]))))
+            ids.extend(entity_ids)
+            for column, (slot, _) in zip(values, slots):
+                mapped_column = storage.columns[(component_type, slot)]
+                column.extend(mapped_column[entity_id] for entity_id in entity_ids)
+    elif storage is not None:
+        for composition, archetype in six.iteritems(storage.archetypes):
+            if component_type in composition.types and archetype.entities:
+                ids.extend(-1 if entity.eid is None else entity.eid for entity in archetype.entities)
+                for column, (slot, _) in zip(values, slots):
+                    column.extend(archetype.columns[(component_type, slot)])
+    else:
+        entities = world.entities_by_component_type.get(component_type, ())
+        ids.extend(-1 if entity.eid is None else entity.eid for entity in entities)
+        components = [entity.get_component(component_type) for entity in entities]
+        for column, (slot, _) in zip(values, slots):
+            column.extend(getattr(component, slot) for component in components)
+    return ids, values
+
+
+class _Layout(object):
+    """ Where each table's columns and row counts live in a block.
+        Column offsets in the directory are relative to the start of the data section.
+    """
+
+    def __init__(self, directory, counts_offset, data_offset):
+        self.directory = directory
+        self.counts_offset = counts_offset
+        self.offsets = [[[data_offset + offset for offset in offsets] for offsets in entry['offsets']]
+                        for entry in directory]
+
+    def count_offset(self, table_index, buffer_index):
+        return self.counts_offset + COUNT.size * (2 * table_index + buffer_index)
+
+
+class SharedStateReader(object):
+    """ Attaches to a block made by a SharedStatePublisher, from any local process.
+
+        `column` and `ids` return memoryviews straight onto the active buffer;
+        `read` copies a set of columns and checks that they all came from one tick.
+    """
+
+    def __init__(self, name):
+        if shared_memory is None:
+            raise ImportError("Shared world state requires multiprocessing.shared_memory (Python 3.8+)")
+
+        self.memory = shared_memory.SharedMemory(name=name)
+        try:
+            # Readers do not own the block; keep the resource tracker from removing it when they exit.
+            resource_tracker.unregister(self.memory._name, 'shared_memory')
+        except Exception:
+            pass
+
+        magic, format_version, _, _, table_count = HEADER.unpack_from(self.memory.buf, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("{} is not a shared world state block".format(name))
+
+        directory_offset = HEADER.size + COUNT.size * 2 * table_count
+        length, = COUNT.unpack_from(self.memory.buf, directory_offset)
+        start = directory_offset + COUNT.size
+        directory = json.loads(bytes(self.memory.buf[start:start + length]).decode('utf-8'))
+        self._layout = _Layout(directory, HEADER.size, _aligned(start + length))
+        self._tables = dict((entry['type'], index) for index, entry in enumerate(directory))
+
+    @property
+    def version(self):
+        """How many times the publisher has published."""
+        return HEADER.unpack_from(self.memory.buf, 0)[2]
+
+    def _active(self):
+        _, _, version, active, _ = HEADER.unpack_from(self.memory.buf, 0)
+        return version, active
+
+    def _column(self, table_index, column_index, buffer_index):
+        entry = self._layout.directory[table_index]
+        typecode = entry['columns'][column_index][1]
+        offset = self._layout.offsets[table_index][buffer_index][column_index]
+        count, = COUNT.unpack_from(self.memory.buf, self._layout.count_offset(table_index, buffer_index))
+        size = count * array(typecode).itemsize
+        return self.memory.buf[offset:offset + size].cast(typecode)
+
+    def _table(self, component_type):
+        try:
+            return self._tables[type_name(component_type)]
+        except KeyError:
+            raise ValueError("{} is not published".format(type_name(component_type)))
+
+    def _column_index(self, table_index, slot):
+        for index, (name, _) in enumerate(self._layout.directory[table_index]['columns']):
+            if name == slot:
+                return index
+        raise ValueError("{0} is not published for {1}".format(slot, self._layout.directory[table_index]['type']))
+
+    def ids(self, component_type):
+        """Returns the ids of the Entities with a Component type, in the same order as its columns."""
+        return self._column(self._table(component_type), 0, self._active()[1])
+
+    def column(self, component_type, slot):
+        """Returns the published values of one slot, without copying."""
+        table_index = self._table(component_type)
+        return self._column(table_index, self._column_index(table_index, slot), self._active()[1])
+
+    def read(self, component_type, *slots):
+        """ Copies the ids and the given slots of a Component type from a single tick.
+            Returns the tick version and a dictionary with an 'id' list and one list per slot.
+        """
+        table_index = self._table(component_type)
+        column_indexes = [0] + [self._column_index(table_index, slot) for slot in slots]
+        while True:
+            version, active = self._active()
+            columns = [self._column(table_index, index, active).tolist() for index in column_indexes]
+            if self._active()[0] == version:
+                return version, dict(zip(('id',) + slots, columns))
+
+    def close(self):
+        self.memory.close()
@@ -0,0 +1,430 @@
+""" Saves a World to a compact binary file and loads it back.
+
+    A snapshot starts with a header and the integer id of each Entity (-1 for
+    Entities without one), followed by one table per Component type.
+    Each table names its type and slots and holds one or more chunks of rows:
+    the snapshot indexes of the Entities that have the type, then one column
+    per slot. Numeric columns are written as raw little-endian arrays; other
+    columns are written with a small tagged encoding in which Entities are
+    replaced by their snapshot index. Components with an instance dictionary
+    get an extra `__dict__` column.
+
+    Tables are written one chunk at a time, straight from the World's columns
+    or Components, without building a dictionary per Entity.
+"""
+import struct
+import sys
+from array import array
+from importlib import import_module
+
+import six
+
+from braga.component import component_slots
+from braga.composition import Composition
+from braga.entity import ComponentSet, Entity
+
+MAGIC = b'BRGS'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sIQQI')  # magic, format version, timer, entity count, table count
+LENGTH = struct.Struct('<I')
+COUNT = struct.Struct('<Q')
+try:
+    array('q')
+    INDEX_TYPECODE = 'q'
+except ValueError:  # Python 2, whose arrays have no 'q'; 'l' is 64 bits where longs are
+    INDEX_TYPECODE = 'l'
+OBJECTS = b'o'
+DICT_SLOT = '__dict__'
+
+_TAG = struct.Struct('<c')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+UNSET = object()
+
+try:
+    _array_bytes, _extend_array = array.tobytes, array.frombytes
+except AttributeError:  # Python 2
+    _array_bytes, _extend_array = array.tostring, array.fromstring
+
+
+def type_name(component_type):
+    return '{0}.{1}'.format(component_type.__module__, component_type.__name__)
+
+
+def resolve_type(name):
+    module_name, _, class_name = name.rpartition('.')
+    try:
+        return getattr(import_module(module_name), class_name)
+    except (ImportError, AttributeError):
+        raise ValueError("Unknown component type: {}".format(name))
+
+
+def table_slots(component_type):
+    """Returns the columns a Component type is saved with: its slots, then `__dict__` if it has one."""
+    slots = list(component_slots(component_type))
+    if component_type.__dictoffset__:
+        slots.append(DICT_SLOT)
+    return slots
+
+
+def save(world, path):
+    """ Writes every Entity in `world` and its Components to `path`.
+        Returns a dictionary of the Entities to their snapshot indexes.
+    """
+    if world.mapped:
+        raise ValueError("Worlds with mapped storage are saved with world.storage.flush()")
+    if world.handles is not None:
+        entities = sorted(world.entities, key=lambda entity: entity.eid)
+    else:
+        entities = list(world.entities)
+    indexes = dict((entity, index) for index, entity in enumerate(entities))
+    tables = _tables(world)
+
+    with open(path, 'wb') as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, FORMAT_VERSION, world.timer, len(entities), len(tables)))
+        write_array(snapshot, array(INDEX_TYPECODE, [-1 if entity.eid is None else entity.eid for entity in entities]))
+        for component_type, chunks in tables:
+            write_table(snapshot, component_type, chunks, indexes)
+    return indexes
+
+
+def write_table(stream, component_type, chunks, indexes):
+    """ Writes the table for one Component type.
+        :param chunks: functions that each return a list of Entities and one column of values per saved slot
+        :param indexes: the index each Entity is written as
+    """
+    slots = table_slots(component_type)
+    write_string(stream, type_name(component_type))
+    stream.write(LENGTH.pack(len(slots)))
+    for slot in slots:
+        write_string(stream, slot)
+    stream.write(LENGTH.pack(len(chunks)))
+    for chunk in chunks:
+        owners, columns = chunk()
+        write_array(stream, array(INDEX_TYPECODE, [indexes[entity] for entity in owners]))
+        for slot, column in zip(slots, columns):
+            _write_column(stream, component_type, slot, column, indexes)
+
+
+def read_table(stream, entities):
+    """ Reads a table written by `write_table`, decoding Entity references with `entities`,
+        a sequence or dictionary of indexes to Entities.
+
+        Returns the Component type, its saved slots, and a list of (indexes, columns) chunks.
+    """
+    component_type = resolve_type(read_string(stream))
+    slots = [read_string(stream) for _ in six.moves.range(read_length(stream))]
+    chunks = []
+    for _ in six.moves.range(read_length(stream)):
+        rows = read_array(stream, INDEX_TYPECODE)
+        columns = [_read_column(stream, len(rows), entities) for _ in slots]
+        chunks.append((rows, columns))
+    return component_type, slots, chunks
+
+
+def _tables(world):
+    """ Returns (Component type, chunks) pairs, where each chunk is a function returning
+        a list of Entities and one column of values per saved slot.
+    """
+    chunks_by_type = dict()
+    if world.storage is not None:
+        for composition, archetype in six.iteritems(world.storage.archetypes):
+            if archetype.entities:
+                for component_type in composition.types:
+                    chunks_by_type.setdefault(component_type, []).append(
+                        _archetype_chunk(archetype, component_type))
+    else:
+        for component_type, entities in six.iteritems(world.entities_by_component_type):
+            if entities:
+                chunks_by_type[component_type] = [component_chunk(entities, component_type)]
+    return sorted(six.iteritems(chunks_by_type), key=lambda table: type_name(table[0]))
+
+
+def _archetype_chunk(archetype, component_type):
+    def chunk():
+        columns = [archetype.columns[(component_type, slot)] for slot in component_slots(component_type)]
+        if component_type.__dictoffset__:
+            columns.append([values or {} for values in archetype.columns[(component_type, DICT_SLOT)]])
+        return archetype.entities, columns
+    return chunk
+
+
+def component_chunk(entities, component_type):
+    def chunk():
+        owners = list(entities)
+        components = [entity.components._by_type[component_type] for entity in owners]
+        columns = [[getattr(component, slot, UNSET) for component in components]
+                   for slot in component_slots(component_type)]
+        if component_type.__dictoffset__:
+            columns.append([component.__dict__ for component in components])
+        return owners, columns
+    return chunk
+
+
+def write_string(snapshot, text):
+    encoded = text.encode('utf-8')
+    snapshot.write(LENGTH.pack(len(encoded)))
+    snapshot.write(encoded)
+
+
+def write_array(snapshot, column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    snapshot.write(COUNT.pack(len(column)))
+    snapshot.write(_array_bytes(column))
+
+
+def _write_column(snapshot, component_type, slot, column, indexes):
+    typecode = component_type.__column_types__.get(slot)
+    if typecode is not None:
+        if not isinstance(column, array):
+            try:
+                column = array(typecode, column)
+            except TypeError:
+                typecode = None
+    if typecode is not None:
+        snapshot.write(_TAG.pack(typecode.encode('ascii')))
+        write_array(snapshot, column)
+    else:
+        encoded = bytearray()
+        for value in column:
+            encode_value(value, encoded, indexes)
+        snapshot.write(_TAG.pack(OBJECTS))
+        snapshot.write(COUNT.pack(len(encoded)))
+        snapshot.write(encoded)
+
+
+def encode_value(value, out, indexes):
+    """ Appends the tagged encoding of a value to `out`, replacing Entities with their indexes.
+        Entities whose index is None are written as None.
+    """
+    if value is None:
+        out += b'N'
+    elif value is UNSET:
+        out += b'u'
+    elif value is True:
+        out += b'T'
+    elif value is False:
+        out += b'F'
+    elif isinstance(value, Entity):
+        try:
+            index = indexes[value]
+        except KeyError:
+            raise ValueError("{} is referred to but is not in the World".format(repr(value)))
+        out += b'N' if index is None else b'e' + _INT.pack(index)
+    elif isinstance(value, six.integer_types):
+        if -2 ** 63 <= value < 2 ** 63:
+            out += b'i' + _INT.pack(value)
+        else:
+            _encode_bytes(b'I', str(value).encode('ascii'), out)
+    elif isinstance(value, float):
+        out += b'f' + _FLOAT.pack(value)
+    elif isinstance(value, six.text_type):
+        _encode_bytes(b's', value.encode('utf-8'), out)
+    elif isinstance(value, bytes):
+        _encode_bytes(b'b', value, out)
+    elif isinstance(value, dict):
+        out += b'd' + LENGTH.pack(len(value))
+        for key, item in six.iteritems(value):
+            encode_value(key, out, indexes)
+            encode_value(item, out, indexes)
+    else:
+        tag = _CONTAINER_TAGS.get(type(value))
+        if tag is None:
+            raise ValueError("Cannot save values of type {}".format(type(value).__name__))
+        out += tag + LENGTH.pack(len(value))
+        for item in value:
+            encode_value(item, out, indexes)
+
+
+def _encode_bytes(tag, data, out):
+    out += tag + LENGTH.pack(len(data))
+    out += data
+
+
+_CONTAINER_TAGS = {list: b'l', tuple: b't', set: b'S', frozenset: b'z'}
+_CONTAINER_TYPES = dict((tag, container_type) for container_type, tag in six.iteritems(_CONTAINER_TAGS))
+
+
+def decode_value(data, position, entities):
+    """Decodes the value at `position` in `data`. Returns the value and the position after it."""
+    tag = data[position:position + 1]
+    position += 1
+    if tag == b'N':
+        return None, position
+    if tag == b'u':
+        return UNSET, position
+    if tag == b'T':
+        return True, position
+    if tag == b'F':
+        return False, position
+    if tag == b'e':
+        return entities[_INT.unpack_from(data, position)[0]], position + _INT.size
+    if tag == b'i':
+        return _INT.unpack_from(data, position)[0], position + _INT.size
+    if tag == b'f':
+        return _FLOAT.unpack_from(data, position)[0], position + _FLOAT.size
+    length, = LENGTH.unpack_from(data, position)
+    position += LENGTH.size
+    if tag in (b's', b'b', b'I'):
+        raw = bytes(data[position:position + length])
+        position += length
+        if tag == b's':
+            return raw.decode('utf-8'), position
+        if tag == b'I':
+            return int(raw.decode('ascii')), position
+        return raw, position
+    if tag == b'd':
+        value = dict()
+        for _ in six.moves.range(length):
+            key, position = decode_value(data, position, entities)
+            value[key], position = decode_value(data, position, entities)
+        return value, position
+    container_type = _CONTAINER_TYPES.get(tag)
+    if container_type is None:
+        raise ValueError("Corrupt snapshot: unknown value tag {!r}".format(tag))
+    items = []
+    for _ in six.moves.range(length):
+        item, position = decode_value(data, position, entities)
+        items.append(item)
+    return container_type(items), position
+
+
+def load(world, path):
+    """ Adds the Entities saved in `path` to an empty World, and restores its timer.
+        Returns the World.
+    """
+    load_entities(world, path)
+    return world
+
+
+def load_entities(world, path):
+    """ Adds the Entities saved in `path` to an empty World, and restores its timer.
+        If the World hands out integer ids, the Entities get back the ids they were saved with.
+        Returns a list of the Entities in snapshot index order.
+    """
+    if world.entities or world.mapped:
+        raise ValueError("Snapshots can only be loaded into an empty World without mapped storage")
+
+    with open(path, 'rb') as snapshot:
+        magic, format_version, timer, entity_count, table_count = HEADER.unpack(snapshot.read(HEADER.size))
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("{} is not a world snapshot".format(path))
+
+        entity_ids = read_array(snapshot, INDEX_TYPECODE)
+        entities = [Entity.blank() for _ in six.moves.range(entity_count)]
+        tables = [read_table(snapshot, entities) for _ in six.moves.range(table_count)]
+
+    types_by_entity = [() for _ in six.moves.range(entity_count)]
+    for component_type, _, chunks in tables:
+        for rows, _ in chunks:
+            for row in rows:
+                types_by_entity[row] += (component_type,)
+
+    compositions = dict()
+    members_by_composition = dict()
+    for entity, types in zip(entities, types_by_entity):
+        composition = compositions.get(types)
+        if composition is None:
+            composition = compositions[types] = Composition.of(types)
+            members_by_composition[composition] = []
+        members_by_composition[composition].append(entity)
+
+    if world.storage is not None:
+        _load_archetypes(world, entities, members_by_composition, tables)
+    else:
+        _load_components(entities, members_by_composition, tables)
+    for composition, members in six.iteritems(members_by_composition):
+        world._add_entities(members, composition)
+    if world.handles is not None:
+        world.handles.restore(entities, entity_ids)
+    world.timer = timer
+    return entities
+
+
+def _load_components(entities, members_by_composition, tables):
+    by_type = [dict() for _ in entities]
+    for component_type, slots, chunks in tables:
+        for rows, columns in chunks:
+            components = [object.__new__(component_type) for _ in rows]
+            for slot, column in zip(slots, columns):
+                if slot == DICT_SLOT:
+                    for component, value in zip(components, column):
+                        component.__dict__.update(value)
+                    continue
+                for component, value in zip(components, column):
+                    if value is not UNSET:
+                        setattr(component, slot, value)
+            for row, component in zip(rows, components):
+                by_type[row][component_type] = component
+
+    for entity, components in zip(entities, by_type):
+        component_set = entity.__dict__['components'] = object.__new__(ComponentSet)
+        component_set._entity = entity
+        component_set._by_type = components
+    for composition, members in six.iteritems(members_by_composition):
+        for entity in members:
+            entity.components.composition = composition
+
+
+def _load_archetypes(world, entities, members_by_composition, tables):
+    from braga.archetype import ArchetypeComponentSet
+
+    storage = world.storage
+    archetypes = dict()
+    positions = dict()
+    for composition, members in six.iteritems(members_by_composition):
+        archetype = storage.archetype(composition)
+        first_row = archetype.extend(members)
+        for row, entity in enumerate(members, first_row):
+            positions[entity] = row
+            archetypes[entity] = archetype
+            entity.__dict__['components'] = ArchetypeComponentSet(entity, storage, composition)
+
+    for component_type, slots, chunks in tables:
+        for rows, columns in chunks:
+            owners = [entities[row] for row in rows]
+            for slot, column in zip(slots, columns):
+                key = (component_type, slot)
+                for entity, value in zip(owners, column):
+                    if value is not UNSET:
+                        archetypes[entity].columns[key][positions[entity]] = value
+
+
+def read_exactly(snapshot, size):
+    data = snapshot.read(size)
+    if len(data) != size:
+        raise ValueError("Snapshot ends unexpectedly")
+    return data
+
+
+def read_length(snapshot):
+    return LENGTH.unpack(read_exactly(snapshot, LENGTH.size))[0]
+
+
+def read_string(snapshot):
+    return read_exactly(snapshot, read_length(snapshot)).decode('utf-8')
+
+
+def read_array(snapshot, typecode):
+    count, = COUNT.unpack(read_exactly(snapshot, COUNT.size))
+    column = array(typecode)
+    _extend_array(column, read_exactly(snapshot, count * column.itemsize))
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+def _read_column(snapshot, count, entities):
+    typecode = read_exactly(snapshot, 1)
+    if typecode != OBJECTS:
+        return read_array(snapshot, typecode.decode('ascii'))
+    size, = COUNT.unpack(read_exactly(snapshot, COUNT.size))
+    data = read_exactly(snapshot, size)
+    values = []
+    position = 0
+    for _ in six.moves.range(count):
+        value, position = decode_value(data, position, entities)
+        values.append(value)
+    return values
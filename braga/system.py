@@ -1,34 +1,113 @@
 import functools
+import inspect
+
+is_coroutine_function = getattr(inspect, 'iscoroutinefunction', lambda function: False)
 
 
 def call_hooks(function):
+    """ Wraps a System function so that the hooks subscribed to it run before and after it.
+
+        The hooks are kept on the wrapper as precompiled tuples of callbacks in
+        `wrapper.hooks[0]`, which the World rebuilds whenever a subscription
+        changes. While nothing is subscribed it holds None and the wrapper calls
+        straight through to the function.
+
+        `wrapper.hooks[1]` holds every hook including async ones, which only run
+        when the function is called through `System.call_async`.
+
+        `wrapper.hooks[2]` holds the callback of an EventRecorder, see
+        `braga.recording`, which is given the call before it runs.
+    """
+    hooks = [None, None, None]
+
+    def run(*args, **kwargs):
+        before, after = hooks[0]
+        if before:
+            run_hooks(before, *args, **kwargs)
+        result = function(*args, **kwargs)
+        if after:
+            run_hooks(after, *args, **kwargs)
+        return result
+
     @functools.wraps(function)
     def wrapper(*args, **kwargs):
-        run_hooks(function.system, function.__name__, 'before', *args, **kwargs)
+        compiled = hooks[0]
+        if compiled is None:
+            return function(*args, **kwargs)
+        if hooks[2] is not None:
+            return hooks[2](wrapper, run, args, kwargs)
+        before, after = compiled
+        if before:
+            run_hooks(before, *args, **kwargs)
         result = function(*args, **kwargs)
-        run_hooks(function.system, function.__name__, 'after', *args, **kwargs)
+        if after:
+            run_hooks(after, *args, **kwargs)
         return result
 
     wrapper.__wrapped__ = function
+    wrapper.hooks = hooks
     return wrapper
 
 
+def presentation(callback):
+    """ Marks a hook or event subscriber as only producing presentation text,
+        so that a World replaying an event log can skip it.
+    """
+    callback.presentation = True
+    return callback
+
+
 class System(object):
-    """Handler for modifying and updating Entities with a particular pattern of Components."""
+    """ Handler for modifying and updating Entities with a particular pattern of Components.
+
+        Systems can declare the Component types their `update` reads and writes,
+        as sets in `reads` and `writes`, so that the World can run Systems that do
+        not conflict at the same time. Undeclared Systems always run on their own.
+    """
+
+    reads = None
+    writes = None
 
     def __init__(self, world=None):
         if world:
             self.world = world
 
+    @property
+    def world(self):
+        """ The World the System belongs to. Unset until it is given one.
+            Setting it makes the System's functions run the hooks subscribed with that World.
+        """
+        try:
+            return self.__dict__['_world']
+        except KeyError:
+            raise AttributeError('world')
+
+    @world.setter
+    def world(self, world):
+        self.__dict__['_world'] = world
+        if world is not None:
+            world._compile_system(self)
+
     def __call__(self, func):
         setattr(func, 'system', self)
         wrapped_func = call_hooks(func)
         setattr(self, func.__name__, wrapped_func)
+        if hasattr(self, 'world'):
+            self.world._compile_hooks(self, func.__name__)
         return wrapped_func
 
+    def call_async(self, name, *args, **kwargs):
+        """ Calls one of the System's decorated functions from asyncio code.
+            Runs async hooks as well as sync ones; returns a coroutine.
+        """
+        from braga.aio import call_async
+        return call_async(getattr(self, name), *args, **kwargs)
+
+    def close(self):
+        """Releases anything the System holds outside the World. Called by `World.close`."""
+        pass
+
 
-def run_hooks(system, function_name, position, *fn_args, **fn_kwargs):
-    if hasattr(system, 'world'):
-        callbacks = system.world.subscriptions[system][function_name][position]
-        for callback in callbacks:
-            callback(*fn_args, **fn_kwargs)
+def run_hooks(callbacks, *fn_args, **fn_kwargs):
+    for callback in callbacks:
+        callback(*fn_args, **fn_kwargs)
@@ -0,0 +1,29 @@
+class View(object):
+    """ A live collection of the Entities in a World that match an Aspect.
+
+        Views are created with `World.register_view` and are kept up to date by
+        the World as Entities are made, destroyed, or gain or lose Components,
+        so reading one never rescans the World.
+    """
+
+    def __init__(self, aspect, entities):
+        self.aspect = aspect
+        self.entities = set(entities)
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, entity):
+        return entity in self.entities
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__, self.entities)
+
+    def _update(self, entity):
+        if self.aspect.matches(entity.signature):
+            self.entities.add(entity)
+        else:
+            self.entities.discard(entity)
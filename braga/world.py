@@ -1,30 +1,334 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 import six
 
+from braga.archetype import ArchetypeStorage
+from braga.commands import CommandBuffer
 from braga.entity import Entity
-from braga.system import System
+from braga.handle import EntityHandles
+from braga.mapped import MappedStorage
+from braga.readonly import ReadOnlyMapping
+from braga.scheduler import SystemScheduler
+from braga.shared_state import SharedStatePublisher
+from braga.system import System, is_coroutine_function
+from braga.view import View
+
+
+_EMPTY = frozenset()
+
+
+def joined_output(results):
+    """Joins the outputs of event subscribers, as returned by `World._dispatch`, skipping None."""
+    return '\n'.join([output for _, output in results if output is not None])
 
 
 class World(object):
-    """Collects all the Entities for a particular program."""
+    """ Collects all the Entities for a particular program.
+
+        By default each Entity keeps its own Component instances. A World made with
+        `storage='archetypes'` instead keeps Component values in columns shared by all
+        Entities with the same Composition, see `braga.archetype`. With `storage='mmap'`
+        the values are kept in memory-mapped files under `path`, and Entities are only
+        materialised when they are used, see `braga.mapped`.
+
+        A World made with `integer_ids=True` gives each of its Entities a dense integer
+        id with a generation counter, see `braga.handle`, and can look Entities up by id.
+
+        `refresh_workers` sets how many threads `refresh` may use to update Systems
+        that do not conflict, see `braga.scheduler`. With more than one, Systems cannot
+        make or destroy Entities or add or remove Components while `refresh` runs them
+        on other threads, as the World's indexes are shared between threads; they must
+        record those changes in `commands` instead. Systems that conflict with every
+        other System, as those that leave `reads` or `writes` undeclared do, always run
+        on the calling thread and can change anything. `close` stops the threads.
+
+        With `queue_events=True`, `publish` only queues events, and `step` dispatches
+        everything published since the last step in one batch per event type.
+
+        Structural changes recorded in `commands`, see `braga.commands`, are applied
+        at the end of every `refresh` and the start of every `step`.
 
-    def __init__(self):
-        self.entities = set()
+        Callbacks registered with `on_added` and `on_removed` are told whenever an
+        Entity in the World gains or loses a Component of a particular type.
+
+        `save` and `load` write and read binary snapshots, see `braga.snapshot`;
+        `track_changes` and `checkpoint` add incremental deltas, see `braga.delta`.
+        `record` logs the events and System calls that drive the World, so that they
+        can be replayed against its snapshot, see `braga.recording`.
+    """
+
+    def __init__(self, storage='objects', integer_ids=False, refresh_workers=1, queue_events=False, path=None):
+        self.mapped = storage == 'mmap'
+        if storage == 'objects':
+            self.storage = None
+        elif storage == 'archetypes':
+            self.storage = ArchetypeStorage()
+        elif self.mapped:
+            if path is None:
+                raise ValueError("Mapped storage needs a path")
+            self.storage = MappedStorage(path, world=self)
+        else:
+            raise ValueError("Unknown storage: {}".format(storage))
+
+        self.handles = EntityHandles() if integer_ids and not self.mapped else None
+        self.entities = self.storage.entities if self.mapped else set()
+        self.entities_by_component_type = defaultdict(set)
+        self.views = dict()
+        self.shared_states = []
         self.systems = defaultdict(lambda: None)
+        self.scheduler = SystemScheduler(max_workers=refresh_workers)
         self.timer = 0
-        self.subscriptions = defaultdict(lambda: defaultdict(lambda: {'after': [], 'before': []}))
+        self._subscriptions = defaultdict(lambda: defaultdict(lambda: {'after': [], 'before': []}))
+        self.event_subscriptions = defaultdict(list)
+        self.event_timeouts = dict()
+        self.batch_subscriptions = set()
+        self.coalesced_events = set()
+        self.event_queue = OrderedDict() if queue_events else None
+        self.commands = CommandBuffer(self)
+        self.added_observers = defaultdict(list)
+        self.removed_observers = defaultdict(list)
+        self.change_tracker = None
+        self.recorder = None
+        self.trackers = []
+        self.presenting = True
 
-    def refresh(self):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Stops the threads used by `refresh`, closes its Systems and any shared state publishers.
+            The World stays usable, unless it has mapped storage, which is flushed and closed.
+        """
+        self.scheduler.shutdown()
         for system in six.itervalues(self.systems):
-            system.update()
+            if system is not None:
+                system.close()
+        for shared_state in list(self.shared_states):
+            shared_state.close()
+        if self.mapped:
+            self.storage.close()
+
+    def refresh(self):
+        """ Updates every System, in the order they were added unless they can safely overlap,
+            then applies the commands they recorded.
+        """
+        if self.recorder is not None:
+            return self.recorder.refresh(self._refresh)
+        self._refresh()
+
+    def _refresh(self):
+        self.scheduler.run([system for system in six.itervalues(self.systems) if system is not None])
+        self.apply_commands()
+
+    def _check_structure(self):
+        """Raises a ValueError if Systems are running on other threads, see `refresh_workers`."""
+        if self.scheduler.concurrent:
+            raise ValueError("Entities and their Components cannot change while Systems run concurrently; "
+                             "record the change in world.commands")
 
     def step(self):
+        """ Advances the World's timer, dispatching any queued events.
+            Returns the output of the event subscribers.
+        """
+        if self.recorder is not None:
+            return self.recorder.step(self._step)
+        return self._step()
+
+    def _step(self):
+        output = joined_output(self._start_step())
+        self._finish_step()
+        return output
+
+    def _start_step(self):
+        """ Advances the timer, applies the recorded commands and dispatches any queued events.
+            Returns the results of the event subscribers, see `_dispatch`.
+        """
         self.timer += 1
+        self.apply_commands()
+        return self._dispatch_queued_events() if self.event_queue else []
+
+    def _finish_step(self):
+        for shared_state in self.shared_states:
+            if not shared_state.closed:
+                shared_state.publish()
+
+    def _dispatch_queued_events(self):
+        """ Dispatches every queued event, one batch per event type, in the order the types were first published.
+            Events published while dispatching are queued for the next step.
+        """
+        queue, self.event_queue = self.event_queue, OrderedDict()
+        results = []
+        for event, batch in six.iteritems(queue):
+            if event in self.coalesced_events:
+                batch = list(OrderedDict.fromkeys(batch))
+            results.extend(self._dispatch(event, batch))
+        return results
+
+    def _dispatch(self, event, batch):
+        """ Calls the subscribers of `event` for a list of involved-Entity tuples.
+            Batch subscribers get the whole list in one call; the rest are called once per tuple.
+
+            Returns a list of ((event, subscriber), output) pairs, one per call.
+        """
+        results = []
+        for callback in self.event_subscriptions.get(event, ()):
+            if not self.presenting and getattr(callback, 'presentation', False):
+                continue
+            subscription = (event, callback)
+            if subscription in self.batch_subscriptions:
+                results.append((subscription, callback(batch)))
+            else:
+                results.extend([(subscription, callback(*involved_entities)) for involved_entities in batch])
+        return results
+
+    def apply_commands(self):
+        """Applies the structural changes recorded in `commands`."""
+        if self.commands:
+            self.commands.apply()
+
+    def share_state(self, name, columns, capacity):
+        """ Publishes numeric Component columns to a shared memory block at every `step`.
+            :param name: name of the shared memory block, for readers to attach to
+            :type name: str.
+            :param columns: (Component type, slot) pairs to publish
+            :type columns: list.
+            :param capacity: the most Entities any one published Component type may have
+            :type capacity: int.
+
+            Other processes can read the block with `braga.shared_state.SharedStateReader`.
+
+            Returns a SharedStatePublisher.
+        """
+        publisher = SharedStatePublisher(self, name, columns, capacity)
+        publisher.publish()
+        self.shared_states.append(publisher)
+        return publisher
+
+    def unshare_state(self, publisher):
+        """Stops publishing a block made by `share_state`, and removes it."""
+        if publisher not in self.shared_states:
+            raise ValueError("{0} does not share {1}".format(repr(self), publisher.name))
+        publisher.close()
+
+    def save(self, path):
+        """ Writes the World's Entities and Components to a binary snapshot at `path`.
+            See `braga.snapshot` for the format.
+
+            Returns a dictionary of the Entities to their indexes in the snapshot.
+        """
+        from braga.snapshot import save
+        return save(self, path)
+
+    @classmethod
+    def load(cls, path, delta_log=None, **kwargs):
+        """ Makes a World from a snapshot written by `save` or `track_changes`,
+            then replays the checkpoints in `delta_log` onto it if one is given.
+            Takes the same kwargs as `World()`, so a snapshot can be loaded with either storage.
+
+            Returns a World.
+        """
+        from braga.snapshot import load_entities
+        world = cls(**kwargs)
+        entities = load_entities(world, path)
+        if delta_log is not None:
+            from braga.delta import replay
+            replay(world, entities, delta_log)
+        return world
+
+    def track_changes(self, path, delta_log):
+        """ Saves a base snapshot to `path` and starts following changes to the World,
+            so that `checkpoint` can append only what changed to `delta_log`.
+            See `braga.delta`.
+
+            Returns a ChangeTracker.
+        """
+        from braga.delta import ChangeTracker
+        if self.change_tracker is not None:
+            raise ValueError("{} is already tracking changes".format(repr(self)))
+        self.change_tracker = ChangeTracker(self, self.save(path), delta_log)
+        self.trackers.append(self.change_tracker)
+        return self.change_tracker
+
+    def checkpoint(self):
+        """ Appends the changes made since the last checkpoint to the delta log.
+            Returns the number of changes written.
+        """
+        if self.change_tracker is None:
+            raise ValueError("{} is not tracking changes".format(repr(self)))
+        return self.change_tracker.checkpoint()
+
+    def mark_changed(self, entity, component_type):
+        """ Tells the World that an Entity's Component of `component_type` was changed in place,
+            such as by adding to a set held in one of its slots, so that the next `checkpoint` includes it.
+            Does nothing if the World is not tracking changes.
+        """
+        if self.change_tracker is not None:
+            self.change_tracker.mark_changed(entity, component_type)
+
+    def record(self, path, event_log):
+        """ Saves a snapshot to `path` and starts logging the events published to the World,
+            and its `step` and `refresh` calls, to `event_log`.
+            See `braga.recording`.
+
+            Returns an EventRecorder, whose `record_system` adds a System's calls to the log.
+        """
+        from braga.recording import EventRecorder
+        if self.recorder is not None:
+            raise ValueError("{} is already recording".format(repr(self)))
+        self.recorder = EventRecorder(self, self.save(path), event_log)
+        return self.recorder
 
     def entities_with_aspect(self, aspect):
-        """Returns a set of Entities in the World with a particular Aspect."""
-        return set([entity for entity in self.entities if entity in aspect])
+        """ Returns a set of Entities in the World with a particular Aspect.
+
+            Starts from the smallest of the per-Component-type indexes named in
+            `all_of` and narrows from there, so the cost follows the size of the
+            candidate set rather than the size of the World.
+        """
+        view = self.views.get(aspect)
+        if view is not None:
+            return set(view.entities)
+        if self.mapped:
+            return self.storage.entities_with_aspect(aspect)
+
+        index = self.entities_by_component_type
+
+        if aspect.all_of:
+            indexes = sorted([index.get(component_type, _EMPTY) for component_type in aspect.all_of], key=len)
+            result = indexes[0].intersection(*indexes[1:])
+            if aspect.some_of_mask:
+                some_of_mask = aspect.some_of_mask
+                result = set([entity for entity in result if entity.signature & some_of_mask])
+        elif aspect.some_of:
+            result = set().union(*[index.get(component_type, _EMPTY) for component_type in aspect.some_of])
+        else:
+            result = set(self.entities)
+
+        if aspect.exclude_mask and result:
+            exclude_mask = aspect.exclude_mask
+            result = set([entity for entity in result if not entity.signature & exclude_mask])
+
+        return result
+
+    def register_view(self, aspect):
+        """ Returns a View of the Entities with a particular Aspect that the World keeps up to date.
+            Registering the same Aspect again returns the existing View.
+            Views stay registered until `drop_view` is called.
+        """
+        view = self.views.get(aspect)
+        if view is None:
+            view = self.views[aspect] = View(aspect, self.entities_with_aspect(aspect))
+        return view
+
+    def drop_view(self, aspect):
+        """Stops maintaining the View for an Aspect."""
+        try:
+            del self.views[aspect]
+        except KeyError:
+            raise ValueError("{0} has no view for {1}".format(repr(self), repr(aspect)))
 
     def make_entity(self, assemblage=None, **kwargs):
         """ Creates an Entity for this World.
@@ -35,48 +339,290 @@ class World(object):
 
             Returns an Entity.
         """
+        self._check_structure()
+
+        new_entity = self._create_entity(assemblage, kwargs)
+        self._add_entities([new_entity], new_entity.components.composition)
+        return new_entity
 
-        if not assemblage:
-            new_entity = Entity()
+    def _create_entity(self, assemblage, kwargs, pending=False):
+        """ Builds an Entity in the World's storage without adding it to the World.
+            A `pending` Entity is kept out of the storage until it is adopted, see `CommandBuffer`.
+        """
+        if self.storage is not None:
+            component_kwargs = assemblage.component_kwargs(**kwargs) if assemblage else []
+            if pending:
+                return self.storage.make_pending_entity(component_kwargs)
+            return self.storage.make_entity(component_kwargs)
+        elif not assemblage:
+            return Entity()
         else:
-            new_entity = assemblage.make(**kwargs)
+            return assemblage.make(**kwargs)
 
-        self.entities.add(new_entity)
-        return new_entity
+    def make_entities(self, assemblage, count, columns=None, **kwargs):
+        """ Creates `count` Entities for this World in one batch.
+            :param assemblage: Assemblage the Entities should be built with
+            :type assemblage: Assemblage.
+            :param count: how many Entities to make
+            :type count: int.
+            :param columns: property names mapped to sequences of one initial value per Entity
+            :type columns: dict.
+
+            Can take kwargs that are used as initial values for every Entity.
+
+            Returns a list of Entities.
+        """
+        self._check_structure()
+
+        composition = assemblage.composition
+        if self.storage is not None:
+            new_entities = self.storage.make_entities(
+                assemblage.component_kwargs_for_many(count, columns, **kwargs), composition)
+        else:
+            new_entities = assemblage.make_many(count, columns, **kwargs)
+
+        self._add_entities(new_entities, composition)
+        return new_entities
+
+    def _add_entities(self, new_entities, composition):
+        """Adds Entities that all have the same Composition to the World and its indexes."""
+        for entity in new_entities:
+            entity.__dict__['_world'] = self
+        if not self.mapped:
+            self.entities.update(new_entities)
+            for component_type in composition.types:
+                self.entities_by_component_type[component_type].update(new_entities)
+        if self.handles is not None:
+            for entity in new_entities:
+                self.handles.allocate(entity)
+        for view in six.itervalues(self.views):
+            if view.aspect.matches(composition.signature):
+                view.entities.update(new_entities)
+        for component_type in composition.types:
+            callbacks = self.added_observers.get(component_type)
+            if callbacks:
+                for entity in new_entities:
+                    self._run_observers(callbacks, entity, entity.components._by_type[component_type])
+        for tracker in self.trackers:
+            tracker.entities_added(new_entities)
 
     def destroy_entity(self, entity):
         """Removes entity from the world."""
-        try:
-            self.entities.remove(entity)
-        except KeyError:
+        self._check_structure()
+        if entity not in self.entities:
             raise ValueError("{0} does not contain {1}".format(repr(self), repr(entity)))
+        if not self.mapped:
+            self.entities.remove(entity)
+
+        entity.__dict__['_world'] = None
+        for tracker in self.trackers:
+            tracker.entity_destroyed(entity)
+        if self.handles is not None:
+            self.handles.release(entity)
+        if self.storage is not None:
+            self.storage.remove(entity)
+        if not self.mapped:
+            for component_type in entity.components.types():
+                self.entities_by_component_type[component_type].discard(entity)
+        for view in six.itervalues(self.views):
+            view.entities.discard(entity)
+        for component_type in entity.components.types():
+            callbacks = self.removed_observers.get(component_type)
+            if callbacks:
+                self._run_observers(callbacks, entity, entity.components._by_type[component_type])
+
+    def get_entity(self, entity_id):
+        """ Returns the Entity with a given integer id.
+            Raises a ValueError if the id is stale or unknown, or the World does not use integer ids.
+        """
+        if self.mapped:
+            entity = self.storage.entity(entity_id)
+            if entity is None:
+                raise ValueError("{0} has no entity with id {1}".format(repr(self), entity_id))
+            return entity
+        if self.handles is None:
+            raise ValueError("{} does not use integer ids".format(repr(self)))
+        entity = self.handles.get(entity_id)
+        if entity is None:
+            if self.handles.is_stale(entity_id):
+                raise ValueError("Entity id {} is stale".format(entity_id))
+            raise ValueError("{0} has no entity with id {1}".format(repr(self), entity_id))
+        return entity
+
+    def on_added(self, component_type, callback):
+        """ Calls `callback` with the Entity and the Component whenever an Entity in the World
+            gains a Component of exactly `component_type`, including when it is made with one.
+        """
+        if not hasattr(callback, '__call__'):
+            raise TypeError("Only callables can observe Component changes")
+        self.added_observers[component_type].append(callback)
+
+    def on_removed(self, component_type, callback):
+        """ Calls `callback` with the Entity and the Component whenever an Entity in the World
+            loses a Component of exactly `component_type`, including when it is destroyed.
+        """
+        if not hasattr(callback, '__call__'):
+            raise TypeError("Only callables can observe Component changes")
+        self.removed_observers[component_type].append(callback)
+
+    def stop_observing(self, component_type, callback):
+        """ Removes a callback registered with `on_added` and/or `on_removed`.
+            Raises a ValueError if it was registered with neither.
+        """
+        found = False
+        for observers in (self.added_observers, self.removed_observers):
+            callbacks = observers.get(component_type, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+                found = True
+        if not found:
+            raise ValueError("{0} is not observing {1}".format(repr(callback), component_type.__name__))
+
+    @staticmethod
+    def _run_observers(callbacks, entity, component):
+        for callback in tuple(callbacks):
+            callback(entity, component)
+
+    def _component_added(self, entity, component_type, component):
+        if not self.mapped:
+            self.entities_by_component_type[component_type].add(entity)
+        for view in six.itervalues(self.views):
+            view._update(entity)
+        callbacks = self.added_observers.get(component_type)
+        if callbacks:
+            self._run_observers(callbacks, entity, component)
+        for tracker in self.trackers:
+            tracker.component_added(entity, component_type, component)
+
+    def _component_removed(self, entity, component_type, component):
+        if not self.mapped:
+            self.entities_by_component_type[component_type].discard(entity)
+        for view in six.itervalues(self.views):
+            view._update(entity)
+        callbacks = self.removed_observers.get(component_type)
+        if callbacks:
+            self._run_observers(callbacks, entity, component)
+        for tracker in self.trackers:
+            tracker.component_removed(entity, component_type, component)
 
     def add_system(self, system_type):
-        """ Creates a System for this World.
-            :param system_type: user-defined System class that the new System should be an instance of
+        """ Creates a System for this World, or adds a System that has already been made.
+            :param system_type: user-defined System class that the new System should be an instance of,
+                or a System made without a World, such as a configured ShardedSystem or ColumnSystem
             :type system_type: System
 
+            Raises a ValueError if the World already has a System of that type,
+            or if the System given belongs to another World.
+
             Returns a System.
         """
 
-        if not issubclass(system_type, System):
+        new_system = None
+        if isinstance(system_type, System):
+            new_system, system_type = system_type, type(system_type)
+            if getattr(new_system, 'world', self) is not self:
+                raise ValueError("{} belongs to another World".format(repr(new_system)))
+        elif not issubclass(system_type, System):
             raise ValueError("{} is not a type of System".format(system_type.__name__))
         if self.systems[system_type]:
             raise ValueError("World already contains a System of type {}".format(repr(system_type)))
 
-        new_system = system_type(world=self)
+        if new_system is None:
+            new_system = system_type(world=self)
+        elif getattr(new_system, 'world', None) is not self:
+            new_system.world = self
         self.systems[system_type] = new_system
 
         return new_system
 
     def publish(self, event, *involved_entities):
-        """Publishes an event to the World."""
-        callbacks = self.subscriptions[event]
-        extra_output = '\n'.join([callback(*involved_entities) for callback in callbacks])
+        """ Publishes an event to the World.
+            If the World queues events, the event is only dispatched at the next `step`, and None is returned.
+        """
+        if self.recorder is not None:
+            return self.recorder.publish(self._publish, event, involved_entities)
+        return self._publish(event, involved_entities)
+
+    def _publish(self, event, involved_entities):
+        if self.event_queue is not None:
+            self.event_queue.setdefault(event, []).append(involved_entities)
+            return None
+
+        extra_output = joined_output(self._dispatch(event, [involved_entities]))
         self.step()
         return extra_output
 
+    def coalesce_events(self, event, coalesce=True):
+        """ Sets whether queued publications of `event` with the same involved Entities
+            are dispatched only once per step.
+        """
+        if coalesce:
+            self.coalesced_events.add(event)
+        else:
+            self.coalesced_events.discard(event)
+
+    def publish_async(self, event, *involved_entities):
+        """ Publishes an event to the World from asyncio code, returning a coroutine.
+            Subscribers are called as by `publish`; those that return awaitables are awaited
+            concurrently, each within the timeout it was subscribed with.
+            If the World queues events, the event is only dispatched at the next step.
+        """
+        if self.recorder is not None:
+            raise ValueError("Events published from asyncio code cannot be recorded")
+        from braga.aio import publish_async
+        return publish_async(self, event, *involved_entities)
+
+    def step_async(self):
+        """ Advances the World's timer from asyncio code, returning a coroutine.
+            Queued events are dispatched as by `step`, awaiting async subscribers as `publish_async` does.
+        """
+        if self.recorder is not None:
+            raise ValueError("Steps taken from asyncio code cannot be recorded")
+        from braga.aio import step_async
+        return step_async(self)
+
+    def subscribe_to_event(self, event, callback, timeout=None, batch=False):
+        """ Calls `callback` with the involved Entities whenever `event` is published.
+            The callback should return a string of output, or None.
+            Async callbacks can only be used with `publish_async`, which gives up on them after
+            `timeout` seconds if one is given.
+            With `batch`, the callback is instead called once per dispatch with a list of
+            involved-Entity tuples, one per publication.
+        """
+        if not hasattr(callback, '__call__'):
+            raise TypeError("Only callables can be subscribed to events")
+
+        self.event_subscriptions[event].append(callback)
+        if timeout is not None:
+            self.event_timeouts[(event, callback)] = timeout
+        if batch:
+            self.batch_subscriptions.add((event, callback))
+
+    def unsubscribe_from_event(self, event, callback):
+        try:
+            self.event_subscriptions.get(event, []).remove(callback)
+        except ValueError:
+            raise ValueError("{0} is not subscribed to {1}".format(repr(callback), repr(event)))
+        self.event_timeouts.pop((event, callback), None)
+        self.batch_subscriptions.discard((event, callback))
+
+    @property
+    def subscriptions(self):
+        """ The callbacks subscribed with `subscribe`, by System, then method, then 'before' or 'after'.
+            Read-only, since System functions run compiled copies of them; use `subscribe` and `unsubscribe`.
+        """
+        return ReadOnlyMapping(self._subscriptions, lambda methods: ReadOnlyMapping(
+            methods, lambda hooks: ReadOnlyMapping(hooks, tuple)))
+
+    def _compile_system(self, system):
+        """Rebuilds the callback tuples of every decorated function of a System."""
+        for method in list(system.__dict__):
+            self._compile_hooks(system, method)
+
     def subscribe(self, system, method, callback, before=False, after=False):
+        """ Runs `callback` with the same arguments before and/or after a System's decorated function.
+            Async callbacks only run when the function is called with `System.call_async`.
+        """
         if not (before or after):
             raise ValueError("You won't actually subscribe anything to anything unless you set before or after")
 
@@ -84,6 +630,59 @@ class World(object):
             raise TypeError("Only callables can be registered as preactions or reactions")
 
         if before:
-            self.subscriptions[system][method]['before'].append(callback)
+            self._subscriptions[system][method]['before'].append(callback)
         if after:
-            self.subscriptions[system][method]['after'].append(callback)
+            self._subscriptions[system][method]['after'].append(callback)
+
+        self._compile_hooks(system, method)
+
+    def unsubscribe(self, system, method, callback, before=False, after=False):
+        """ Removes a callback subscribed with `subscribe`.
+            Raises a ValueError if the callback was not subscribed at the given time.
+        """
+        if not (before or after):
+            raise ValueError("You won't actually unsubscribe anything from anything unless you set before or after")
+
+        hooks = self._subscriptions.get(system, {}).get(method)
+        positions = [position for position, chosen in (('before', before), ('after', after)) if chosen]
+        if hooks is None or any(callback not in hooks[position] for position in positions):
+            raise ValueError("{0} is not subscribed to {1}".format(repr(callback), method))
+
+        for position in positions:
+            hooks[position].remove(callback)
+
+        self._compile_hooks(system, method)
+
+    def _compile_hooks(self, system, method):
+        """ Rebuilds the callback tuples that a System's decorated function runs.
+            Only subscriptions made with the System's own World take effect.
+        """
+        if getattr(system, 'world', None) is not self:
+            return
+        hooks = getattr(system.__dict__.get(method), 'hooks', None)
+        if hooks is None:
+            return
+
+        subscriptions = self._subscriptions.get(system, {}).get(method)
+        if subscriptions and (subscriptions['before'] or subscriptions['after']):
+            before, after = subscriptions['before'], subscriptions['after']
+            if not self.presenting:
+                before = [callback for callback in before if not getattr(callback, 'presentation', False)]
+                after = [callback for callback in after if not getattr(callback, 'presentation', False)]
+            hooks[0] = (tuple(callback for callback in before if not is_coroutine_function(callback)),
+                        tuple(callback for callback in after if not is_coroutine_function(callback)))
+            hooks[1] = (tuple(before), tuple(after))
+            if not (hooks[0][0] or hooks[0][1] or hooks[2]):
+                hooks[0] = None
+        else:
+            hooks[0] = ((), ()) if hooks[2] is not None else None
+            hooks[1] = None
+
+    def present(self, presenting=True):
+        """ Sets whether hooks and event subscribers marked with `braga.system.presentation` run.
+            Replays turn them off, since their only effect is text.
+        """
+        self.presenting = presenting
+        for system, methods in list(self._subscriptions.items()):
+            for method in list(methods):
+                self._compile_hooks(system, method)
@@ -16,4 +16,5 @@ if __name__ == '__main__':
           license='MIT',
           packages=['braga'],
           install_requires=['six'],
+          extras_require={'numpy': ['numpy']},
           zip_safe=False)
@@ -0,0 +1,17 @@
+import asyncio
+
+
+def make_slow_callback(delay, output, calls):
+    async def callback(*entities):
+        calls.append(('start', output))
+        await asyncio.sleep(delay)
+        calls.append(('end', output))
+        return output
+    return callback
+
+
+def make_async_hook(calls, label):
+    async def hook(*args, **kwargs):
+        await asyncio.sleep(0)
+        calls.append((label, args))
+    return hook
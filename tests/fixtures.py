@@ -1,4 +1,8 @@
-from braga import Component
+import shutil
+import tempfile
+import unittest
+
+from braga import Aspect, Component
 
 
 class Alive(Component):
@@ -55,3 +59,28 @@ class Location(Component):
     def __init__(self, x=0, y=0):
         self.x = x
         self.y = y
+
+
+class Health(Component):
+
+    __slots__ = ['hit_points', 'target']
+    __column_types__ = {'hit_points': 'd'}
+
+    def __init__(self, hit_points=10, target=None):
+        self.hit_points = hit_points
+        self.target = target
+
+
+def located(world):
+    """Returns the Entities of a World that have a Location, by their x coordinate."""
+    return dict((entity.x, entity) for entity in world.entities_with_aspect(Aspect(all_of=set([Location]))))
+
+
+class TemporaryDirectoryTestCase(unittest.TestCase):
+    """Gives each test a temporary `directory`, removed after it runs."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
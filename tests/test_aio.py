@@ -0,0 +1,82 @@
+import unittest
+
+import six
+
+from braga import System, World
+
+if six.PY3:
+    import asyncio
+    from tests.async_callbacks import make_async_hook, make_slow_callback
+
+
+@unittest.skipIf(six.PY2, "asyncio is not available")
+class TestAsyncPublishing(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World()
+        self.calls = []
+
+    def test_publish_async_gathers_subscribers_concurrently(self):
+        self.world.subscribe_to_event('duel', make_slow_callback(0.05, 'first', self.calls))
+        self.world.subscribe_to_event('duel', make_slow_callback(0.01, 'second', self.calls))
+        self.world.subscribe_to_event('duel', lambda *entities: 'sync')
+
+        output = asyncio.run(self.world.publish_async('duel'))
+
+        self.assertEqual(output, 'first\nsecond\nsync')
+        self.assertEqual(self.calls[:2], [('start', 'first'), ('start', 'second')])
+        self.assertEqual(self.world.timer, 1)
+
+    def test_slow_subscribers_time_out(self):
+        self.world.subscribe_to_event('duel', make_slow_callback(5, 'slow', self.calls), timeout=0.01)
+        self.world.subscribe_to_event('duel', make_slow_callback(0, 'fast', self.calls), timeout=1)
+
+        output = asyncio.run(self.world.publish_async('duel'))
+
+        self.assertEqual(output, 'fast')
+        self.assertNotIn(('end', 'slow'), self.calls)
+
+    def test_publish_async_calls_batch_subscribers_with_the_batch(self):
+        batches = []
+        self.world.subscribe_to_event('duel', lambda batch: batches.append(batch) or 'batch', batch=True)
+
+        self.assertEqual(asyncio.run(self.world.publish_async('duel', 'harry', 'draco')), 'batch')
+        self.assertEqual(batches, [[('harry', 'draco')]])
+
+    def test_publish_async_queues_events_on_a_queueing_world(self):
+        world = World(queue_events=True)
+        world.subscribe_to_event('duel', make_slow_callback(0.01, 'slow', self.calls), timeout=1)
+        world.subscribe_to_event('duel', lambda *entities: 'sync')
+
+        self.assertIsNone(asyncio.run(world.publish_async('duel')))
+        self.assertEqual((self.calls, world.timer), ([], 0))
+        self.assertEqual(asyncio.run(world.step_async()), 'slow\nsync')
+        self.assertEqual(world.timer, 1)
+        self.assertEqual(world.event_queue, {})
+
+    def test_sync_publish_is_unchanged(self):
+        self.world.subscribe_to_event('duel', lambda first, second: '{} vs {}'.format(first, second))
+
+        self.assertEqual(self.world.publish('duel', 'harry', 'draco'), 'harry vs draco')
+        self.assertEqual(self.world.publish('other event'), '')
+
+    def test_async_hooks_run_through_call_async(self):
+        system = System(self.world)
+        sync_calls = []
+
+        @system
+        def cast(spell):
+            self.calls.append(('cast', (spell,)))
+            return spell
+
+        self.world.subscribe(system, 'cast', make_async_hook(self.calls, 'before'), before=True)
+        self.world.subscribe(system, 'cast', make_async_hook(self.calls, 'after'), after=True)
+        self.world.subscribe(system, 'cast', lambda spell: sync_calls.append(spell), after=True)
+
+        self.assertEqual(asyncio.run(system.call_async('cast', 'expelliarmus')), 'expelliarmus')
+        self.assertEqual(self.calls, [('before', ('expelliarmus',)), ('cast', ('expelliarmus',)), ('after', ('expelliarmus',))])
+
+        self.calls[:] = []
+        system.cast('lumos')
+        self.assertEqual(self.calls, [('cast', ('lumos',))])
+        self.assertEqual(sync_calls, ['expelliarmus', 'lumos'])
@@ -0,0 +1,136 @@
+import gc
+import unittest
+from array import array
+
+from braga import World, Assemblage, Aspect, Component
+from braga.archetype import Archetype, _live_views
+from braga.composition import Composition
+from tests.fixtures import Alive, Portable, Container, Moveable, Location
+
+
+class Health(Component):
+
+    __slots__ = ['hit_points']
+    __column_types__ = {'hit_points': 'd'}
+
+    def __init__(self, hit_points=10):
+        self.hit_points = hit_points
+
+
+class TestArchetypeStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World(storage='archetypes')
+        self.mover_factory = Assemblage([Moveable, Location, Health])
+
+    def archetype_of(self, *component_types):
+        return self.world.storage.archetypes[Composition.of(component_types)]
+
+    def test_unknown_storage_is_rejected(self):
+        with self.assertRaises(ValueError):
+            World(storage='bogus')
+
+    def test_entities_with_same_composition_share_a_table(self):
+        first = self.world.make_entity(self.mover_factory, x=1, v_y=2)
+        second = self.world.make_entity(self.mover_factory, x=3, v_y=4)
+
+        archetype = self.archetype_of(Moveable, Location, Health)
+        self.assertEqual(archetype.entities, [first, second])
+        self.assertEqual(archetype.columns[(Location, 'x')], [1, 3])
+        self.assertEqual(archetype.columns[(Moveable, 'v_y')], [2, 4])
+        self.assertEqual(archetype.columns[(Health, 'hit_points')], array('d', [10, 10]))
+
+    def test_attribute_access_reads_and_writes_columns(self):
+        mover = self.world.make_entity(self.mover_factory)
+        archetype = self.archetype_of(Moveable, Location, Health)
+
+        mover.x = 5
+        self.assertEqual(archetype.columns[(Location, 'x')][0], 5)
+
+        mover.get_component(Health).hit_points -= 2.5
+        self.assertEqual(mover.hit_points, 7.5)
+        self.assertTrue(isinstance(mover.get_component(Location), Location))
+
+    def test_component_methods_work_on_views(self):
+        cat = self.world.make_entity(Assemblage([Alive, Container, Portable]))
+        food = self.world.make_entity(Assemblage([Portable]))
+
+        cat.die()
+        self.assertFalse(cat.alive)
+        cat.pick_up(food)
+        self.assertIn(food, cat.inventory)
+
+    def test_adding_and_removing_components_moves_rows(self):
+        mover = self.world.make_entity(self.mover_factory, x=4)
+        other = self.world.make_entity(self.mover_factory, x=6)
+
+        mover.components.add(Alive(alive=False))
+        self.assertIs(mover._archetype, self.archetype_of(Moveable, Location, Health, Alive))
+        self.assertEqual(mover.x, 4)
+        self.assertFalse(mover.alive)
+        self.assertEqual(other.x, 6)
+        self.assertEqual(len(self.archetype_of(Moveable, Location, Health)), 1)
+
+        location = mover.get_component(Location)
+        mover.components.remove(location)
+        self.assertFalse(mover.has_component(Location))
+        self.assertEqual(location.x, 4)
+        self.assertEqual(mover.alive, False)
+
+    def test_destroyed_entities_keep_their_values(self):
+        mover = self.world.make_entity(self.mover_factory, x=4)
+        other = self.world.make_entity(self.mover_factory, x=6)
+
+        self.world.destroy_entity(mover)
+        self.assertEqual(mover.x, 4)
+        self.assertEqual(other.x, 6)
+        self.assertEqual(self.archetype_of(Moveable, Location, Health).entities, [other])
+
+        mover.components.add(Alive())
+        self.assertNotIn(Composition.of([Moveable, Location, Health, Alive]), self.world.storage.archetypes)
+
+    def test_views_are_made_on_access_and_hold_only_a_row(self):
+        mover = self.world.make_entity(self.mover_factory, x=4)
+        other = self.world.make_entity(self.mover_factory, x=6)
+        self.assertNotIn((mover, Location), _live_views)
+
+        location = mover.get_component(Location)
+        self.assertIs(mover.get_component(Location), location)
+        self.assertFalse(hasattr(location, '__dict__'))
+        self.assertEqual(type(location).__slots__, ['_block', '_row', '__weakref__'])
+
+        self.world.destroy_entity(other)
+        mover.components.add(Alive())
+        self.assertEqual(location.x, 4)
+        location.x = 5
+        self.assertEqual(mover.x, 5)
+
+        del location
+        gc.collect()
+        self.assertNotIn((mover, Location), _live_views)
+
+    def test_aspects_and_archetypes(self):
+        mover = self.world.make_entity(self.mover_factory)
+        self.world.make_entity(Assemblage([Location]))
+
+        aspect = Aspect(all_of=set([Moveable]))
+        self.assertEqual(self.world.entities_with_aspect(aspect), set([mover]))
+        self.assertEqual(self.world.storage.archetypes_with_aspect(aspect), [self.archetype_of(Moveable, Location, Health)])
+
+
+class TestArchetype(unittest.TestCase):
+
+    def test_removing_a_row_moves_the_last_row(self):
+        class Owner(object):
+            pass
+
+        archetype = Archetype(Composition.of([Location]))
+        owners = [Owner() for _ in range(3)]
+        for i, owner in enumerate(owners):
+            archetype.append(owner, {(Location, 'x'): i})
+
+        archetype.remove(0)
+
+        self.assertEqual(archetype.entities, [owners[2], owners[1]])
+        self.assertEqual(archetype.columns[(Location, 'x')], [2, 1])
+        self.assertEqual(owners[2]._row, 0)
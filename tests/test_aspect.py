@@ -80,3 +80,25 @@ class TestAspect(unittest.TestCase):
         self.assertFalse(aspect.is_interested_in(self.zombie))
 
         self.assertEqual(aspect.select_entities(self.entities), set([self.cat, self.brains]))
+
+    def test_aspect_recompiles_when_pattern_is_replaced(self):
+        aspect = Aspect(all_of=set([Alive]))
+        self.assertTrue(aspect.is_interested_in(self.plant))
+
+        aspect.all_of = set([Alive, Container])
+        self.assertFalse(aspect.is_interested_in(self.plant))
+        self.assertTrue(aspect.is_interested_in(self.cat))
+
+    def test_aspect_patterns_cannot_be_changed_in_place(self):
+        aspect = Aspect(all_of=set([Alive]))
+        with self.assertRaises(AttributeError):
+            aspect.all_of.add(Container)
+        self.assertEqual(aspect.all_of, frozenset([Alive]))
+        self.assertTrue(aspect.is_interested_in(self.plant))
+
+    def test_entity_signature_tracks_components(self):
+        aspect = Aspect(all_of=set([Alive]))
+        self.assertFalse(aspect.is_interested_in(self.bathtub))
+
+        self.bathtub.components.add(Alive())
+        self.assertTrue(aspect.is_interested_in(self.bathtub))
@@ -88,3 +88,64 @@ class TestAssemblage(unittest.TestCase):
             exception_message = str(e.exception)
 
         self.assertEqual(exception_message, "Unknown initial properties: live, aliv")
+
+    def test_make_many_with_shared_and_per_entity_values(self):
+        cat_factory = Assemblage(components=[Alive, Container])
+        cats = cat_factory.make_many(3, columns={'alive': [True, False, True]}, inventory=set([self.food]))
+
+        self.assertEqual(len(cats), 3)
+        self.assertEqual([cat.alive for cat in cats], [True, False, True])
+        for cat in cats:
+            self.assertIn(self.food, cat.inventory)
+            self.assertIs(cat.components.composition, cat_factory.composition)
+            self.assertIs(cat.components._entity, cat)
+            self.assertIsNone(cat.eid)
+        cats[0].alive = False
+        self.assertFalse(cats[0].get_component(Alive).alive)
+        self.assertNotIn('alive', cats[0].__dict__)
+
+    def test_make_many_rejects_unknown_properties(self):
+        cat_factory = Assemblage(components=[Alive, Portable])
+
+        with self.assertRaises(ValueError) as e:
+            cat_factory.make_many(2, columns={'aliv': [True, False]})
+
+        self.assertEqual(str(e.exception), "Unknown initial properties: aliv")
+
+    def test_make_many_rejects_short_columns(self):
+        cat_factory = Assemblage(components=[Alive])
+
+        with self.assertRaises(ValueError):
+            cat_factory.make_many(3, columns={'alive': [True, False]})
+
+    def test_overrides_do_not_leak_between_makes(self):
+        cat_factory = Assemblage(components=[Alive, Portable])
+
+        zombie_cat = cat_factory.make(alive=False)
+        cat = cat_factory.make()
+
+        self.assertFalse(zombie_cat.alive)
+        self.assertTrue(cat.alive)
+        self.assertEqual(cat_factory.component_types[Alive], {})
+
+    def test_adding_component_rebuilds_constructor(self):
+        cat_factory = Assemblage(components=[Portable])
+        cat_factory.make()
+
+        cat_factory.add_component(Alive, alive=False)
+        cat = cat_factory.make()
+
+        self.assertFalse(cat.alive)
+        self.assertIs(cat_factory.routes['alive'], Alive)
+
+    def test_component_types_cannot_be_changed_behind_the_constructor(self):
+        cat_factory = Assemblage(components=[Alive], alive=False)
+        cat_factory.make()
+
+        with self.assertRaises(TypeError):
+            cat_factory.component_types[Alive]['alive'] = True
+        with self.assertRaises(TypeError):
+            cat_factory.component_types[Portable] = {}
+
+        self.assertFalse(cat_factory.make().alive)
+        self.assertEqual(dict(cat_factory.component_types[Alive]), {'alive': False})
@@ -0,0 +1,67 @@
+import unittest
+
+from braga import World, Assemblage, Aspect, Component
+from braga.column_system import ColumnSystem, numpy
+from tests.fixtures import Location, Moveable
+
+
+class Skill(Component):
+
+    __slots__ = ['skill']
+    __column_types__ = {'skill': 'd'}
+
+    def __init__(self, skill=0):
+        self.skill = skill
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestColumnSystem(unittest.TestCase):
+
+    def check_world(self, world):
+        player_factory = Assemblage([Skill, Location])
+        players = [world.make_entity(player_factory, skill=s, x=s) for s in (10, 20, 30)]
+        unskilled = world.make_entity(Assemblage([Location]), x=5)
+        world.make_entity(Assemblage([Skill, Location, Moveable]), skill=100, x=100)
+
+        system = ColumnSystem(world,
+                              aspect=Aspect(all_of=set([Skill, Location])),
+                              columns=[(Skill, 'skill'), (Location, 'x')])
+
+        @system
+        def train(skill, x):
+            skill *= 2
+            x += 1
+
+        @system
+        def reset(skill, x):
+            return numpy.zeros(len(skill)), x
+
+        system.train()
+        self.assertEqual([p.skill for p in players], [20, 40, 60])
+        self.assertEqual([p.x for p in players], [11, 21, 31])
+        self.assertEqual(unskilled.x, 5)
+
+        system.reset()
+        self.assertEqual([p.skill for p in players], [0, 0, 0])
+        self.assertEqual([p.x for p in players], [11, 21, 31])
+
+    def test_column_system_on_object_storage(self):
+        self.check_world(World())
+
+    def test_column_system_on_archetype_storage(self):
+        self.check_world(World(storage='archetypes'))
+
+    def test_column_system_runs_hooks(self):
+        world = World()
+        calls = []
+        system = ColumnSystem(world, aspect=Aspect(all_of=set([Skill])), columns=[(Skill, 'skill')])
+
+        @system
+        def decay(skill):
+            skill *= 0.5
+
+        world.subscribe(system, 'decay', lambda: calls.append('before'), before=True)
+        world.make_entity(Assemblage([Skill]), skill=4)
+        system.decay()
+
+        self.assertEqual(calls, ['before'])
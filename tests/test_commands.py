@@ -0,0 +1,62 @@
+import unittest
+
+from braga import World, Assemblage, Aspect
+from braga.composition import Composition
+from tests.fixtures import Alive, Moveable, Location
+
+
+class TestCommandBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World()
+        self.mover_factory = Assemblage([Moveable, Location])
+        self.movers = self.world.register_view(Aspect(all_of=set([Moveable])))
+
+    def test_commands_take_effect_when_applied(self):
+        doomed = self.world.make_entity(self.mover_factory)
+        born = self.world.commands.make_entity(self.mover_factory, x=3)
+        self.world.commands.destroy_entity(doomed)
+
+        self.assertEqual(set(self.movers), set([doomed]))
+        self.assertNotIn(born, self.world.entities)
+
+        self.world.apply_commands()
+
+        self.assertEqual(set(self.movers), set([born]))
+        self.assertEqual(self.world.entities, set([born]))
+        self.assertEqual(born.x, 3)
+        self.assertEqual(len(self.world.commands), 0)
+
+    def test_loops_can_record_commands_for_the_entities_they_visit(self):
+        for _ in range(3):
+            self.world.make_entity(self.mover_factory)
+
+        for entity in self.world.entities_with_aspect(Aspect(all_of=set([Moveable]))):
+            self.world.commands.add_component(entity, Alive())
+            self.world.commands.make_entity()
+        self.world.step()
+
+        self.assertEqual(len(self.world.entities), 6)
+        self.assertEqual(len(self.world.entities_by_component_type[Alive]), 3)
+
+    def test_entity_made_and_destroyed_in_one_batch_never_stays(self):
+        entity = self.world.commands.make_entity(self.mover_factory)
+        self.world.commands.remove_component(entity, entity.get_component(Moveable))
+        self.world.commands.destroy_entity(entity)
+        self.world.commands.destroy_entity(entity)
+        self.world.refresh()
+
+        self.assertEqual(self.world.entities, set())
+        self.assertEqual(set(self.movers), set())
+
+    def test_archetype_storage_adopts_new_entities(self):
+        world = World(storage='archetypes')
+        entity = world.commands.make_entity(self.mover_factory, x=5)
+
+        self.assertNotIn(Composition.of([Moveable, Location]), world.storage.archetypes)
+
+        world.apply_commands()
+
+        archetype = world.storage.archetypes[Composition.of([Moveable, Location])]
+        self.assertEqual(archetype.entities, [entity])
+        self.assertEqual(entity.x, 5)
@@ -0,0 +1,138 @@
+import os
+
+from braga import World, Assemblage, Aspect
+from braga.component import attribute_watchers
+from tests.fixtures import Alive, Container, Health, Location, Portable, TemporaryDirectoryTestCase, located
+
+
+class TestDeltaCheckpoints(TemporaryDirectoryTestCase):
+
+    def setUp(self):
+        super(TestDeltaCheckpoints, self).setUp()
+        self.base = os.path.join(self.directory, 'world.snapshot')
+        self.log = os.path.join(self.directory, 'world.deltas')
+
+    def check_round_trip(self, storage):
+        world = World(storage=storage)
+        factory = Assemblage([Location, Alive])
+        for x in range(5):
+            world.make_entity(factory, x=x)
+        tracker = world.track_changes(self.base, self.log)
+        entities = located(world)
+
+        entities[0].y = 7
+        entities[1].remove_component(Alive)
+        world.destroy_entity(entities[2])
+        newcomer = world.make_entity(Assemblage([Location, Health]), x=10, hit_points=3.5)
+        newcomer.target = entities[3]
+        self.assertEqual(world.checkpoint(), 6)
+        self.assertEqual(world.checkpoint(), 0)
+
+        entities[3].add_component(Health(hit_points=1.5))
+        world.timer = 4
+        self.assertEqual(world.checkpoint(), 1)
+        tracker.close()
+
+        restored = World.load(self.base, delta_log=self.log, storage=storage)
+        by_x = located(restored)
+        self.assertEqual(sorted(by_x), [0, 1, 3, 4, 10])
+        self.assertEqual(by_x[0].y, 7)
+        self.assertFalse(by_x[1].has_component(Alive))
+        self.assertTrue(by_x[4].alive)
+        self.assertIs(by_x[10].target, by_x[3])
+        self.assertEqual(by_x[10].hit_points, 3.5)
+        self.assertEqual(by_x[3].hit_points, 1.5)
+        self.assertEqual(restored.timer, 4)
+
+    def test_round_trip(self):
+        self.check_round_trip('objects')
+
+    def test_round_trip_with_archetype_storage(self):
+        self.check_round_trip('archetypes')
+
+    def test_checkpoints_only_write_changes(self):
+        world = World()
+        world.make_entities(Assemblage([Location]), 1000)
+        tracker = world.track_changes(self.base, self.log)
+        next(iter(world.entities)).x = 1
+
+        world.checkpoint()
+        tracker.close()
+
+        self.assertLess(os.path.getsize(self.log), 200)
+
+    def test_instance_dictionary_attributes_are_tracked(self):
+        for storage in ('objects', 'archetypes'):
+            world = World(storage=storage)
+            toy = world.make_entity(Assemblage([Location, Portable]), x=1)
+            tracker = world.track_changes(self.base, self.log)
+            self.assertEqual(world.checkpoint(), 0)
+
+            toy.get_component(Portable).colour = u'red'
+            self.assertEqual(world.checkpoint(), 1)
+            self.assertEqual(world.checkpoint(), 0)
+            tracker.close()
+
+            restored, = located(World.load(self.base, delta_log=self.log, storage=storage)).values()
+            self.assertEqual(restored.colour, u'red')
+
+    def test_components_added_and_removed_between_checkpoints_are_not_written(self):
+        for storage in ('objects', 'archetypes'):
+            world = World(storage=storage)
+            cat = world.make_entity(Assemblage([Location]), x=1)
+            tracker = world.track_changes(self.base, self.log)
+
+            cat.add_component(Alive())
+            cat.remove_component(Alive)
+            self.assertEqual(world.checkpoint(), 0)
+            tracker.close()
+
+            restored, = located(World.load(self.base, delta_log=self.log, storage=storage)).values()
+            self.assertFalse(restored.has_component(Alive))
+
+    def test_values_changed_in_place_are_written_when_marked(self):
+        for storage in ('objects', 'archetypes'):
+            world = World(storage=storage)
+            bag = world.make_entity(Assemblage([Location, Container]), x=1)
+            wand = world.make_entity(Assemblage([Portable]))
+            tracker = world.track_changes(self.base, self.log)
+
+            bag.pick_up(wand)
+            self.assertEqual(world.checkpoint(), 0)
+            world.mark_changed(bag, Container)
+            self.assertEqual(world.checkpoint(), 1)
+            tracker.close()
+
+            restored = World.load(self.base, delta_log=self.log, storage=storage)
+            bag, = located(restored).values()
+            wand, = restored.entities_with_aspect(Aspect(all_of=set([Portable])))
+            self.assertEqual(bag.inventory, set([wand]))
+
+    def test_closing_stops_watching_instance_dictionaries(self):
+        world = World()
+        world.make_entity(Assemblage([Portable]))
+        tracker = world.track_changes(self.base, self.log)
+        self.assertIn('__setattr__', Portable.__dict__)
+
+        tracker.close()
+
+        self.assertNotIn('__setattr__', Portable.__dict__)
+        self.assertEqual(attribute_watchers(Portable), [])
+
+    def test_references_to_destroyed_entities_are_written_as_none(self):
+        world = World()
+        hunter, prey = world.make_entity(Assemblage([Health])), world.make_entity()
+        tracker = world.track_changes(self.base, self.log)
+
+        hunter.target = prey
+        world.destroy_entity(prey)
+        self.assertEqual(world.checkpoint(), 2)
+        tracker.close()
+
+        restored = World.load(self.base, delta_log=self.log)
+        self.assertEqual(len(restored.entities), 1)
+        self.assertIsNone(next(iter(restored.entities)).target)
+
+    def test_checkpoint_requires_tracking(self):
+        with self.assertRaises(ValueError):
+            World().checkpoint()
@@ -3,6 +3,7 @@ import unittest
 import six
 
 from braga import Entity, Component
+from tests.fixtures import Location
 
 
 class Alive(Component):
@@ -81,3 +82,107 @@ class TestEntity(unittest.TestCase):
         cat.components.add(catalive)
 
         self.assertEqual(cat.component_values, {'Alive-_alive': True})
+
+    def test_get_component_finds_subclasses(self):
+        class Undead(Alive):
+            pass
+
+        cat = Entity()
+        catundead = Undead()
+        cat.components.add(catundead)
+
+        self.assertEqual(cat.get_component(Alive), catundead)
+        self.assertTrue(cat.has_component(Alive))
+        self.assertTrue(cat.has_component(Component))
+
+        cat.components.remove(catundead)
+        self.assertFalse(cat.has_component(Alive))
+        with self.assertRaises(AttributeError):
+            cat.get_component(Alive)
+
+    def test_components_behave_like_a_set(self):
+        cat = Entity()
+        catalive = Alive()
+        cat.components |= set([catalive])
+
+        self.assertIn(catalive, cat.components)
+        self.assertNotIn(Alive(), cat.components)
+        self.assertEqual(cat.components, set([catalive]))
+        self.assertEqual(len(cat.components), 1)
+
+        cat.components.discard(catalive)
+        self.assertEqual(cat.components, set())
+
+    def test_entity_holds_one_component_per_type(self):
+        cat = Entity()
+        cat.components.add(Alive())
+
+        with self.assertRaises(ValueError):
+            cat.components.add(Alive())
+
+    def test_add_and_remove_component(self):
+        cat = Entity()
+        catalive = cat.add_component(Alive())
+        catlocation = cat.add_component(Location())
+
+        self.assertTrue(cat.has_component(Alive))
+        self.assertIs(cat.remove_component(Alive), catalive)
+        self.assertIs(cat.remove_component(catlocation), catlocation)
+        self.assertEqual(cat.components, set())
+
+        with self.assertRaises(ValueError):
+            cat.remove_component(Alive)
+        with self.assertRaises(ValueError):
+            cat.remove_component(catlocation)
+
+    def test_entity_attribute_writes_go_to_components(self):
+        cat = Entity()
+        catlocation = Location()
+        cat.components.add(catlocation)
+
+        cat.x = 3
+        self.assertEqual(catlocation.x, 3)
+        self.assertNotIn('x', cat.__dict__)
+
+        cat.nickname = 'Grep'
+        self.assertEqual(cat.__dict__['nickname'], 'Grep')
+
+    def test_entities_with_same_components_share_routing(self):
+        cat = Entity()
+        cat.components.add(Location())
+        dog = Entity()
+        dog.components.add(Location())
+
+        self.assertIs(cat.components.composition, dog.components.composition)
+
+        cat.components.add(Alive())
+        self.assertIsNot(cat.components.composition, dog.components.composition)
+        self.assertTrue(cat.alive)
+        with self.assertRaises(AttributeError):
+            dog.alive
+
+    def test_uuid_is_generated_lazily(self):
+        cat = Entity()
+        self.assertIsNone(cat.__dict__['_uuid'])
+
+        cat_uuid = cat.uuid
+        self.assertIsNotNone(cat_uuid)
+        self.assertEqual(cat.uuid, cat_uuid)
+
+    def test_entity_fields_are_not_routed_to_components(self):
+        class Record(Component):
+
+            __slots__ = ['_id', '_world']
+
+            def __init__(self):
+                self._id = 'record'
+                self._world = 'record'
+
+        cat = Entity()
+        record = Record()
+        cat.components.add(record)
+        cat._id = 7
+        cat._world = None
+
+        self.assertEqual(cat.eid, 7)
+        self.assertEqual((record._id, record._world), ('record', 'record'))
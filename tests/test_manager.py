@@ -1,9 +1,12 @@
+import gc
 import unittest
+import weakref
 from collections import defaultdict
 
 import six
 
-from braga import Component, Manager, Assemblage
+from braga import Component, Manager, Assemblage, World
+from braga.component import TrackedSlot, slot_watchers
 
 
 class ComponentWithState(Component):
@@ -15,6 +18,14 @@ class ComponentWithState(Component):
         self.letter = letter
 
 
+class OtherComponent(Component):
+
+    __slots__ = ['place']
+
+    def __init__(self, place=None):
+        self.place = place
+
+
 class TestManager(unittest.TestCase):
 
     def test_properties_default_to_initial_properties(self):
@@ -34,8 +45,8 @@ class TestManager(unittest.TestCase):
 
     def test_registries_are_default_dicts(self):
         manager = Manager(ComponentWithState)
-        self.assertEqual(manager.entities_by_number, defaultdict(list))
-        self.assertEqual(manager.entities_by_letter, defaultdict(list))
+        self.assertEqual(manager.entities_by_number, defaultdict(set))
+        self.assertEqual(manager.entities_by_letter, defaultdict(set))
 
     def test_register_puts_entity_in_appropriate_registry(self):
         manager = Manager(ComponentWithState)
@@ -56,3 +67,203 @@ class TestManager(unittest.TestCase):
         manager.register(entity)
 
         self.assertEqual(manager.entities_by_component[specific_component], entity)
+
+    def test_register_twice_does_not_duplicate(self):
+        manager = Manager(ComponentWithState)
+        entity = Assemblage(components=[ComponentWithState]).make(number=1, letter='a')
+
+        manager.register(entity)
+        manager.register(entity)
+
+        self.assertEqual(manager.entities_by_number[1], set([entity]))
+
+    def test_unregister_removes_entity_from_registries(self):
+        manager = Manager(ComponentWithState)
+        entity = Assemblage(components=[ComponentWithState]).make(number=1, letter='a')
+        manager.register(entity)
+
+        manager.unregister(entity)
+
+        self.assertNotIn(1, manager.entities_by_number)
+        self.assertNotIn('a', manager.entities_by_letter)
+        self.assertEqual(manager.entities_by_component, {})
+        with self.assertRaises(ValueError):
+            manager.unregister(entity)
+
+    def test_registries_follow_slot_assignments(self):
+        manager = Manager(ComponentWithState)
+        entity = Assemblage(components=[ComponentWithState]).make(number=1, letter='a')
+        manager.register(entity)
+
+        entity.number = 2
+        entity.get_component(ComponentWithState).letter = 'b'
+
+        self.assertNotIn(1, manager.entities_by_number)
+        self.assertEqual(manager.entities_by_number[2], set([entity]))
+        self.assertEqual(manager.entities_by_letter['b'], set([entity]))
+        manager.close()
+
+    def test_registries_follow_archetype_column_writes(self):
+        world = World(storage='archetypes')
+        manager = Manager(ComponentWithState, world=world)
+        entity = world.make_entity(Assemblage(components=[ComponentWithState]), number=1)
+        manager.register(entity)
+
+        entity.number = 3
+
+        self.assertEqual(manager.entities_by_number[3], set([entity]))
+        manager.close()
+
+    def test_manager_forgets_destroyed_entities(self):
+        world = World()
+        manager = Manager(ComponentWithState, world=world)
+        entity = world.make_entity(Assemblage(components=[ComponentWithState]), number=1)
+        manager.register(entity)
+
+        world.destroy_entity(entity)
+
+        self.assertNotIn(1, manager.entities_by_number)
+        self.assertEqual(manager.entities_by_component, {})
+        manager.close()
+
+    def test_sorted_properties_must_be_registered(self):
+        with self.assertRaises(ValueError):
+            Manager(ComponentWithState, properties_to_register=['letter'], sorted_properties=['number'])
+
+    def test_sorted_property_supports_range_top_and_ordered_queries(self):
+        manager = Manager(ComponentWithState, sorted_properties=['number'])
+        factory = Assemblage(components=[ComponentWithState])
+        entities = [factory.make(number=number) for number in [5, 1, 4, 2, 3]]
+        unnumbered = factory.make()
+        for entity in entities + [unnumbered]:
+            manager.register(entity)
+        by_number = dict((entity.number, entity) for entity in entities)
+
+        self.assertEqual(manager.entities_in_range('number', 2, 4), [by_number[2], by_number[3], by_number[4]])
+        self.assertEqual(manager.entities_in_range('number', 2, 4, include_low=False, include_high=False),
+                         [by_number[3]])
+        self.assertEqual(manager.entities_in_range('number', low=4), [by_number[4], by_number[5]])
+        self.assertEqual(manager.top('number', 2), [by_number[5], by_number[4]])
+        self.assertEqual(manager.top('number', 2, largest=False), [by_number[1], by_number[2]])
+        self.assertEqual(list(manager.ordered('number', reverse=True)), [by_number[n] for n in [5, 4, 3, 2, 1]])
+        with self.assertRaises(ValueError):
+            manager.top('letter', 1)
+        manager.close()
+
+    def test_sorted_property_follows_value_changes(self):
+        manager = Manager(ComponentWithState, sorted_properties=['number'])
+        factory = Assemblage(components=[ComponentWithState])
+        low, high = factory.make(number=1), factory.make(number=2)
+        manager.register(low)
+        manager.register(high)
+
+        low.number = 10
+        self.assertEqual(manager.top('number', 1), [low])
+
+        manager.unregister(low)
+        self.assertEqual(list(manager.ordered('number')), [high])
+        manager.close()
+
+    def test_sorted_property_handles_many_equal_values(self):
+        manager = Manager(ComponentWithState, sorted_properties=['number'])
+        entities = Assemblage(components=[ComponentWithState]).make_many(500, number=0)
+        for entity in entities:
+            manager.register(entity)
+
+        for entity in entities[::2]:
+            entity.number = 1
+        manager.unregister(entities[1])
+
+        self.assertEqual(manager.entities_in_range('number', 0, 0), entities[3::2])
+        self.assertEqual(manager.entities_in_range('number', low=0, include_low=False), entities[::2])
+        self.assertEqual(len(manager.sorted_indexes['number']), 499)
+        manager.close()
+
+    def test_unique_key_lookup_and_enforcement(self):
+        manager = Manager(ComponentWithState, properties_to_register=['number'], unique_keys={'letter': 'letter'})
+        factory = Assemblage(components=[ComponentWithState])
+        first, second = factory.make(number=1, letter='a'), factory.make(number=2, letter='a')
+        manager.register(first)
+
+        self.assertIs(manager.entity_by_letter['a'], first)
+        with self.assertRaises(ValueError):
+            manager.register(second)
+        self.assertNotIn(second, manager.entities_by_number[2])
+
+        first.letter = 'b'
+        self.assertEqual(manager.entity_by_letter, {'b': first})
+        manager.register(second)
+        with self.assertRaises(ValueError):
+            second.letter = 'b'
+        self.assertEqual(second.letter, 'a')
+        self.assertEqual(manager.entity_by_letter, {'a': second, 'b': first})
+        manager.close()
+
+    def test_refused_assignment_to_a_key_part_changes_nothing(self):
+        manager = Manager(ComponentWithState, properties_to_register=['number'],
+                          unique_keys={'place': (OtherComponent, 'place')})
+        tracker = Manager(OtherComponent, properties_to_register=['place'])
+        factory = Assemblage(components=[ComponentWithState, OtherComponent])
+        indoors, outdoors = factory.make(place='in'), factory.make(place='out')
+        for entity in (indoors, outdoors):
+            manager.register(entity)
+            tracker.register(entity)
+
+        with self.assertRaises(ValueError):
+            outdoors.place = 'in'
+        self.assertEqual(outdoors.place, 'out')
+        self.assertEqual(manager.entity_by_place, {'in': indoors, 'out': outdoors})
+        self.assertEqual(tracker.entities_by_place['out'], set([outdoors]))
+        manager.close()
+        tracker.close()
+
+    def test_composite_key_across_components(self):
+        manager = Manager(ComponentWithState, properties_to_register=['number'],
+                          composite_keys={'letter_and_place': ['letter', (OtherComponent, 'place')]})
+        factory = Assemblage(components=[ComponentWithState, OtherComponent])
+        indoors, outdoors = factory.make(letter='a', place='in'), factory.make(letter='a', place='out')
+        manager.register(indoors)
+        manager.register(outdoors)
+
+        self.assertEqual(manager.entities_by_letter_and_place[('a', 'in')], set([indoors]))
+
+        outdoors.place = 'in'
+        self.assertEqual(manager.entities_by_letter_and_place[('a', 'in')], set([indoors, outdoors]))
+        self.assertNotIn(('a', 'out'), manager.entities_by_letter_and_place)
+
+        manager.unregister(indoors)
+        self.assertEqual(manager.entities_by_letter_and_place[('a', 'in')], set([outdoors]))
+        manager.close()
+
+    def test_manager_forgets_entities_that_lose_a_key_component(self):
+        world = World()
+        manager = Manager(ComponentWithState, properties_to_register=['number'], world=world,
+                          unique_keys={'place': (OtherComponent, 'place')})
+        entity = world.make_entity(Assemblage(components=[ComponentWithState, OtherComponent]), place='in')
+        manager.register(entity)
+
+        entity.remove_component(OtherComponent)
+
+        self.assertEqual(manager.entity_by_place, {})
+        self.assertEqual(manager.entities_by_component, {})
+        manager.close()
+
+    def test_dropped_managers_are_collected_and_stop_watching(self):
+        world = World()
+        managers = [Manager(ComponentWithState, properties_to_register=['number'], world=world,
+                            unique_keys={'letter': 'letter'}) for _ in range(3)]
+        references = [weakref.ref(manager) for manager in managers]
+        del managers
+        gc.collect()
+
+        self.assertEqual([reference() for reference in references], [None, None, None])
+        self.assertEqual(slot_watchers(ComponentWithState, 'number'), [])
+        self.assertEqual(slot_watchers(ComponentWithState, 'letter', before=True), [])
+        self.assertNotIsInstance(ComponentWithState.__dict__['number'], TrackedSlot)
+        self.assertEqual(world.removed_observers[ComponentWithState], [])
+
+    def test_closing_the_last_manager_restores_the_slots(self):
+        manager = Manager(ComponentWithState, properties_to_register=['number'])
+        self.assertIsInstance(ComponentWithState.__dict__['number'], TrackedSlot)
+        manager.close()
+        self.assertNotIsInstance(ComponentWithState.__dict__['number'], TrackedSlot)
@@ -0,0 +1,163 @@
+import gc
+import shutil
+import tempfile
+import unittest
+
+from braga import World, Assemblage, Aspect, Component, Manager
+from braga import mapped
+from braga.mapped import INITIAL_CAPACITY
+from tests.fixtures import Alive
+
+try:
+    memoryview(b'').cast
+except AttributeError:  # Python 2
+    raise unittest.SkipTest("Mapped storage requires memoryview.cast")
+
+
+class Position(Component):
+
+    __slots__ = ['x', 'y']
+    __column_types__ = {'x': 'd', 'y': 'd'}
+
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+
+class Speed(Component):
+
+    __slots__ = ['speed']
+    __column_types__ = {'speed': 'q'}
+
+    def __init__(self, speed=1):
+        self.speed = speed
+
+
+class TestMappedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.world = World(storage='mmap', path=self.path)
+        self.mover_factory = Assemblage([Position, Speed])
+
+    def tearDown(self):
+        self.world.storage.close()
+        shutil.rmtree(self.path)
+
+    def test_mmap_storage_needs_a_path(self):
+        with self.assertRaises(ValueError):
+            World(storage='mmap')
+
+    def test_components_must_be_fixed_width(self):
+        with self.assertRaises(ValueError):
+            self.world.make_entity(Assemblage([Alive]))
+
+    def test_entities_are_materialised_on_demand(self):
+        mover = self.world.make_entity(self.mover_factory, x=1.5, speed=3)
+        mover_id = mover.eid
+        self.world.make_entity(Assemblage([Position]))
+        del mover
+        gc.collect()
+
+        self.assertEqual(len(self.world.storage._cache), 0)
+        self.assertEqual(len(self.world.entities), 2)
+
+        movers = self.world.entities_with_aspect(Aspect(all_of=set([Speed])))
+        mover, = movers
+        self.assertEqual(mover.eid, mover_id)
+        self.assertEqual((mover.x, mover.speed), (1.5, 3))
+        self.assertIs(self.world.get_entity(mover_id), mover)
+        self.assertIn(mover, self.world.entities)
+
+    def test_component_changes_and_destruction(self):
+        mover = self.world.make_entity(self.mover_factory)
+        mover.remove_component(Speed)
+        self.assertEqual(self.world.entities_with_aspect(Aspect(all_of=set([Speed]))), set())
+
+        speed = mover.add_component(Speed(speed=8))
+        self.assertIs(speed, mover.get_component(Speed))
+        speed.speed = 9
+        self.assertEqual(mover.speed, 9)
+
+        speed = mover.get_component(Speed)
+        self.world.destroy_entity(mover)
+        self.assertEqual(speed.speed, 9)
+        self.assertEqual(len(self.world.entities), 0)
+        self.assertEqual(self.world.make_entity().eid, mover.eid)
+
+    @unittest.skipIf(mapped.numpy is None, "numpy is not installed")
+    def test_aspect_queries_match_with_and_without_numpy(self):
+        factories = [Assemblage([Position]), Assemblage([Speed]), self.mover_factory, None]
+        for i in range(40):
+            self.world.make_entity(factories[i % 4])
+        self.world.destroy_entity(self.world.get_entity(2))
+        aspects = [Aspect(all_of=set([Position])), Aspect(all_of=set([Position]), exclude=set([Speed])),
+                   Aspect(some_of=set([Speed, Alive])), Aspect(all_of=set([Position]), some_of=set([Speed]))]
+
+        vectorised = [list(self.world.storage.ids_with_aspect(aspect)) for aspect in aspects]
+        numpy, mapped.numpy = mapped.numpy, None
+        try:
+            looped = [list(self.world.storage.ids_with_aspect(aspect)) for aspect in aspects]
+        finally:
+            mapped.numpy = numpy
+
+        self.assertEqual(vectorised, looped)
+        self.assertEqual([len(ids) for ids in vectorised], [19, 10, 19, 9])
+        self.assertIs(type(vectorised[0][0]), int)
+
+    def test_store_grows_and_reopens(self):
+        count = INITIAL_CAPACITY + 10
+        self.world.make_entities(self.mover_factory, count, columns={'x': [float(i) for i in range(count)]})
+        self.world.storage.close()
+
+        self.world = World(storage='mmap', path=self.path)
+        self.assertEqual(len(self.world.entities), count)
+        last = self.world.get_entity(count - 1)
+        self.assertEqual(last.x, count - 1)
+        self.assertTrue(last.has_component(Speed))
+
+    def test_unused_entities_are_freed_without_the_garbage_collector(self):
+        gc.disable()
+        self.addCleanup(gc.enable)
+        mover = self.world.make_entity(self.mover_factory)
+        del mover
+        self.assertEqual(len(self.world.storage._cache), 0)
+
+    def test_unapplied_commands_do_not_leak_ids(self):
+        self.world.commands.make_entity(self.mover_factory)
+        self.world.make_entity(self.mover_factory)
+        with self.world:
+            pass
+        self.assertIsNone(self.world.storage.masks)
+
+        self.world = World(storage='mmap', path=self.path)
+        self.assertEqual(len(self.world.entities), 1)
+        self.assertEqual(self.world.make_entity().eid, 0)
+
+    def test_managers_follow_mapped_slots(self):
+        manager = Manager(Speed, world=self.world)
+        mover = self.world.make_entity(self.mover_factory)
+        manager.register(mover)
+
+        mover.speed = 4
+
+        self.assertEqual(manager.entities_by_speed[4], set([mover]))
+        manager.close()
+
+    def test_column_system_on_mapped_storage(self):
+        from braga.column_system import ColumnSystem, numpy
+        if numpy is None:
+            self.skipTest("numpy is not installed")
+        movers = [self.world.make_entity(self.mover_factory, x=x, speed=2) for x in (1.0, 2.0)]
+        still = self.world.make_entity(Assemblage([Position]), x=5.0)
+        system = ColumnSystem(self.world, aspect=Aspect(all_of=set([Speed])),
+                              columns=[(Position, 'x'), (Speed, 'speed')])
+
+        @system
+        def move(x, speed):
+            x += speed
+
+        system.move()
+
+        self.assertEqual([mover.x for mover in movers], [3.0, 4.0])
+        self.assertEqual(still.x, 5.0)
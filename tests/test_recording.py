@@ -0,0 +1,155 @@
+import os
+import warnings
+
+from braga import World, Assemblage, System
+from braga.recording import EventReplayer
+from braga.system import presentation
+from tests.fixtures import Alive, Health, Location, TemporaryDirectoryTestCase, located
+
+
+def build_game(world):
+    """Sets up the same Systems and subscriptions for a recorded World and for its replay."""
+    combat = System(world=world)
+    narration = []
+
+    @combat
+    def attack(attacker, target, damage=1.0):
+        target.hit_points -= damage
+        if target.hit_points <= 0:
+            target.die()
+            world.publish('death', target)
+
+    @combat
+    def spawn(x):
+        return world.make_entity(Assemblage([Location, Health, Alive]), x=x, hit_points=2.0)
+
+    def fall_over(entity):
+        entity.y = -1
+
+    world.subscribe(combat, 'attack', presentation(lambda attacker, target, damage=1.0: narration.append('hit')),
+                    after=True)
+    world.subscribe_to_event('death', fall_over)
+    world.subscribe_to_event('death', presentation(lambda entity: narration.append('death')))
+    return combat, narration
+
+
+class TestEventRecording(TemporaryDirectoryTestCase):
+
+    def setUp(self):
+        super(TestEventRecording, self).setUp()
+        self.path = os.path.join(self.directory, 'world.snapshot')
+        self.log = os.path.join(self.directory, 'world.events')
+
+    def record_session(self):
+        world = World()
+        for x in range(3):
+            world.make_entity(Assemblage([Location, Health, Alive]), x=x, hit_points=3.0)
+        combat, narration = build_game(world)
+        recorder = world.record(self.path, self.log)
+        recorder.record_system(combat, 'combat')
+
+        entities = located(world)
+        combat.attack(entities[0], entities[1], damage=2.0)
+        combat.attack(entities[0], entities[1], damage=2.0)
+        newcomer = combat.spawn(5)
+        combat.attack(entities[1], newcomer)
+        world.publish('death', entities[2])
+        world.step()
+        recorder.close()
+        self.assertEqual(narration, ['hit', 'death', 'hit', 'hit', 'death'])
+        return world
+
+    def test_replay_reproduces_the_recorded_session(self):
+        recorded = self.record_session()
+
+        replayer = EventReplayer(self.path, self.log)
+        combat, narration = build_game(replayer.world)
+        replayer.add_system(combat, 'combat')
+        self.assertEqual(replayer.run(), 6)
+        replayer.close()
+
+        self.assertEqual(narration, [])
+        self.assertEqual(replayer.world.timer, recorded.timer)
+        expected = located(recorded)
+        replayed = located(replayer.world)
+        self.assertEqual(sorted(replayed), [0, 1, 2, 5])
+        for x, entity in replayed.items():
+            self.assertEqual((entity.y, entity.hit_points, entity.alive),
+                             (expected[x].y, expected[x].hit_points, expected[x].alive))
+        self.assertEqual(replayed[1].y, -1)
+        self.assertEqual(replayed[2].y, -1)
+        self.assertEqual(replayed[5].hit_points, 1.0)
+
+    def test_run_can_fast_forward_to_a_timer(self):
+        self.record_session()
+
+        replayer = EventReplayer(self.path, self.log)
+        combat, narration = build_game(replayer.world)
+        replayer.add_system(combat, 'combat')
+        self.assertEqual(replayer.run(until=1), 2)
+        self.assertEqual(replayer.world.timer, 1)
+        self.assertEqual(replayer.run(), 4)
+        self.assertEqual(replayer.world.timer, 3)
+
+    def test_calls_that_raise_are_expected_to_raise_on_replay(self):
+        world = World()
+        bystander = world.make_entity(Assemblage([Location]))
+        combat, _ = build_game(world)
+        recorder = world.record(self.path, self.log)
+        recorder.record_system(combat, 'combat')
+        with self.assertRaises(AttributeError):
+            combat.attack(bystander, bystander)
+        combat.spawn(3)
+        recorder.close()
+
+        replayer = EventReplayer(self.path, self.log)
+        combat, _ = build_game(replayer.world)
+        replayer.add_system(combat, 'combat')
+        self.assertEqual(replayer.run(), 2)
+        self.assertEqual(sorted(located(replayer.world)), [0, 3])
+
+    def test_closing_stops_recording(self):
+        world = World()
+        combat, _ = build_game(world)
+        recorder = world.record(self.path, self.log)
+        with self.assertRaises(ValueError):
+            world.record(self.path, self.log)
+        recorder.record_system(combat, 'combat')
+        recorder.close()
+        self.assertIsNone(world.recorder)
+        self.assertEqual(world.trackers, [])
+        self.assertIsNone(combat.spawn.hooks[2])
+        combat.spawn(1)
+        self.assertEqual(os.path.getsize(self.log), 8)
+
+    def test_calls_that_cannot_be_encoded_run_but_are_not_recorded(self):
+        world = World()
+        combat, _ = build_game(world)
+        recorder = world.record(self.path, self.log)
+        recorder.record_system(combat, 'combat')
+        stranger = World().make_entity(Assemblage([Location]))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            combat.spawn(object())
+            world.publish('death', stranger)
+        self.assertEqual(len(caught), 2)
+        self.assertEqual(stranger.y, -1)
+        self.assertEqual(len(world.entities), 1)
+        combat.spawn(4)
+        recorder.close()
+
+        replayer = EventReplayer(self.path, self.log)
+        combat, _ = build_game(replayer.world)
+        replayer.add_system(combat, 'combat')
+        self.assertEqual(replayer.run(), 1)
+        self.assertEqual(sorted(located(replayer.world)), [4])
+
+    def test_entities_made_through_commands_are_numbered_in_creation_order(self):
+        world = World()
+        recorder = world.record(self.path, self.log)
+        first = world.commands.make_entity(Assemblage([Location]))
+        second = world.commands.make_entity(Assemblage([Health]))
+        third = world.commands.make_entity(Assemblage([Location]))
+        world.apply_commands()
+        self.assertEqual([recorder.entity_ids.ids[entity] for entity in (first, second, third)], [0, 1, 2])
+        recorder.close()
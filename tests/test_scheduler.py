@@ -0,0 +1,136 @@
+import threading
+import time
+import unittest
+
+from braga import System, World
+from braga.scheduler import SystemScheduler, ThreadPoolExecutor, dependencies
+from tests.fixtures import Alive, Container, Location, Moveable
+
+
+class RecordingSystem(System):
+
+    def __init__(self, name, log, reads=None, writes=None, barrier=None):
+        super(RecordingSystem, self).__init__()
+        self.name = name
+        self.log = log
+        self.reads = reads
+        self.writes = writes
+        self.barrier = barrier
+
+    def update(self):
+        if self.barrier:
+            self.barrier.wait(timeout=5)
+        time.sleep(0.01)
+        self.log.append(self.name)
+
+
+class TestDependencies(unittest.TestCase):
+
+    def test_systems_conflict_over_shared_writes(self):
+        log = []
+        movement = RecordingSystem('movement', log, reads=frozenset([Moveable]), writes=frozenset([Location]))
+        render = RecordingSystem('render', log, reads=frozenset([Location]), writes=frozenset())
+        aging = RecordingSystem('aging', log, reads=frozenset(), writes=frozenset([Alive]))
+        anything = RecordingSystem('anything', log)
+
+        self.assertEqual(dependencies([movement, render, aging, anything]), [[], [0], [], [0, 1, 2]])
+
+
+@unittest.skipIf(ThreadPoolExecutor is None, "concurrent.futures is not available")
+class TestSystemScheduler(unittest.TestCase):
+
+    def test_independent_systems_run_concurrently(self):
+        log = []
+        barrier = threading.Barrier(2)
+        first = RecordingSystem('first', log, reads=frozenset([Alive]), writes=frozenset([Alive]), barrier=barrier)
+        second = RecordingSystem('second', log, reads=frozenset([Container]), writes=frozenset([Container]), barrier=barrier)
+
+        scheduler = SystemScheduler(max_workers=2)
+        scheduler.run([first, second])
+        scheduler.shutdown()
+
+        self.assertEqual(sorted(log), ['first', 'second'])
+
+    def test_conflicting_systems_run_in_order(self):
+        log = []
+        systems = [RecordingSystem(str(i), log, reads=frozenset([Location]), writes=frozenset([Location]))
+                   for i in range(5)]
+
+        scheduler = SystemScheduler(max_workers=4)
+        scheduler.run(systems)
+        scheduler.shutdown()
+
+        self.assertEqual(log, ['0', '1', '2', '3', '4'])
+
+    def test_errors_are_raised_after_running_systems_finish(self):
+        log = []
+
+        class Broken(System):
+            reads = frozenset()
+            writes = frozenset([Alive])
+
+            def update(self):
+                raise RuntimeError("broken")
+
+        later = RecordingSystem('later', log, reads=frozenset([Alive]), writes=frozenset())
+        scheduler = SystemScheduler(max_workers=2)
+
+        with self.assertRaises(RuntimeError):
+            scheduler.run([Broken(), later])
+        scheduler.shutdown()
+        self.assertEqual(log, [])
+
+    def test_world_refresh_uses_scheduler(self):
+        log = []
+
+        class Movement(System):
+            reads = frozenset([Moveable])
+            writes = frozenset([Location])
+
+            def update(self):
+                log.append('movement')
+
+        world = World(refresh_workers=2)
+        world.add_system(Movement)
+        world.refresh()
+
+        self.assertEqual(log, ['movement'])
+
+    def test_concurrent_systems_must_use_commands_for_structural_changes(self):
+        errors = []
+
+        class Spawner(System):
+            reads = frozenset()
+            writes = frozenset([Location])
+
+            def update(self):
+                try:
+                    self.world.make_entity()
+                except ValueError as error:
+                    errors.append(error)
+                self.world.commands.make_entity()
+
+        with World(refresh_workers=2) as world:
+            world.add_system(Spawner)
+            world.add_system(RecordingSystem('reader', [], reads=frozenset([Alive]), writes=frozenset()))
+            world.refresh()
+            self.assertEqual(len(errors), 1)
+            self.assertEqual(len(world.entities), 1)
+            self.assertIsNotNone(world.scheduler._executor)
+        self.assertIsNone(world.scheduler._executor)
+
+    def test_undeclared_systems_can_make_structural_changes(self):
+
+        class Spawner(System):
+
+            def update(self):
+                self.world.make_entity()
+
+        with World(refresh_workers=4) as world:
+            world.add_system(Spawner)
+            world.add_system(RecordingSystem('reader', [], reads=frozenset([Alive]), writes=frozenset()))
+            world.refresh()
+            world.refresh()
+
+            self.assertEqual(len(world.entities), 2)
+            self.assertFalse(world.scheduler.concurrent)
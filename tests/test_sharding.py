@@ -0,0 +1,59 @@
+import unittest
+
+from braga import World, Assemblage, Aspect, ShardedSystem
+from braga.sharding import run_shard
+from tests.fixtures import Location, Moveable
+
+
+def step(x, y, v_x, v_y):
+    if v_x or v_y:
+        return x + v_x, y + v_y, v_x, v_y
+
+
+def drift(x):
+    return x + 1
+
+
+class TestShardedSystem(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World()
+        self.movers = [self.world.make_entity(Assemblage([Location, Moveable]), x=i, v_x=i % 2)
+                       for i in range(10)]
+        self.world.make_entity(Assemblage([Location]), x=100)
+
+    def make_system(self, **kwargs):
+        return ShardedSystem(self.world,
+                             aspect=Aspect(all_of=set([Location, Moveable])),
+                             columns=[(Location, 'x'), (Location, 'y'), (Moveable, 'v_x'), (Moveable, 'v_y')],
+                             **kwargs)
+
+    def test_run_shard_returns_only_changes(self):
+        self.assertEqual(run_shard((step, [(0, 0, 0, 0), (1, 1, 1, 0)])), [(1, (2, 1, 1, 0))])
+
+    def test_kernel_runs_in_parent_with_one_process(self):
+        system = self.make_system(processes=1)
+        self.assertIs(system(step), step)
+
+        system.step()
+
+        self.assertEqual([mover.x for mover in self.movers], [i + i % 2 for i in range(10)])
+
+    def test_kernel_runs_in_worker_processes(self):
+        system = self.make_system(processes=2, shard_key=lambda entity: entity.x % 3)
+        system(step)
+
+        with self.world:
+            self.assertIs(self.world.add_system(system), system)
+            self.world.refresh()
+            self.assertIsNotNone(system._pool)
+        self.assertIsNone(system._pool)
+
+        self.assertEqual([mover.x for mover in self.movers], [i + i % 2 for i in range(10)])
+
+    def test_single_column_kernels_return_one_value(self):
+        system = ShardedSystem(self.world, aspect=Aspect(all_of=set([Location])), columns=[(Location, 'x')], processes=1)
+        system(drift)
+        system.drift()
+
+        self.assertEqual(sorted(entity.x for entity in self.world.entities), list(range(1, 11)) + [101])
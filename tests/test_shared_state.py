@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import unittest
+
+from braga import World, Assemblage, Component
+from braga.shared_state import SharedStateReader, shared_memory
+from tests.fixtures import Location
+
+
+class Health(Component):
+
+    __slots__ = ['hit_points', 'armor']
+    __column_types__ = {'hit_points': 'd', 'armor': 'i'}
+
+    def __init__(self, hit_points=10, armor=0):
+        self.hit_points = hit_points
+        self.armor = armor
+
+
+def read_in_child(name, queue):
+    reader = SharedStateReader(name)
+    queue.put(reader.read(Health, 'hit_points'))
+    reader.close()
+
+
+@unittest.skipIf(shared_memory is None, "multiprocessing.shared_memory is not available")
+class TestSharedState(unittest.TestCase):
+
+    def setUp(self):
+        self.name = 'braga_test_{}'.format(os.getpid())
+
+    def check_world(self, world):
+        first, second = world.make_entities(Assemblage([Health, Location]), 2, columns={'hit_points': [5, 7]})
+        publisher = world.share_state(self.name, [(Health, 'hit_points'), (Health, 'armor')], capacity=4)
+        self.addCleanup(publisher.close)
+        reader = SharedStateReader(self.name)
+        self.addCleanup(reader.close)
+
+        version, values = reader.read(Health, 'hit_points', 'armor')
+        self.assertEqual(version, 1)
+        self.assertEqual(sorted(zip(values['id'], values['hit_points'])), sorted([(first.eid, 5), (second.eid, 7)]))
+        self.assertEqual(values['armor'], [0, 0])
+
+        first.hit_points = 1
+        self.assertEqual(sorted(reader.read(Health, 'hit_points')[1]['hit_points']), [5, 7])
+
+        world.step()
+        self.assertEqual(reader.version, 2)
+        column = reader.column('tests.test_shared_state.Health', 'hit_points')
+        self.assertEqual(sorted(column.tolist()), [1, 7])
+        column.release()
+
+    def test_publishes_object_storage(self):
+        self.check_world(World(integer_ids=True))
+
+    def test_publishes_archetype_storage(self):
+        self.check_world(World(storage='archetypes', integer_ids=True))
+
+    def test_only_numeric_columns_can_be_shared(self):
+        with self.assertRaises(ValueError):
+            World().share_state(self.name, [(Location, 'x')], capacity=4)
+
+    def test_capacity_is_enforced(self):
+        world = World()
+        publisher = world.share_state(self.name, [(Health, 'armor')], capacity=1)
+        self.addCleanup(publisher.close)
+        world.make_entities(Assemblage([Health]), 2)
+
+        with self.assertRaises(ValueError):
+            world.step()
+
+    def test_closed_publishers_stop_publishing(self):
+        world = World()
+        publisher = world.share_state(self.name, [(Health, 'hit_points')], capacity=4)
+        publisher.close()
+        world.step()
+        self.assertEqual(world.shared_states, [])
+        publisher.close()
+
+        publisher = world.share_state(self.name, [(Health, 'hit_points')], capacity=4)
+        world.unshare_state(publisher)
+        self.assertTrue(publisher.closed)
+        with self.assertRaises(ValueError):
+            world.unshare_state(publisher)
+
+    def test_other_processes_can_read(self):
+        world = World()
+        world.make_entity(Assemblage([Health]), hit_points=3)
+        publisher = world.share_state(self.name, [(Health, 'hit_points')], capacity=4)
+        self.addCleanup(publisher.close)
+
+        queue = multiprocessing.Queue()
+        child = multiprocessing.Process(target=read_in_child, args=(self.name, queue))
+        child.start()
+        version, values = queue.get(timeout=10)
+        child.join()
+
+        self.assertEqual((version, values), (1, {'id': [-1], 'hit_points': [3.0]}))
@@ -0,0 +1,95 @@
+import os
+
+from braga import World, Assemblage, Aspect
+from tests.fixtures import Alive, Container, Health, Portable, Location, TemporaryDirectoryTestCase
+
+
+class TestSnapshot(TemporaryDirectoryTestCase):
+
+    def setUp(self):
+        super(TestSnapshot, self).setUp()
+        self.path = os.path.join(self.directory, 'world.snapshot')
+
+    def populate(self, world):
+        cat = world.make_entity(Assemblage([Alive, Health, Location]), x=1, y=2, hit_points=7.5)
+        toy = world.make_entity(Assemblage([Portable]))
+        toy.get_component(Portable).colour = u'red'
+        box = world.make_entity(Assemblage([Container]))
+        box.pick_up(toy)
+        cat.target = box
+        world.make_entity()
+        world.timer = 12
+        return cat, toy, box
+
+    def check(self, world):
+        self.assertEqual(len(world.entities), 4)
+        self.assertEqual(world.timer, 12)
+
+        cat, = world.entities_with_aspect(Aspect(all_of=set([Health])))
+        toy, = world.entities_with_aspect(Aspect(all_of=set([Portable])))
+        box, = world.entities_with_aspect(Aspect(all_of=set([Container])))
+        self.assertTrue(cat.alive)
+        self.assertEqual((cat.x, cat.y, cat.hit_points), (1, 2, 7.5))
+        self.assertIs(cat.target, box)
+        self.assertEqual(box.inventory, set([toy]))
+        self.assertEqual(toy.colour, u'red')
+
+    def test_round_trip(self):
+        world = World()
+        self.populate(world)
+        world.save(self.path)
+
+        self.check(World.load(self.path))
+
+    def test_round_trip_between_storages(self):
+        world = World(storage='archetypes')
+        self.populate(world)
+        world.save(self.path)
+
+        self.check(World.load(self.path))
+        self.check(World.load(self.path, storage='archetypes'))
+
+    def test_integer_ids_are_saved_in_order(self):
+        world = World(integer_ids=True)
+        for number in range(3):
+            world.make_entity(Assemblage([Location]), x=number)
+        world.save(self.path)
+
+        loaded = World.load(self.path, integer_ids=True)
+        self.assertEqual([loaded.get_entity(entity_id).x for entity_id in range(3)], [0, 1, 2])
+
+    def test_integer_ids_survive_the_round_trip(self):
+        for storage in ('objects', 'archetypes'):
+            world = World(storage=storage, integer_ids=True)
+            located = [world.make_entity(Assemblage([Location]), x=number) for number in range(3)]
+            world.make_entity(Assemblage([Health]), hit_points=1.0)
+            world.destroy_entity(located[1])
+            recycled = world.make_entity(Assemblage([Location]), x=9)
+            world.destroy_entity(located[0])
+            ids = dict((entity.x, entity.eid) for entity in (located[2], recycled))
+            world.save(self.path)
+
+            loaded = World.load(self.path, storage=storage, integer_ids=True)
+            for entity in loaded.entities_with_aspect(Aspect(all_of=set([Location]))):
+                self.assertEqual(entity.eid, ids[entity.x])
+                self.assertIs(loaded.get_entity(entity.eid), entity)
+            for destroyed in located[:2]:
+                with self.assertRaises(ValueError):
+                    loaded.get_entity(destroyed.eid)
+            self.assertNotIn(loaded.make_entity().eid, ids.values())
+
+    def test_references_to_entities_outside_the_world_are_rejected(self):
+        world = World()
+        cat = world.make_entity(Assemblage([Health]))
+        cat.target = world.make_entity()
+        world.destroy_entity(cat.target)
+
+        with self.assertRaises(ValueError):
+            world.save(self.path)
+
+    def test_load_rejects_other_files(self):
+        with open(self.path, 'wb') as other:
+            other.write(b'not a snapshot at all, not even close')
+
+        with self.assertRaises(ValueError):
+            World.load(self.path)
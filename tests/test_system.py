@@ -53,3 +53,76 @@ class TestSystem(unittest.TestCase):
         system.child_method('first_arg', kwarg_two='keyword_arg')
 
         callback_mock.assert_called_once_with('first_arg', kwarg_two='keyword_arg')
+
+    def test_calls_without_subscribers_leave_subscriptions_alone(self):
+        world = World()
+        system = System(world)
+
+        @system
+        def child_method(arg_one, kwarg_two=False):
+            return arg_one
+
+        self.assertEqual(system.child_method('first_arg'), 'first_arg')
+        self.assertNotIn(system, world.subscriptions)
+
+    def test_hooks_subscribed_before_decoration_run(self):
+        world = World()
+        system = System(world)
+        calls = []
+
+        world.subscribe(system, 'child_method', lambda arg_one: calls.append(arg_one), after=True)
+
+        @system
+        def child_method(arg_one):
+            pass
+
+        system.child_method('first_arg')
+        self.assertEqual(calls, ['first_arg'])
+
+    def test_unsubscribed_hooks_stop_running(self):
+        world = World()
+        system = System(world)
+        calls = []
+
+        def callback(arg_one):
+            calls.append(arg_one)
+
+        @system
+        def child_method(arg_one):
+            pass
+
+        world.subscribe(system, 'child_method', callback, before=True)
+        system.child_method('first_arg')
+        world.unsubscribe(system, 'child_method', callback, before=True)
+        system.child_method('second_arg')
+
+        self.assertEqual(calls, ['first_arg'])
+        with self.assertRaises(ValueError):
+            world.unsubscribe(system, 'child_method', callback, before=True)
+
+    def test_hooks_run_once_the_system_is_given_its_world(self):
+        world = World()
+        system = System()
+        calls = []
+
+        @system
+        def child_method(arg_one):
+            pass
+
+        world.subscribe(system, 'child_method', calls.append, before=True)
+        system.child_method('first_arg')
+        system.world = world
+        system.child_method('second_arg')
+
+        self.assertEqual(calls, ['second_arg'])
+
+    def test_subscriptions_are_read_only(self):
+        world = World()
+        system = System(world)
+        world.subscribe(system, 'child_method', len, after=True)
+
+        self.assertEqual(world.subscriptions[system]['child_method']['after'], (len,))
+        with self.assertRaises(TypeError):
+            world.subscriptions[system]['child_method']['after'] = []
+        with self.assertRaises(AttributeError):
+            world.subscriptions[system]['child_method']['before'].append(len)
@@ -2,8 +2,8 @@ import unittest
 
 import six
 
-from braga import World, Entity, Assemblage, System
-from tests.fixtures import Moveable, Location
+from braga import World, Entity, Assemblage, System, Aspect, Component
+from tests.fixtures import Alive, Container, Moveable, Location
 
 
 class TestWorld(unittest.TestCase):
@@ -37,6 +37,23 @@ class TestWorld(unittest.TestCase):
         self.assertEqual(new_entity.x, 1)
         self.assertEqual(new_entity.v_y, 2)
 
+    def test_make_entities_adds_a_batch_to_the_world(self):
+        view = self.world.register_view(Aspect(all_of=set([Location])))
+        new_entities = self.world.make_entities(Assemblage([Moveable, Location]), 3, columns={'x': [1, 2, 3]}, v_y=2)
+
+        self.assertEqual(set(new_entities), self.world.entities)
+        self.assertEqual(set(new_entities), set(view))
+        self.assertEqual(self.world.entities_with_aspect(Aspect(all_of=set([Moveable]))), set(new_entities))
+        self.assertEqual([entity.x for entity in new_entities], [1, 2, 3])
+        self.assertEqual([entity.v_y for entity in new_entities], [2, 2, 2])
+
+    def test_make_entities_with_archetype_storage(self):
+        world = World(storage='archetypes')
+        new_entities = world.make_entities(Assemblage([Moveable, Location]), 2, columns={'x': [1, 2]})
+
+        self.assertEqual([entity.x for entity in new_entities], [1, 2])
+        self.assertEqual(new_entities[0]._archetype.entities, new_entities)
+
     def test_destroy_entity_removes_entity_from_world(self):
         new_entity = self.world.make_entity()
         self.assertIn(new_entity, self.world.entities)
@@ -58,6 +75,179 @@ class TestWorld(unittest.TestCase):
 
         self.assertEqual(exception_message, "{0} does not contain {1}".format(repr(self.world), repr(unrelated_entity)))
 
+    def test_entities_with_aspect(self):
+        zombie = self.world.make_entity(Assemblage([Moveable, Location, Container]))
+        plant = self.world.make_entity(Assemblage([Alive, Location]))
+        cat = self.world.make_entity(Assemblage([Alive, Moveable, Location]))
+        rock = self.world.make_entity()
+
+        self.assertEqual(self.world.entities_with_aspect(Aspect(all_of=set([Location, Moveable]))), set([zombie, cat]))
+        self.assertEqual(self.world.entities_with_aspect(Aspect(all_of=set([Location]), exclude=set([Container]))), set([plant, cat]))
+        self.assertEqual(self.world.entities_with_aspect(Aspect(some_of=set([Alive, Container]))), set([zombie, plant, cat]))
+        self.assertEqual(self.world.entities_with_aspect(Aspect(exclude=set([Location]))), set([rock]))
+        self.assertEqual(self.world.entities_with_aspect(Aspect(all_of=set([Location]), some_of=set([Container]))), set([zombie]))
+        self.assertEqual(self.world.entities_with_aspect(Aspect(all_of=set([Container, Alive]))), set())
+
+    def test_entities_with_aspect_follows_component_changes(self):
+        aspect = Aspect(all_of=set([Alive]))
+        rock = self.world.make_entity()
+        self.assertEqual(self.world.entities_with_aspect(aspect), set())
+
+        rock_alive = Alive()
+        rock.components.add(rock_alive)
+        self.assertEqual(self.world.entities_with_aspect(aspect), set([rock]))
+
+        rock.components.remove(rock_alive)
+        self.assertEqual(self.world.entities_with_aspect(aspect), set())
+
+    def test_destroyed_entities_leave_component_indexes(self):
+        plant = self.world.make_entity(Assemblage([Alive]))
+        self.world.destroy_entity(plant)
+
+        self.assertEqual(self.world.entities_with_aspect(Aspect(all_of=set([Alive]))), set())
+        self.assertNotIn(plant, self.world.entities_by_component_type[Alive])
+
+    def test_observers_hear_about_component_changes(self):
+        added, removed = [], []
+        self.world.on_added(Alive, lambda entity, component: added.append((entity, component)))
+        self.world.on_removed(Alive, lambda entity, component: removed.append((entity, component)))
+
+        plant = self.world.make_entity(Assemblage([Alive]))
+        plant_alive = plant.get_component(Alive)
+        rock = self.world.make_entity()
+        rock_alive = rock.add_component(Alive())
+        rock.remove_component(Alive)
+        self.world.destroy_entity(plant)
+
+        self.assertEqual(added, [(plant, plant_alive), (rock, rock_alive)])
+        self.assertEqual(removed, [(rock, rock_alive), (plant, plant_alive)])
+
+    def test_add_component_returns_the_component_held(self):
+        for world in (World(), World(storage='archetypes')):
+            rock = world.make_entity()
+            rock_alive = rock.add_component(Alive(alive=False))
+            self.assertIs(rock_alive, rock.get_component(Alive))
+            rock_alive.alive = True
+            self.assertTrue(rock.alive)
+
+    def test_stop_observing(self):
+        added = []
+        self.world.on_added(Alive, added.append)
+        self.world.stop_observing(Alive, added.append)
+        self.world.make_entity(Assemblage([Alive]))
+
+        self.assertEqual(added, [])
+        with self.assertRaises(ValueError):
+            self.world.stop_observing(Alive, added.append)
+
+    def test_registered_view_follows_world_changes(self):
+        cat = self.world.make_entity(Assemblage([Alive, Moveable]))
+        aspect = Aspect(all_of=set([Alive]), exclude=set([Container]))
+
+        view = self.world.register_view(aspect)
+        self.assertEqual(set(view), set([cat]))
+        self.assertIs(self.world.register_view(aspect), view)
+
+        plant = self.world.make_entity(Assemblage([Alive]))
+        self.assertIn(plant, view)
+
+        plant.components.add(Container())
+        self.assertNotIn(plant, view)
+
+        self.world.destroy_entity(cat)
+        self.assertEqual(len(view), 0)
+        self.assertEqual(self.world.entities_with_aspect(aspect), set())
+
+    def test_dropped_view_is_no_longer_maintained(self):
+        aspect = Aspect(all_of=set([Alive]))
+        view = self.world.register_view(aspect)
+        self.world.drop_view(aspect)
+
+        self.world.make_entity(Assemblage([Alive]))
+        self.assertEqual(len(view), 0)
+        self.assertNotIn(aspect, self.world.views)
+
+        with self.assertRaises(ValueError):
+            self.world.drop_view(aspect)
+
+    def test_integer_ids_are_dense_and_recycled(self):
+        world = World(integer_ids=True)
+        first, second = world.make_entity(), world.make_entity()
+        self.assertEqual((first.eid, second.eid), (0, 1))
+        self.assertIs(world.get_entity(second.eid), second)
+
+        world.destroy_entity(first)
+        replacement = world.make_entity()
+
+        self.assertEqual(replacement.eid & 0xffffffff, 0)
+        self.assertNotEqual(replacement.eid, first.eid)
+        self.assertIs(world.get_entity(replacement.eid), replacement)
+
+    def test_get_entity_detects_stale_and_unknown_ids(self):
+        world = World(integer_ids=True)
+        cat = world.make_entity()
+        world.destroy_entity(cat)
+
+        with self.assertRaises(ValueError) as e:
+            world.get_entity(cat.eid)
+        self.assertEqual(str(e.exception), "Entity id {} is stale".format(cat.eid))
+
+        with self.assertRaises(ValueError):
+            world.get_entity(42)
+        with self.assertRaises(ValueError):
+            self.world.get_entity(0)
+
+    def test_make_entities_assigns_integer_ids(self):
+        world = World(integer_ids=True)
+        new_entities = world.make_entities(Assemblage([Location]), 3)
+
+        self.assertEqual([entity.eid for entity in new_entities], [0, 1, 2])
+        self.assertIsNone(self.world.make_entity().eid)
+
+    def test_integer_ids_do_not_hide_component_attributes(self):
+        class Account(Component):
+
+            __slots__ = ['id']
+
+            def __init__(self, id='acct-1'):
+                self.id = id
+
+        world = World(integer_ids=True)
+        holder = world.make_entity(Assemblage([Account]))
+        self.assertEqual((holder.id, holder.eid), ('acct-1', 0))
+        holder.id = 'acct-2'
+        self.assertEqual(holder.get_component(Account).id, 'acct-2')
+
+    def test_queued_events_are_dispatched_in_batches_on_step(self):
+        world = World(queue_events=True)
+        first, second = world.make_entity(), world.make_entity()
+        calls = []
+        world.subscribe_to_event('hit', lambda entity: calls.append(entity))
+        world.subscribe_to_event('hit', lambda batch: calls.append(batch), batch=True)
+
+        self.assertIsNone(world.publish('hit', first))
+        self.assertIsNone(world.publish('hit', second))
+        self.assertEqual(calls, [])
+        self.assertEqual(world.timer, 0)
+
+        world.step()
+
+        self.assertEqual(calls, [first, second, [(first,), (second,)]])
+        self.assertEqual(world.timer, 1)
+
+    def test_coalesced_events_are_dispatched_once_per_entity(self):
+        world = World(queue_events=True)
+        first, second = world.make_entity(), world.make_entity()
+        batches = []
+        world.subscribe_to_event('moved', batches.append, batch=True)
+        world.coalesce_events('moved')
+
+        for entity in [first, second, first, first]:
+            world.publish('moved', entity)
+        world.step()
+
+        self.assertEqual(batches, [[(first,), (second,)]])
+
     def test_add_system_registers_system(self):
         self.skipTest('Functionality soon to be removed')
         new_system = self.world.add_system(SomeKindOfSystem)
@@ -82,6 +272,18 @@ class TestWorld(unittest.TestCase):
 
         self.assertEqual(e.exception.message, "World already contains a System of type {}".format(repr(SomeKindOfSystem)))
 
+    def test_add_system_takes_configured_systems(self):
+        class Configured(System):
+            pass
+
+        system = Configured()
+
+        self.assertIs(self.world.add_system(system), system)
+        self.assertIs(self.world.systems[Configured], system)
+        self.assertIs(system.world, self.world)
+        with self.assertRaises(ValueError):
+            World().add_system(Configured(world=World()))
+
     def test_can_subscribe_functions_to_systems(self):
         def check_to_run_before_method(system, thing):
             pass